@@ -0,0 +1,196 @@
+"""Practice-level analytics over many chakra assessments.
+
+Assessments are held column-wise: one uint8 status code per chakra (in
+CHAKRAS order), the assessment date and a coach id. Every aggregate is a
+handful of NumPy operations over those arrays, so tens of thousands of
+records take milliseconds instead of a Python loop over payload dicts.
+
+    frame = AssessmentFrame.from_payloads(payloads)
+    status_distribution(frame)        # (7, 5) counts per chakra and status
+    mean_scores(frame)                # (7,) mean STATUS_SCORE per chakra
+    blocked_rate_by_period(frame, "month")
+    blocked_cooccurrence(frame)       # (7, 7) how often two chakras are blocked together
+"""
+import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+from report import CHAKRAS, DATE_FORMAT, STATUS_OPTIONS, STATUS_SCORE
+
+N_CHAKRAS = len(CHAKRAS)
+N_STATUS = len(STATUS_OPTIONS)
+UNKNOWN = N_STATUS   # code for a status outside STATUS_OPTIONS
+BLOCKED = STATUS_OPTIONS.index("Blocked / Underactive")
+STATUS_CODES = {s: i for i, s in enumerate(STATUS_OPTIONS)}
+STATUS_LABELS = STATUS_OPTIONS + ["Unknown"]
+
+# score per status code, unknown scored 60 like make_pdf does
+SCORE_TABLE = np.array([STATUS_SCORE[s] for s in STATUS_OPTIONS] + [60], dtype=np.float64)
+
+NO_DATE = np.datetime64("NaT", "D")
+
+
+def _parse_dates(texts) -> np.ndarray:
+    parsed = np.empty(len(texts), dtype="datetime64[D]")
+    for i, text in enumerate(texts):
+        if isinstance(text, datetime.date):
+            parsed[i] = text
+            continue
+        try:
+            parsed[i] = datetime.datetime.strptime(text, DATE_FORMAT).date()
+        except (TypeError, ValueError):
+            parsed[i] = NO_DATE
+    return parsed
+
+
+class AssessmentFrame:
+    """Columnar assessments: ``statuses`` (n, 7) uint8, ``dates`` (n,) datetime64[D], ``coach`` (n,) int32."""
+
+    __slots__ = ("statuses", "dates", "coach", "coaches")
+
+    def __init__(self, statuses: np.ndarray, dates: np.ndarray, coach: np.ndarray, coaches: list):
+        self.statuses = np.ascontiguousarray(statuses, dtype=np.uint8).reshape(-1, N_CHAKRAS)
+        self.dates = np.asarray(dates, dtype="datetime64[D]")
+        self.coach = np.asarray(coach, dtype=np.int32)
+        self.coaches = list(coaches)   # coach id -> name
+
+    @classmethod
+    def from_payloads(cls, payloads: Iterable[dict]):
+        """Loads payloads shaped like complete_payload() output (missing chakras count as unknown)."""
+        codes = []
+        add_codes = codes.extend
+        date_ids, coach_ids = {}, {}   # distinct values are few: intern them while reading
+        date_idx, coach_idx = [], []
+        get = STATUS_CODES.get
+        for p in payloads:
+            chakras = p["chakras"]
+            add_codes([get(chakras[ch]["status"], UNKNOWN) if ch in chakras else UNKNOWN for ch in CHAKRAS])
+            date_idx.append(date_ids.setdefault(p.get("date") or "", len(date_ids)))
+            coach_idx.append(coach_ids.setdefault(p.get("coach_name") or "", len(coach_ids)))
+        if not codes:
+            return cls.empty()
+        dates = _parse_dates(list(date_ids))[np.array(date_idx, dtype=np.intp)]
+        # coach ids in name order, so results don't depend on input order
+        names = sorted(coach_ids)
+        remap = np.empty(len(names), dtype=np.int32)
+        for new, name in enumerate(names):
+            remap[coach_ids[name]] = new
+        coach = remap[np.array(coach_idx, dtype=np.intp)]
+        return cls(np.array(codes, dtype=np.uint8), dates, coach, names)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, N_CHAKRAS), np.uint8), np.zeros(0, "datetime64[D]"), np.zeros(0, np.int32), [])
+
+    def __len__(self):
+        return len(self.statuses)
+
+    def select(self, mask) -> "AssessmentFrame":
+        """Rows where ``mask`` is true (or the given row indices)."""
+        return AssessmentFrame(self.statuses[mask], self.dates[mask], self.coach[mask], self.coaches)
+
+    def for_coach(self, name: str) -> "AssessmentFrame":
+        if name not in self.coaches:
+            return self.select(np.zeros(len(self), dtype=bool))
+        return self.select(self.coach == self.coaches.index(name))
+
+    def between(self, start: Optional[datetime.date] = None, end: Optional[datetime.date] = None):
+        """Rows dated within [start, end]; undated rows are dropped when a bound is given."""
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.dates >= np.datetime64(start, "D")
+        if end is not None:
+            mask &= self.dates <= np.datetime64(end, "D")
+        return self.select(mask)
+
+    def scores(self) -> np.ndarray:
+        """(n, 7) STATUS_SCORE per chakra."""
+        return SCORE_TABLE[self.statuses]
+
+    def blocked(self) -> np.ndarray:
+        """(n, 7) bool, true where the chakra is Blocked / Underactive."""
+        return self.statuses == BLOCKED
+
+
+# --------------------------------------------------
+# AGGREGATES
+# --------------------------------------------------
+def status_distribution(frame: AssessmentFrame) -> np.ndarray:
+    """(7, 5) counts: rows follow CHAKRAS, columns STATUS_LABELS (last is unknown)."""
+    offsets = np.arange(N_CHAKRAS, dtype=np.intp) * (N_STATUS + 1)
+    flat = (frame.statuses.astype(np.intp) + offsets).ravel()
+    return np.bincount(flat, minlength=N_CHAKRAS * (N_STATUS + 1)).reshape(N_CHAKRAS, N_STATUS + 1)
+
+
+def mean_scores(frame: AssessmentFrame) -> np.ndarray:
+    """(7,) mean score per chakra (NaN with no rows)."""
+    if not len(frame):
+        return np.full(N_CHAKRAS, np.nan)
+    # mean over a lookup of counts is cheaper than materialising the (n, 7) scores
+    return status_distribution(frame) @ SCORE_TABLE / len(frame)
+
+
+def blocked_counts(frame: AssessmentFrame) -> np.ndarray:
+    """(n,) number of blocked chakras per assessment, as in the PDF summary."""
+    return frame.blocked().sum(axis=1, dtype=np.int32)
+
+
+def period_index(dates: np.ndarray, period: str = "month") -> np.ndarray:
+    """Start date of the day/week (Monday)/month each date falls in."""
+    if period == "day":
+        return dates
+    if period == "week":
+        days = dates.astype(np.int64)
+        # 1970-01-01 was a Thursday
+        return (days - (days + 3) % 7).astype("datetime64[D]")
+    if period == "month":
+        return dates.astype("datetime64[M]").astype("datetime64[D]")
+    raise ValueError(f"unknown period: {period!r}")
+
+
+def blocked_rate_by_period(frame: AssessmentFrame, period: str = "month"):
+    """Blocked-chakra percentage per coach and period.
+
+    Returns (coaches, periods, rates, counts): ``rates[c, t]`` is the share of
+    chakras that were blocked across coach c's assessments in period t
+    (NaN where there were none), ``counts[c, t]`` the number of assessments.
+    Undated assessments are left out.
+    """
+    dated = ~np.isnat(frame.dates)
+    starts = period_index(frame.dates[dated], period)
+    periods, t = np.unique(starts, return_inverse=True)
+    n_coaches, n_periods = len(frame.coaches), len(periods)
+    cell = frame.coach[dated].astype(np.intp) * n_periods + t.reshape(-1)
+    size = n_coaches * n_periods
+    counts = np.bincount(cell, minlength=size).reshape(n_coaches, n_periods)
+    blocked = np.bincount(cell, weights=blocked_counts(frame)[dated], minlength=size).reshape(n_coaches, n_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = blocked / (counts * N_CHAKRAS) * 100.0
+    return list(frame.coaches), periods, rates, counts
+
+
+def blocked_cooccurrence(frame: AssessmentFrame) -> np.ndarray:
+    """(7, 7) assessments in which both chakras were blocked; the diagonal is each chakra's total."""
+    b = frame.blocked().astype(np.float64)
+    return (b.T @ b).astype(np.int64)
+
+
+def summary(frame: AssessmentFrame) -> dict:
+    """Plain-dict overview, handy for st.json or an API response."""
+    dist = status_distribution(frame)
+    means = mean_scores(frame)
+    n = len(frame)
+    per_client = blocked_counts(frame)
+    return {
+        "assessments": n,
+        "coaches": len(frame.coaches),
+        "mean_blocked": float(per_client.mean()) if n else 0.0,
+        "chakras": {
+            ch: {
+                "mean_score": None if np.isnan(means[i]) else round(float(means[i]), 1),
+                "statuses": {label: int(dist[i, j]) for j, label in enumerate(STATUS_LABELS) if dist[i, j]},
+            }
+            for i, ch in enumerate(CHAKRAS)
+        },
+    }
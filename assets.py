@@ -0,0 +1,220 @@
+"""Process-wide report assets: the Soulful Academy logo.
+
+The logo is resolved and parsed for FPDF once per process. Downloading runs in
+a background thread, so a render never waits on the network: until the remote
+logo has arrived (or when offline), reports are drawn without one, as they
+were whenever the download failed. When several processes start at once
+(deploy.py), the first one to take the download lock fetches the file and the
+others pick it up from disk.
+"""
+import contextlib
+import os
+import tempfile
+import threading
+import time
+
+from instrument import span
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+LOGO_URL = "https://ik.imagekit.io/86edsgbur/Untitled%20design%20(73)%20(3)%20(1).jpg?updatedAt=1759258123716"
+LOGO_FILE = "soulful_logo.jpg"   # downloaded copy of LOGO_URL
+LOGO_PATH_ENV = "SOULFUL_LOGO_PATH"   # use this local file instead of downloading
+
+FETCH_TIMEOUT = 8
+RETRY_AFTER = 300   # seconds before a failed download is tried again
+
+
+def _parse_image(path: str):
+    # let FPDF do the decoding once; the resulting info dict is what it keeps per document
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    try:
+        with span("logo.decode"):
+            pdf.image(path, x=0, y=0, w=1)
+    except Exception:
+        return None
+    return pdf.images[path]
+
+
+def _write_atomic(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".logo-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+@contextlib.contextmanager
+def file_lock(path: str):
+    """Exclusive lock shared by every process (and thread) that opens ``path``.
+
+    flock where the platform has it; elsewhere only the atomic renames protect
+    shared files, and this is a no-op.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)   # closing releases the lock
+
+
+class LogoAsset:
+    def __init__(self, url: str = LOGO_URL, cache_file: str = LOGO_FILE, local_path: str = None,
+                 fallback: str = None):
+        self.url = url
+        self.cache_file = cache_file
+        self.local_path = local_path if local_path is not None else os.environ.get(LOGO_PATH_ENV, "")
+        self.fallback = fallback
+
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self._failed_at = None
+        self._path = None        # best file found so far
+        self._final = False      # True once _path is the real logo
+        self._parsed = {}        # path -> FPDF image info (None if unreadable)
+        self._done.set()         # nothing in flight yet
+
+    # ---------- resolving ----------
+    def _download_targets(self):
+        if not self.cache_file:
+            return []
+        # next to the app, or the temp dir when the working directory is read-only
+        return [self.cache_file, os.path.join(tempfile.gettempdir(), os.path.basename(self.cache_file))]
+
+    def _candidates(self):
+        if self.local_path:
+            yield self.local_path
+        yield from self._download_targets()
+
+    def _resolve(self):
+        for path in self._candidates():
+            if os.path.exists(path):
+                self._path, self._final = path, True
+                self._done.set()
+                return
+        if self.fallback and os.path.exists(self.fallback):
+            self._path = self.fallback
+        else:
+            self._path = ""
+
+    def path(self) -> str:
+        """Best logo file available right now; never touches the network."""
+        if self._path is None:
+            with self._lock:
+                if self._path is None:
+                    self._resolve()
+        return self._path
+
+    # ---------- fetching ----------
+    def prefetch(self):
+        """Starts downloading the logo in the background if we don't have it yet."""
+        self.path()
+        with self._lock:
+            if self._final or not self.url or not self.cache_file:
+                return
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._failed_at is not None and time.monotonic() - self._failed_at < RETRY_AFTER:
+                return
+            self._done.clear()
+            self._thread = threading.Thread(target=self._fetch, name="logo-prefetch", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until a started prefetch finishes; True if the real logo is available."""
+        self._done.wait(timeout)
+        return self._final
+
+    def _lock_path(self) -> str:
+        for path in self._download_targets():
+            if os.access(os.path.dirname(os.path.abspath(path)), os.W_OK):
+                return path + ".lock"
+        return os.path.join(tempfile.gettempdir(), "soulful-logo.lock")
+
+    def _fetch(self):
+        try:
+            with file_lock(self._lock_path()):
+                # another process may have fetched it while this one waited for the lock
+                target = next((p for p in self._download_targets() if os.path.exists(p)), None)
+                if target is None:
+                    target = self._download()
+            info = _parse_image(target) if target else None
+            if info is None:
+                raise OSError("could not store downloaded logo")
+            with self._lock:
+                self._parsed[target] = info
+                self._path, self._final = target, True
+                self._failed_at = None
+        except Exception:
+            with self._lock:
+                self._failed_at = time.monotonic()
+        finally:
+            self._done.set()
+
+    def _download(self):
+        import requests
+
+        with span("logo.download"):
+            r = requests.get(self.url, timeout=FETCH_TIMEOUT)
+            r.raise_for_status()
+        for path in self._download_targets():
+            try:
+                _write_atomic(path, r.content)
+                return path
+            except OSError:
+                continue
+        return None
+
+    # ---------- FPDF ----------
+    def image_info(self):
+        """(name, parsed FPDF image info) for the current logo, or None."""
+        path = self.path()
+        if not path:
+            return None
+        if path not in self._parsed:
+            with self._lock:
+                if path not in self._parsed:
+                    self._parsed[path] = _parse_image(path)
+        info = self._parsed[path]
+        return (path, info) if info else None
+
+    def data(self):
+        """Raw bytes of the current logo, for showing it outside the PDF."""
+        path = self.path()
+        if not path:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def place(self, pdf, x: float, y: float, w: float) -> bool:
+        """Draws the logo on the current page, reusing the image parsed for earlier documents."""
+        found = self.image_info()
+        if found is None:
+            return False
+        name, info = found
+        if name not in pdf.images:
+            # FPDF numbers images per document and strips 'data' once written, so each gets a copy
+            pdf.images[name] = dict(info, i=len(pdf.images) + 1)
+        pdf.image(name, x=x, y=y, w=w)
+        return True
+
+
+LOGO = LogoAsset()
@@ -0,0 +1,373 @@
+"""Headless batch rendering of chakra reports.
+
+Reads payloads shaped like the one main() builds (JSONL/JSON, or CSV with one
+row per client) and renders them with make_pdf across a process pool.
+
+    python batch.py retreat.csv --out reports/
+    python batch.py retreat.jsonl --zip retreat_reports.zip --workers 8
+    python batch.py retreat.csv --out reports/ --email --rate 2
+
+With --email, rows that have an "email" column/key get their report mailed
+(SMTP settings from SOULFUL_SMTP_HOST/PORT/USER/PASS/FROM).
+"""
+import argparse
+import csv
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import unicodedata
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+from assets import FETCH_TIMEOUT, LOGO
+from report import CHAKRAS, complete_payload, make_pdf, report_filename
+
+# --------------------------------------------------
+# INPUT
+# --------------------------------------------------
+# CSV columns per chakra: root_status, root_notes, root_remedies, root_crystals, ...
+CHAKRA_FIELDS = ("status", "notes", "remedies", "crystals")
+PAYLOAD_FIELDS = ("client_name", "gender", "coach_name", "date", "goal", "follow_up", "affirmations")
+
+
+def chakra_slug(chakra: str) -> str:
+    return chakra.split(" (")[0].lower().replace(" ", "_")
+
+
+def payload_from_row(row: dict) -> dict:
+    """Turns one flat CSV row into a (partial) payload dict."""
+    payload = {k: row[k] for k in PAYLOAD_FIELDS if row.get(k)}
+    chakras = {}
+    for ch in CHAKRAS:
+        slug = chakra_slug(ch)
+        entry = {f: row[f"{slug}_{f}"] for f in CHAKRA_FIELDS if row.get(f"{slug}_{f}")}
+        if entry:
+            chakras[ch] = entry
+    payload["chakras"] = chakras
+    if row.get("email"):
+        payload["email"] = row["email"]
+    return payload
+
+
+class BadInput:
+    """Stands in for an input record that couldn't be read; iter_render reports it as a failed item."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def _text_lines(f, bad: list) -> Iterator[str]:
+    # decodes a binary file line by line: a line that isn't UTF-8 is noted in ``bad``
+    # and skipped, instead of failing the whole read
+    for number, line in enumerate(f, 1):
+        try:
+            yield line.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError as e:
+            bad.append(BadInput(f"line {number}: not UTF-8 ({e.reason})"))
+
+
+def _json_lines(f) -> Iterator:
+    for number, line in enumerate(f, 1):
+        try:
+            text = line.decode("utf-8-sig" if number == 1 else "utf-8")
+            if text.strip():
+                yield json.loads(text)
+        except ValueError as e:   # includes UnicodeDecodeError
+            yield BadInput(f"line {number}: invalid JSON ({e})")
+
+
+def read_payloads(path: str) -> Iterator:
+    """Yields payloads from a .csv, .json or .jsonl file ('-' reads JSONL from stdin).
+
+    Records that can't be read are yielded as BadInput, so the rest of the file still renders.
+    """
+    if path == "-":
+        yield from _json_lines(sys.stdin.buffer)
+        return
+
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:   # includes UnicodeDecodeError
+                yield BadInput(f"invalid JSON ({e})")
+                return
+        if not isinstance(data, list):
+            yield BadInput(f"expected a JSON list of payloads, got {type(data).__name__}")
+            return
+        yield from data
+        return
+
+    with open(path, "rb") as f:
+        if ext != ".csv":
+            yield from _json_lines(f)
+            return
+        bad = []
+        reader = csv.DictReader(_text_lines(f, bad))
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                break
+            except csv.Error as e:
+                row = BadInput(f"line {reader.line_num}: invalid CSV ({e})")
+            yield from bad
+            bad.clear()
+            yield payload_from_row(row) if isinstance(row, dict) else row
+        yield from bad
+
+
+# --------------------------------------------------
+# RENDERING
+# --------------------------------------------------
+@dataclass
+class BatchResult:
+    index: int
+    client_name: str
+    filename: str = ""
+    email: str = ""
+    pdf_bytes: Optional[bytes] = None
+    error: str = ""
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+@dataclass
+class BatchSummary:
+    total: int = 0
+    rendered: int = 0
+    errors: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.rendered / self.seconds if self.seconds else 0.0
+
+
+def safe_filename(name: str) -> str:
+    name = re.sub(r"[^\w.\- ]+", "_", name).strip(" .")
+    return name or "report"
+
+
+def ascii_slug(text: str) -> str:
+    """ASCII-only form of ``text`` for filenames (accents dropped); "" if nothing is left, e.g. for Devanagari."""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^A-Za-z0-9.\-]+", "_", text).strip("_.")
+
+
+def _describe(raw) -> tuple:
+    # (client name, email) for reporting, whatever shape the row has
+    if not isinstance(raw, dict):
+        return "", ""
+    return str(raw.get("client_name") or ""), str(raw.get("email") or "").strip()
+
+
+def _render_one(index: int, raw: dict) -> BatchResult:
+    # runs in the worker process; any failure is reported, not raised
+    client_name, email = _describe(raw)
+    start = time.perf_counter()
+    try:
+        if not isinstance(raw, dict):
+            raise ValueError(f"expected a JSON object, got {type(raw).__name__}")
+        payload = complete_payload(raw)
+        pdf_bytes = make_pdf(payload)
+    except Exception as e:
+        return BatchResult(index, client_name, email=email, error=f"{type(e).__name__}: {e}",
+                           seconds=time.perf_counter() - start)
+    filename = f"{index:05d}_{safe_filename(report_filename(payload['client_name']))}"
+    return BatchResult(index, client_name, filename, email, pdf_bytes, seconds=time.perf_counter() - start)
+
+
+def iter_render(payloads: Iterable[dict], workers: Optional[int] = None,
+                max_in_flight: Optional[int] = None) -> Iterator[BatchResult]:
+    """Renders payloads in a process pool, yielding results as they finish.
+
+    At most ``max_in_flight`` payloads are queued at once, so an arbitrarily
+    long input stream never piles up in memory. Results arrive in completion
+    order; use ``BatchResult.index`` to match them back to the input. A worker
+    that dies (e.g. killed for memory) fails the payloads it had in flight,
+    and the rest of the batch carries on in a new pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+
+    # settle the logo once up front so every report in the batch gets the same one,
+    # and forked workers inherit the parsed image instead of decoding it again
+    LOGO.prefetch()
+    LOGO.wait(FETCH_TIMEOUT)
+    LOGO.image_info()
+
+    pending = {}   # future -> (index, client name, email)
+
+    def finished(done) -> Iterator[BatchResult]:
+        for fut in done:
+            index, client_name, email = pending.pop(fut)
+            try:
+                yield fut.result()
+            except Exception as e:
+                yield BatchResult(index, client_name, email=email, error=f"{type(e).__name__}: {e}")
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for index, raw in enumerate(payloads):
+            if isinstance(raw, BadInput):
+                yield BatchResult(index, "", error=raw.error)
+                continue
+            if len(pending) >= max_in_flight:
+                yield from finished(wait(pending, return_when=FIRST_COMPLETED).done)
+            try:
+                fut = pool.submit(_render_one, index, raw)
+            except BrokenProcessPool:
+                yield from finished(wait(pending).done)   # all failed with the pool
+                pool.shutdown(wait=False)
+                pool = ProcessPoolExecutor(max_workers=workers)
+                fut = pool.submit(_render_one, index, raw)
+            pending[fut] = (index, *_describe(raw))
+        while pending:
+            yield from finished(wait(pending, return_when=FIRST_COMPLETED).done)
+    finally:
+        pool.shutdown()
+
+
+def render_batch(payloads: Iterable[dict], out_dir: Optional[str] = None, zip_path: Optional[str] = None,
+                 workers: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 on_result: Optional[Callable[[BatchResult], None]] = None) -> BatchSummary:
+    """Renders every payload and streams the PDFs to ``out_dir`` and/or ``zip_path``.
+
+    Failed items are collected in ``BatchSummary.errors`` and never stop the batch.
+    """
+    summary = BatchSummary()
+    start = time.perf_counter()
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    zf = zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) if zip_path else None
+    try:
+        for result in iter_render(payloads, workers, max_in_flight):
+            summary.total += 1
+            if result.ok:
+                if out_dir:
+                    with open(os.path.join(out_dir, result.filename), "wb") as f:
+                        f.write(result.pdf_bytes)
+                if zf:
+                    zf.writestr(result.filename, result.pdf_bytes)
+                summary.rendered += 1
+            else:
+                summary.errors.append(result)
+            if on_result:
+                on_result(result)
+            result.pdf_bytes = None
+    finally:
+        if zf:
+            zf.close()
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Render chakra reports in bulk.")
+    parser.add_argument("input", help="payloads as .csv, .json or .jsonl ('-' for JSONL on stdin)")
+    parser.add_argument("--out", help="directory to write PDFs into")
+    parser.add_argument("--zip", dest="zip_path", help="zip file to write PDFs into")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="payloads queued at once (default: 2 x workers)")
+    parser.add_argument("--email", action="store_true", help="email each report to its row's address")
+    parser.add_argument("--connections", type=int, default=3, help="SMTP sessions used with --email")
+    parser.add_argument("--rate", type=float, default=None, help="max emails per second with --email")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    if not args.out and not args.zip_path and not args.email:
+        parser.error("give --out, --zip and/or --email")
+    if args.connections < 1:
+        parser.error("--connections must be at least 1")
+
+    # --email: reports go to send_bulk as they are rendered, through a small queue,
+    # so rendering waits for the mailer instead of holding every PDF until the end
+    outbox = queue.Queue(maxsize=args.connections * 2)
+    sent, mail_errors = [], []
+    mail_thread = None
+
+    def mailed(result):
+        if not result.ok:
+            print(f"  email to {result.to}: {result.error}", file=sys.stderr)
+        elif not args.quiet:
+            print(f"  emailed {result.filename} to {result.to}")
+
+    def outbox_jobs():
+        while True:
+            job = outbox.get()
+            if job is None:
+                return
+            yield job
+
+    def mail():
+        from mailer import SmtpConfig, send_bulk
+
+        try:
+            sent.extend(send_bulk(SmtpConfig.from_env(), outbox_jobs(), args.connections, args.rate,
+                                  on_result=mailed))
+        except Exception as e:
+            mail_errors.append(f"{type(e).__name__}: {e}")
+
+    def queue_email(job) -> bool:
+        while mail_thread.is_alive():
+            try:
+                outbox.put(job, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def report(result: BatchResult):
+        if not result.ok:
+            print(f"[{result.index}] {result.client_name or '?'}: {result.error}", file=sys.stderr)
+            return
+        if not args.quiet:
+            print(f"[{result.index}] {result.filename} ({result.seconds * 1000:.0f} ms)")
+        if args.email and result.email:
+            queue_email((result.email, result.pdf_bytes, report_filename(result.client_name.strip()),
+                         result.client_name.strip()))
+
+    start = time.perf_counter()
+    if args.email:
+        mail_thread = threading.Thread(target=mail, name="batch-mail", daemon=True)
+        mail_thread.start()
+    try:
+        summary = render_batch(read_payloads(args.input), args.out, args.zip_path,
+                               args.workers, args.max_in_flight, on_result=report)
+    finally:
+        if mail_thread is not None:
+            queue_email(None)
+    print(f"{summary.rendered}/{summary.total} reports in {summary.seconds:.1f}s "
+          f"({summary.per_second:.1f}/s), {len(summary.errors)} failed")
+    if not args.email:
+        return 1 if summary.errors else 0
+
+    mail_thread.join()
+    if mail_errors:
+        print(f"emailing stopped: {mail_errors[0]}", file=sys.stderr)
+    failed = [r for r in sent if not r.ok]
+    print(f"{len(sent) - len(failed)}/{len(sent)} emails sent in {time.perf_counter() - start:.1f}s, "
+          f"{len(failed)} failed")
+    return 1 if summary.errors or failed or mail_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Cohort aggregates: NumPy columns vs. looping over payload dicts.
+
+    python benchmarks/bench_analytics.py --n 200000
+"""
+import argparse
+import datetime
+import random
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+import common  # noqa: F401 (puts the repo on sys.path)
+
+from analytics import (AssessmentFrame, blocked_cooccurrence, blocked_rate_by_period, mean_scores,
+                       status_distribution)
+from report import CHAKRAS, DATE_FORMAT, STATUS_OPTIONS, STATUS_SCORE
+
+COACHES = ["Rekha Babulkar", "Anita Rao", "Meera Shah", "Kiran Patel", "Dev Malhotra"]
+
+
+def make_payloads(n: int, seed: int):
+    rng = random.Random(seed)
+    start = datetime.date(2023, 1, 1)
+    weights = [5, 3, 2, 2]
+    out = []
+    for _ in range(n):
+        statuses = rng.choices(STATUS_OPTIONS, weights, k=len(CHAKRAS))
+        out.append({
+            "coach_name": rng.choice(COACHES),
+            "date": (start + datetime.timedelta(days=rng.randrange(900))).strftime(DATE_FORMAT),
+            "chakras": {ch: {"status": s} for ch, s in zip(CHAKRAS, statuses)},
+        })
+    return out
+
+
+# ---------- the dict-at-a-time way ----------
+def loop_aggregates(payloads):
+    dist = {ch: Counter() for ch in CHAKRAS}
+    score_sum = defaultdict(float)
+    by_month = defaultdict(lambda: [0, 0])
+    pairs = Counter()
+    for p in payloads:
+        blocked = []
+        for ch in CHAKRAS:
+            s = p["chakras"][ch]["status"]
+            dist[ch][s] += 1
+            score_sum[ch] += STATUS_SCORE.get(s, 60)
+            if s == "Blocked / Underactive":
+                blocked.append(ch)
+        d = datetime.datetime.strptime(p["date"], DATE_FORMAT).date().replace(day=1)
+        cell = by_month[(p["coach_name"], d)]
+        cell[0] += 1
+        cell[1] += len(blocked)
+        for a in blocked:
+            for b in blocked:
+                pairs[(a, b)] += 1
+    means = {ch: score_sum[ch] / len(payloads) for ch in CHAKRAS}
+    rates = {k: blocked / (count * 7) * 100 for k, (count, blocked) in by_month.items()}
+    return dist, means, rates, pairs
+
+
+def vector_aggregates(frame):
+    return (status_distribution(frame), mean_scores(frame), blocked_rate_by_period(frame, "month"),
+            blocked_cooccurrence(frame))
+
+
+def check(loop, vec):
+    dist, means, rates, pairs = loop
+    vdist, vmeans, (coaches, periods, vrates, _), vpairs = vec
+    for i, ch in enumerate(CHAKRAS):
+        assert [dist[ch][s] for s in STATUS_OPTIONS] == vdist[i, :len(STATUS_OPTIONS)].tolist(), ch
+        assert abs(means[ch] - vmeans[i]) < 1e-9, ch
+        for j, other in enumerate(CHAKRAS):
+            assert pairs[(ch, other)] == vpairs[i, j]
+    for (coach, month), rate in rates.items():
+        c = coaches.index(coach)
+        t = int(np.searchsorted(periods, np.datetime64(month, "D")))
+        assert abs(vrates[c, t] - rate) < 1e-9
+
+
+def best_of(fn, *args, repeat=3):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=200_000, help="assessments")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.n, args.seed)
+    frame, t_load = best_of(AssessmentFrame.from_payloads, payloads, repeat=1)
+    loop, t_loop = best_of(loop_aggregates, payloads, repeat=1)
+    vec, t_vec = best_of(vector_aggregates, frame)
+    check(loop, vec)
+
+    print(f"{args.n} assessments, {len(frame.coaches)} coaches, results identical")
+    print(f"columnar frame: {frame.statuses.nbytes + frame.dates.nbytes + frame.coach.nbytes:,} bytes, "
+          f"loaded in {t_load * 1000:.0f} ms")
+    print(f"dict loop       {t_loop * 1000:9.1f} ms")
+    print(f"numpy           {t_vec * 1000:9.1f} ms   ({t_loop / t_vec:.0f}x)")
+    for name, fn in (("status_distribution", status_distribution), ("mean_scores", mean_scores),
+                     ("blocked_rate_by_period", blocked_rate_by_period), ("blocked_cooccurrence", blocked_cooccurrence)):
+        _, t = best_of(fn, frame)
+        print(f"  {name:<24} {t * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""clean_txt against the original chained str.replace + re.sub version.
+
+Checks both produce identical output on fuzzed input, then times typical inputs.
+
+    python benchmarks/bench_clean_txt.py
+"""
+import argparse
+import random
+import re
+import timeit
+
+import common  # noqa: F401 (puts the repo on sys.path)
+
+from report import DEFAULT_FOLLOW_UP, PREDEFINED_INFO, clean_txt
+
+
+def clean_txt_reference(text: str) -> str:
+    if not text:
+        return ""
+    text = text.replace("•", "- ")
+    text = text.replace("–", "-")
+    text = text.replace("—", "-")
+    text = text.replace("’", "'").replace("‘", "'")
+    text = text.replace("“", '"').replace("”", '"')
+    text = re.sub(r"[^\x00-\xFF]", "", text)
+    return text
+
+
+SPECIALS = "•–—’‘“”éñü ऀकि€\U0001f33f\ud800"
+
+
+def fuzz(rng: random.Random, n: int):
+    alphabet = "abc XYZ 019.,;:'\"\n" + SPECIALS
+    for _ in range(n):
+        yield "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fuzz", type=int, default=20000, help="random strings to compare")
+    parser.add_argument("--number", type=int, default=20000, help="calls per timing")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    for text in fuzz(rng, args.fuzz):
+        if clean_txt(text) != clean_txt_reference(text):
+            raise SystemExit(f"mismatch for {text!r}")
+    print(f"{args.fuzz} fuzzed strings identical")
+
+    cases = {
+        "ascii label": "Detailed Chakra Guidance",
+        "predefined note": PREDEFINED_INFO["Heart (Anahata)"]["Blocked / Underactive"]["notes"],
+        "follow-up (dashes)": DEFAULT_FOLLOW_UP,
+        "hindi name": "Client: अनु Sharma",
+        "smart quotes": "“My voice matters” – she’s ready • next step",
+    }
+    for label, text in cases.items():
+        old = timeit.timeit(lambda: clean_txt_reference(text), number=args.number)
+        new = timeit.timeit(lambda: clean_txt(text), number=args.number)
+        print(f"{label:<20} reference {old / args.number * 1e6:7.2f} us   "
+              f"clean_txt {new / args.number * 1e6:7.2f} us   {old / new:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Memory per assessment: payload dicts vs CompactAssessment.
+
+Builds a history of --n assessments (clients and coaches repeat, a share of
+chakras carries coach-written notes) and measures what keeping it in memory
+costs with tracemalloc. Dict payloads are measured on --dict-n records and
+scaled up, since a million of them doesn't fit in a small machine: once as
+complete_payload builds them (predefined text shared with the tables) and
+once loaded from JSON (every record with its own copies).
+
+    python benchmarks/bench_compact.py --n 1000000 --dict-n 50000
+"""
+import argparse
+import datetime
+import gc
+import json
+import random
+import tracemalloc
+
+from common import random_payload
+
+from compact import CompactAssessment
+from report import DATE_FORMAT
+
+
+def payloads(n: int, clients: int, coaches: int, edited: float, seed: int):
+    rng = random.Random(seed)
+    start = datetime.date(2023, 1, 1)
+    for i in range(n):
+        p = random_payload(rng, 0, edited)
+        # fresh str objects each time, as if read from a file or the network
+        p["client_name"] = "Client %d" % rng.randrange(clients)
+        p["coach_name"] = "Coach %d" % rng.randrange(coaches)
+        p["date"] = (start + datetime.timedelta(days=rng.randrange(1000))).strftime(DATE_FORMAT)
+        yield p
+
+
+def footprint(records) -> float:
+    """Bytes per record to hold everything ``records`` yields (slow: tracemalloc sees every allocation)."""
+    gc.collect()
+    tracemalloc.start()
+    held = list(records)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(held)
+    del held
+    return current / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=1_000_000, help="assessments held as CompactAssessment")
+    parser.add_argument("--dict-n", type=int, default=50_000, help="assessments held as dicts (scaled to --n)")
+    parser.add_argument("--clients", type=int, default=20_000)
+    parser.add_argument("--coaches", type=int, default=25)
+    parser.add_argument("--edited", type=float, default=0.05, help="chance a chakra has coach notes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    def gen(n):
+        return payloads(n, args.clients, args.coaches, args.edited, args.seed)
+
+    shared = footprint(gen(args.dict_n))
+    loaded = footprint(json.loads(json.dumps(p)) for p in gen(args.dict_n))
+    compact = footprint(CompactAssessment.from_payload(p) for p in gen(args.n))
+
+    scale = args.n / 1e6
+    print(f"{args.n:,} assessments, {args.clients:,} clients, {args.edited:.0%} of chakras edited")
+    print(f"dict (complete_payload)   {shared:8.0f} B/assessment   ~{shared * scale:7.0f} MB")
+    print(f"dict (loaded from JSON)   {loaded:8.0f} B/assessment   ~{loaded * scale:7.0f} MB")
+    print(f"CompactAssessment         {compact:8.0f} B/assessment    {compact * scale:7.0f} MB")
+    print(f"smaller by {shared / compact:.1f}x (shared text), {loaded / compact:.1f}x (from JSON)")
+
+
+if __name__ == "__main__":
+    main()
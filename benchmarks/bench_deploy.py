@@ -0,0 +1,61 @@
+"""deploy.py service mode: throughput and latency as worker processes are added.
+
+For each --workers count, starts `deploy.py service` with a fresh state
+directory (so the shared PDF cache starts cold), runs loadtest's clients
+against the balancer for --duration seconds, and stops it again. With
+--repeat > 0 some requests re-send an earlier report, which the balancer may
+route to a different worker than the first time; those are served from the
+shared disk cache.
+
+    python benchmarks/bench_deploy.py --workers 1,2,4 --clients 8 --repeat 0.3
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+
+from loadtest import free_port, run_level
+
+import deploy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker process counts")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per worker count")
+    parser.add_argument("--repeat", type=float, default=0.3, help="share of requests re-sending an earlier payload")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.repeat:.0%} repeats")
+    for n in (int(x) for x in args.workers.split(",")):
+        with tempfile.TemporaryDirectory() as state:
+            port, first = free_port(), free_port()
+            env = dict(os.environ, SOULFUL_STATE_DIR=state)
+            for name in ("SOULFUL_DB_PATH", "SOULFUL_PDF_CACHE_DIR", "SOULFUL_MAIL_DEAD_LETTER"):
+                env.pop(name, None)
+            proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "deploy.py"), "service",
+                                     "--workers", str(n), "--port", str(port), "--backend-port", str(first)],
+                                    env=env, stdout=subprocess.PIPE, text=True)
+            try:
+                if not deploy.wait_for_port(port, proc=proc):
+                    print(f"{n} workers: balancer didn't start")
+                    continue
+                r = run_level("127.0.0.1", port, args.clients, args.duration, args.repeat, args.seed)
+            finally:
+                proc.send_signal(signal.SIGINT)
+                summary = proc.communicate(timeout=30)[0].strip().splitlines()[-1]
+            cached = sum(name.endswith(".pdf") for _, _, names in os.walk(os.path.join(state, "pdf_cache"))
+                         for name in names)
+        print(f"{n:3d} workers  {r['ok_per_s']:7.1f} PDFs/s   p50 {r['p50_ms']:7.1f} ms   "
+              f"p95 {r['p95_ms']:7.1f} ms   429 {r['rejected']:5.1%}   {cached} PDFs cached")
+        print(f"             {summary}")
+
+
+if __name__ == "__main__":
+    main()
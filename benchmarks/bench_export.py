@@ -0,0 +1,99 @@
+"""Bulk export: streamed zip vs rendering everything first, memory and throughput.
+
+Fills a temporary store with --sizes random assessments and exports each one
+as a zip into a write-only sink that can't seek, sampling this process's
+resident memory as it goes. The baseline renders every PDF into a list and
+then zips them into memory, which is what clicking through downloads and
+zipping them by hand amounts to; it only runs up to --materialize-max
+assessments.
+
+    python benchmarks/bench_export.py --sizes 1000,5000,20000 --workers 4
+"""
+import argparse
+import io
+import os
+import random
+import resource
+import tempfile
+import time
+import zipfile
+
+from common import random_payload
+
+from export import export_selection
+from report import make_pdf
+from store import AssessmentStore
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Sink:
+    """Write-only, unseekable: counts bytes like a socket or pipe would take them."""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data) -> int:
+        self.bytes += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def materialized(store: AssessmentStore):
+    """(zip size, RSS in MB while the PDFs and the zip are all held)."""
+    pdfs = [(a.id, make_pdf(a.payload)) for a in store.select()]
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for aid, pdf_bytes in pdfs:
+            zf.writestr(f"{aid:06d}.pdf", pdf_bytes)
+    return buf.getbuffer().nbytes, rss_mb()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,5000", help="comma-separated assessment counts")
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    parser.add_argument("--materialize-max", type=int, default=5000, help="largest size the baseline runs at")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(x) for x in args.sizes.split(",")):
+            store = AssessmentStore(os.path.join(tmp, f"export_{n}.db"))
+            store.save_many(random_payload(rng, i, edited=0.2) for i in range(n))
+
+            before = peak = rss_mb()
+
+            def sample(item):
+                nonlocal peak
+                if item.assessment.id % 50 == 0:
+                    peak = max(peak, rss_mb())
+
+            sink = Sink()
+            summary = export_selection(sink, store, workers=args.workers, max_in_flight=args.max_in_flight,
+                                       on_item=sample)
+            print(f"{n:6d} assessments  streamed      {summary.per_second:7.1f}/s   "
+                  f"{sink.bytes / 2 ** 20:7.1f} MB zip   RSS +{peak - before:6.1f} MB")
+
+            if n <= args.materialize_max:
+                before = rss_mb()
+                start = time.perf_counter()
+                size, held = materialized(store)
+                took = time.perf_counter() - start
+                print(f"{'':19s}materialized  {n / took:7.1f}/s   {size / 2 ** 20:7.1f} MB zip   "
+                      f"RSS +{held - before:6.1f} MB")
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Per-report cost of an embedded Unicode font, with and without the shared pool.
+
+Each mode renders --reports random reports in a fresh interpreter:
+
+    core      the built-in Helvetica (no SOULFUL_FONT_PATH)
+    add_font  the TTF registered with FPDF.add_font on every document, as
+              fpdf documents it (metrics re-read, file re-parsed and subset
+              on every output)
+    pooled    the TTF through fonts.py: parsed and subset once per process
+
+    python benchmarks/bench_fonts.py --font /usr/share/fonts/truetype/dejavu/DejaVuSans.ttf
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+MODES = ("core", "add_font", "pooled")
+
+
+def child(mode: str, reports: int, seed: int):
+    import random
+    import time
+
+    from common import random_payload
+
+    import fonts
+    from report import make_pdf
+
+    if mode == "add_font":
+        import fpdf.fpdf
+        from fpdf import FPDF
+
+        fpdf.fpdf.FPDF_CACHE_MODE = 1   # no .pkl files next to the font
+
+        def naive_document():
+            pdf = FPDF()
+            for style, path in fonts.FONT_FILES.items():
+                pdf.add_font(fonts.FAMILY, style, path, uni=True)
+            return pdf
+
+        fonts.new_document = naive_document
+
+    rng = random.Random(seed)
+    names = ["Asha Sharma", "आशा शर्मा", "Łukasz Żmuda", "Zoë Brontë", "Chloé Renée"]
+    payloads = []
+    for i in range(reports + 1):
+        payload = random_payload(rng, i, edited=0.2)
+        payload["client_name"] = rng.choice(names)
+        payloads.append(payload)
+    start = time.perf_counter()
+    make_pdf(payloads[0])
+    first = time.perf_counter() - start
+    seconds, sizes = [], []
+    for payload in payloads[1:]:
+        start = time.perf_counter()
+        sizes.append(len(make_pdf(payload)))
+        seconds.append(time.perf_counter() - start)
+    print(json.dumps({"first": first, "seconds": seconds, "size": sum(sizes) / len(sizes)}))
+
+
+def measure(mode: str, font: str, bold: str, reports: int, seed: int) -> dict:
+    env = {k: v for k, v in os.environ.items() if not k.startswith("SOULFUL_FONT_")}
+    if mode != "core":
+        env["SOULFUL_FONT_PATH"] = font
+        if bold:
+            env["SOULFUL_FONT_BOLD_PATH"] = bold
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode,
+                          "--reports", str(reports), "--seed", str(seed)],
+                         env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--font", default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", help="Unicode TTF")
+    parser.add_argument("--bold", help="bold TTF (default: --font)")
+    parser.add_argument("--reports", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.reports, args.seed)
+        return
+
+    from common import describe
+
+    results = {mode: measure(mode, args.font, args.bold, args.reports, args.seed) for mode in MODES}
+    for mode, r in results.items():
+        print(describe(mode, r["seconds"]) + f"   first {r['first'] * 1000:7.1f} ms   {r['size'] / 1024:6.1f} KiB")
+    naive, pooled = results["add_font"], results["pooled"]
+    print(f"pooled vs add_font: {sum(naive['seconds']) / sum(pooled['seconds']):.1f}x faster per report")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Preview-as-you-edit: full make_pdf vs. incremental re-render.
+
+Simulates a coach working through a session: each step changes one chakra's
+status (sometimes with edited notes) and re-renders the report.
+
+    python benchmarks/bench_incremental.py --steps 500
+"""
+import argparse
+import copy
+import random
+
+from common import describe, random_payload, timed
+
+from incremental import SectionCache, render_incremental
+from report import CHAKRAS, STATUS_OPTIONS, build_pdf, default_chakra_entry, make_pdf
+from template import PAGE_TEMPLATE
+
+
+def edits(steps: int, edited: float, seed: int):
+    rng = random.Random(seed)
+    payload = random_payload(rng, 0)
+    for _ in range(steps):
+        payload = copy.deepcopy(payload)
+        ch = rng.choice(CHAKRAS)
+        payload["chakras"][ch] = default_chakra_entry(ch, rng.choice(STATUS_OPTIONS))
+        if rng.random() < edited:
+            payload["chakras"][ch]["notes"] += " Coach note: " + " ".join(
+                rng.choice(["tension", "grief", "hope", "fear", "joy"]) for _ in range(rng.randint(5, 60)))
+        yield payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=300, help="edits in the simulated session")
+    parser.add_argument("--edited", type=float, default=0.2, help="share of edits that also change the notes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    cache = SectionCache()
+    full, incremental, uncompressed, layout_full, layout_inc = [], [], [], [], []
+    for payload in edits(args.steps, args.edited, args.seed):
+        full.append(timed(make_pdf, payload)[1])
+        incremental.append(timed(render_incremental, payload, cache)[1])
+        uncompressed.append(timed(render_incremental, payload, cache, False)[1])
+        layout_full.append(timed(build_pdf, payload)[1])
+        layout_inc.append(timed(build_pdf, payload, PAGE_TEMPLATE, cache)[1])
+
+    print(f"{args.steps} edits")
+    print(describe("make_pdf", full))
+    print(describe("render_incremental", incremental))
+    print(describe("  without deflate", uncompressed))
+    print(describe("  layout only, full", layout_full))
+    print(describe("  layout only, incr.", layout_inc))
+    print(f"speed-up: {sum(full) / sum(incremental):.2f}x (layout {sum(layout_full) / sum(layout_inc):.2f}x)   "
+          f"{cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Sustained email throughput against a local stand-in SMTP server.
+
+Compares the old connect-login-send-quit per message with the background
+Mailer (one reused SMTP session) and send_bulk (a few sessions in parallel).
+Needs aiosmtpd (pip install aiosmtpd).
+
+    python benchmarks/bench_mailer.py --n 500 --fail-rate 0.05 --connections 4
+"""
+import argparse
+import asyncio
+import random
+import smtplib
+import socket
+import tempfile
+import threading
+import time
+
+import common  # noqa: F401 (puts the repo on sys.path)
+
+from aiosmtpd.controller import Controller
+
+from mailer import Mailer, SmtpConfig, build_report_email, send_bulk
+
+
+class CountingHandler:
+    """Accepts everything, except a random share answered with 451 (try again later).
+
+    ``handshake`` seconds are spent in EHLO, standing in for the TLS + AUTH
+    round trips a real provider costs on every new connection; ``latency``
+    is spent on every message (MAIL/RCPT/DATA round trips).
+    """
+
+    def __init__(self, fail_rate: float, seed: int, handshake: float = 0.0, latency: float = 0.0):
+        self.fail_rate = fail_rate
+        self.handshake = handshake
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.accepted = 0
+        self.deferred = 0
+        self.lock = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        if self.handshake:
+            await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        with self.lock:
+            if self.rng.random() < self.fail_rate:
+                self.deferred += 1
+                return "451 4.3.0 try again later"
+            self.accepted += 1
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def connect_per_message(cfg: SmtpConfig, messages):
+    for msg in messages:
+        with smtplib.SMTP(cfg.host, cfg.port, timeout=cfg.timeout) as smtp:
+            try:
+                smtp.send_message(msg)
+            except smtplib.SMTPResponseException:
+                pass   # no retries in the old path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=300, help="messages per run")
+    parser.add_argument("--pdf-kb", type=int, default=40, help="attachment size")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of DATA commands answered with 451")
+    parser.add_argument("--connections", type=int, default=3, help="SMTP sessions for send_bulk")
+    parser.add_argument("--handshake-ms", type=float, default=30, help="simulated connect/login latency")
+    parser.add_argument("--latency-ms", type=float, default=15, help="simulated per-message latency")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    handler = CountingHandler(args.fail_rate, args.seed, args.handshake_ms / 1000, args.latency_ms / 1000)
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        cfg = SmtpConfig(host="127.0.0.1", port=port, use_ssl=False, from_addr="coach@example.com")
+        pdf = b"%PDF-1.3\n" + b"x" * (args.pdf_kb * 1024)
+        messages = [build_report_email(cfg.sender, f"client{i}@example.com", pdf,
+                                       f"Client_{i}_chakra_report.pdf", f"Client {i}") for i in range(args.n)]
+
+        start = time.perf_counter()
+        connect_per_message(cfg, messages)
+        old = time.perf_counter() - start
+        old_accepted = handler.accepted
+        print(f"connect per message   {args.n / old:8.1f} msg/s   delivered {old_accepted}/{args.n}")
+
+        handler.accepted = 0
+        with tempfile.TemporaryDirectory() as tmp:
+            mailer = Mailer(cfg, queue_size=args.n, backoff=0.01, max_backoff=0.1,
+                            dead_letter_path=f"{tmp}/dead.jsonl")
+            start = time.perf_counter()
+            queued_at = time.perf_counter()
+            deliveries = [mailer.send(msg) for msg in messages]
+            queued = time.perf_counter() - queued_at
+            for d in deliveries:
+                d.wait(60)
+            new = time.perf_counter() - start
+            mailer.stop()
+        sent = sum(d.ok for d in deliveries)
+        print(f"background mailer     {args.n / new:8.1f} msg/s   delivered {sent}/{args.n}   "
+              f"(send() {queued / args.n * 1e6:.0f} us/msg, {mailer.stats()})")
+        print(f"speed-up: {old / new:.2f}x")
+
+        handler.accepted = 0
+        jobs = ((f"client{i}@example.com", pdf, f"Client_{i}_chakra_report.pdf", f"Client {i}")
+                for i in range(args.n))
+        start = time.perf_counter()
+        results = send_bulk(cfg, jobs, connections=args.connections, backoff=0.01)
+        bulk = time.perf_counter() - start
+        sent = sum(r.ok for r in results)
+        retried = sum(r.attempts - 1 for r in results)
+        print(f"send_bulk x{args.connections:<2}         {args.n / bulk:8.1f} msg/s   delivered {sent}/{args.n}   "
+              f"(retries {retried})")
+        print(f"speed-up: {old / bulk:.2f}x")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Peak memory of writing a report: whole-document string vs. streaming to a sink.
+
+The old path builds the file as one latin-1 str in fpdf's buffer and then
+encodes a second, full bytes copy; write_pdf() hands each line to the sink as
+it is produced. Layout happens before tracing starts, so the figures cover
+only closing and serialising the document. Reports are made long with coach
+notes on every chakra.
+
+    python benchmarks/bench_output.py --words 4000
+"""
+import argparse
+import gc
+import io
+import os
+import random
+import tempfile
+import tracemalloc
+
+from common import random_payload, timed
+
+from report import CHAKRAS, build_pdf, make_pdf, write_to
+
+
+def long_payload(words: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    payload = random_payload(rng)
+    for ch in CHAKRAS:
+        payload["chakras"][ch]["notes"] = " ".join(
+            rng.choice(["tension", "grief", "hope", "fear", "joy", "breath", "release"]) for _ in range(words))
+    return payload
+
+
+def string_output(pdf, _sink):
+    return len(pdf.output(dest="S").encode("latin-1", "ignore"))
+
+
+def bytesio_output(pdf, _sink):
+    out = io.BytesIO()
+    write_to(pdf, out)
+    return len(out.getvalue())
+
+
+def peak(fn, *args):
+    """(result, peak traced bytes, seconds) for one call."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result, seconds = timed(fn, *args)
+        return result, tracemalloc.get_traced_memory()[1], seconds
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--words", type=int, default=3000, help="words of notes per chakra")
+    parser.add_argument("--no-compress", action="store_true",
+                        help="leave page streams uncompressed, as the live preview does")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    payload = long_payload(args.words, args.seed)
+    make_pdf(payload)   # warm the logo and the page template outside the measurements
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.pdf")
+        runs = [
+            ("str buffer + encode", string_output, None),
+            ("BytesIO sink (make_pdf)", bytesio_output, None),
+            ("file sink", write_to, path),
+        ]
+        for label, fn, target in runs:
+            # lay out untraced: only closing and serialising the document is compared
+            pdf = build_pdf(payload)
+            pdf.set_compression(not args.no_compress)
+            pages = pdf.page
+            if target:
+                with open(target, "wb") as f:
+                    size, top, seconds = peak(fn, pdf, f)
+            else:
+                size, top, seconds = peak(fn, pdf, None)
+            print(f"{label:<26} {pages} pages, {size / 1024:6.0f} KiB   output peak {top / 1024:7.0f} KiB "
+                  f"({top / size:4.2f}x the file)   {seconds * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
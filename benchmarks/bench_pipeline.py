@@ -0,0 +1,112 @@
+"""Time to PDF and time to done for one submission, sequential vs the pipeline.
+
+The sequential path is what the Generate button used to do: render, save,
+send the email over a fresh SMTP session and wait for it, then notify the
+webhook, one after the other, before the coach sees a download button. The
+pipeline hands the PDF back after the render and runs the rest concurrently.
+SMTP and the webhook are local stand-ins with simulated latency. Needs
+aiosmtpd (pip install aiosmtpd).
+
+    python benchmarks/bench_pipeline.py --n 20 --smtp-ms 400 --webhook-ms 150
+"""
+import argparse
+import os
+import random
+import smtplib
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import describe, random_payload
+
+from aiosmtpd.controller import Controller
+from bench_mailer import CountingHandler, free_port
+
+from mailer import Mailer, SmtpConfig, build_report_email
+from pipeline import Pipeline, post_json
+from report import make_pdf, report_filename
+from store import AssessmentStore
+
+
+def webhook_server(delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/hook"
+
+
+def sequential(payload, store, cfg, url):
+    start = time.perf_counter()
+    pdf = make_pdf(payload)
+    store.save(payload)
+    name = payload["client_name"]
+    msg = build_report_email(cfg.sender, "client@example.com", pdf, report_filename(name), name)
+    with smtplib.SMTP(cfg.host, cfg.port, timeout=cfg.timeout) as smtp:
+        smtp.send_message(msg)
+    post_json(url, {"event": "report.ready", "client_name": name, "pdf_bytes": len(pdf)}, 10)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed   # nothing to download until everything finished
+
+
+def pipelined(payload, pipeline, mailer):
+    start = time.perf_counter()
+    sub = pipeline.submit(payload, email_to="client@example.com", mailer=mailer)
+    sub.pdf(timeout=60)
+    ready = time.perf_counter() - start
+    if not sub.wait(60):
+        raise RuntimeError(repr(sub))
+    return ready, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=20, help="submissions per path")
+    parser.add_argument("--smtp-ms", type=float, default=400, help="simulated SMTP connect/login latency")
+    parser.add_argument("--webhook-ms", type=float, default=150, help="simulated webhook response time")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payloads = [random_payload(rng, i) for i in range(args.n)]
+    handler = CountingHandler(0.0, args.seed, args.smtp_ms / 1000, 0.01)
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    server, url = webhook_server(args.webhook_ms / 1000)
+    try:
+        cfg = SmtpConfig(host="127.0.0.1", port=port, use_ssl=False, from_addr="coach@example.com")
+        with tempfile.TemporaryDirectory() as tmp:
+            store = AssessmentStore(os.path.join(tmp, "seq.db"))
+            old = [sequential(p, store, cfg, url) for p in payloads]
+
+            mailer = Mailer(cfg, dead_letter_path=os.path.join(tmp, "dead.jsonl"))
+            pipeline = Pipeline(AssessmentStore(os.path.join(tmp, "pipe.db")), webhook_url=url)
+            new = [pipelined(p, pipeline, mailer) for p in payloads]
+            pipeline.close()
+            mailer.stop()
+
+        print(describe("sequential  to PDF", [r for r, _ in old]))
+        print(describe("pipeline    to PDF", [r for r, _ in new]))
+        print(describe("sequential  to done", [d for _, d in old]))
+        print(describe("pipeline    to done", [d for _, d in new]))
+        mean = lambda xs: sum(xs) / len(xs)  # noqa: E731
+        print(f"PDF sooner by {mean([r for r, _ in old]) / mean([r for r, _ in new]):.1f}x, "
+              f"done sooner by {mean([d for _, d in old]) / mean([d for _, d in new]):.2f}x   "
+              f"(emails accepted {handler.accepted})")
+    finally:
+        server.shutdown()
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
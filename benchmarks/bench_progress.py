@@ -0,0 +1,77 @@
+"""Progress reports: cost of a full rebuild, of adding one session, and of the PDF, by history length.
+
+A full rebuild grows with the history; adding a session to the stored
+aggregate and rendering the PDF should not.
+
+    python benchmarks/bench_progress.py --sessions 10,100,1000,10000
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from common import describe, timed
+
+from progress import ClientProgress, client_progress, make_progress_pdf
+from report import CHAKRAS, STATUS_OPTIONS, complete_payload
+from store import AssessmentStore
+
+START = datetime.date(2015, 1, 1)
+
+
+def history(name: str, n: int, seed: int):
+    rng = random.Random(seed)
+    current = {ch: rng.choice(STATUS_OPTIONS) for ch in CHAKRAS}
+    for i in range(n):
+        for ch in CHAKRAS:
+            if rng.random() < 0.15:
+                current[ch] = rng.choice(STATUS_OPTIONS)
+        day = START + datetime.timedelta(days=i)
+        yield complete_payload({"client_name": name, "date": day.strftime("%d-%m-%Y"),
+                                "chakras": {ch: {"status": s} for ch, s in current.items()}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="10,100,1000,10000", help="comma-separated history lengths")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per measurement")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AssessmentStore(os.path.join(tmp, "progress.db"))
+        for n in (int(x) for x in args.sessions.split(",")):
+            name = f"Client {n}"
+            store.save_many(history(name, n, args.seed))
+            print(f"{n} sessions")
+
+            def rebuild():
+                progress = ClientProgress(name)
+                for row in store.client_sessions(name):
+                    progress.add(*row)
+                return progress
+
+            print(describe("  full rebuild", [timed(rebuild)[1] for _ in range(args.repeat)]))
+            progress = client_progress(store, name)   # stores the aggregate
+
+            next_day = START + datetime.timedelta(days=n)
+            adds = []
+            for i in range(args.repeat):
+                payload = next(history(name, 1, args.seed + i))
+                payload["date"] = (next_day + datetime.timedelta(days=i)).strftime("%d-%m-%Y")
+                store.save(payload)
+                start = time.perf_counter()
+                progress = client_progress(store, name)
+                adds.append(time.perf_counter() - start)
+            print(describe("  add one session", adds))
+
+            make_progress_pdf(progress)
+            renders = [timed(make_progress_pdf, progress)[1] for _ in range(args.repeat)]
+            print(describe("  progress PDF", renders) + f"   {len(progress.buckets)} points")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
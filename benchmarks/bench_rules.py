@@ -0,0 +1,83 @@
+"""Quick Reading rule lookup: compiled index vs checking every rule.
+
+Generates --rules random rules (two to four chakra conditions each) and
+times, per report, finding and formatting the matching rules: a linear scan
+over all rules as the baseline, the compiled index on its first look at a
+status combination, and once it has been seen. Also times compiling the
+rules and filling the whole 4 ** 7 index.
+
+    python benchmarks/bench_rules.py --rules 100,1000,5000
+"""
+import argparse
+import random
+import time
+
+from common import describe
+
+from report import CHAKRAS, N_STATES
+from rules import PLACEHOLDERS, Rulebook, parse_rule
+
+WORDS = ("blocked", "weak", "overactive", "balanced", "blocked", "weak", "overactive", "!balanced")
+NAMES = [ch.split(" (")[0].lower() for ch in CHAKRAS]
+
+
+def random_rules(rng: random.Random, n: int) -> dict:
+    rules = []
+    for i in range(n):
+        when = {name: rng.choice(WORDS) for name in rng.sample(NAMES, rng.randint(2, 4))}
+        rules.append({"id": f"r{i}", "when": when, "priority": rng.randint(0, 9),
+                      "group": f"g{rng.randrange(n // 4 + 1)}" if rng.random() < 0.5 else None,
+                      "text": {"en": f"Rule {i} for {{blocked}}.", "hi": f"नियम {i}"}})
+    return {"rules": rules}
+
+
+def linear(rules: list, code: int) -> str:
+    # what evaluating the rule file per report would cost: every rule, every time
+    matched, groups = [], set()
+    for rule in sorted(rules, key=lambda r: -r.priority):
+        if rule.matches(code) and (rule.group is None or rule.group not in groups):
+            if rule.group is not None:
+                groups.add(rule.group)
+            matched.append(rule.text_for("en").format_map(dict.fromkeys(PLACEHOLDERS, "")))
+    return " ".join(matched)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rules", default="100,1000,5000", help="comma-separated rule counts")
+    parser.add_argument("--reports", type=int, default=2000, help="random status combinations per case")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for n in (int(x) for x in args.rules.split(",")):
+        data = random_rules(rng, n)
+        codes = [rng.randrange(N_STATES) for _ in range(args.reports)]
+        start = time.perf_counter()
+        book = Rulebook.from_json(data)
+        compiled = time.perf_counter() - start
+        start = time.perf_counter()
+        Rulebook.from_json(data).compile_all()
+        filled = time.perf_counter() - start - compiled
+
+        parsed = [parse_rule(raw, i) for i, raw in enumerate(data["rules"])]
+        scan, cold, warm = [], [], []
+        for code in codes[:200]:
+            t = time.perf_counter()
+            linear(parsed, code)
+            scan.append(time.perf_counter() - t)
+        for target in (cold, warm):
+            for code in codes:
+                t = time.perf_counter()
+                book.text(code)
+                target.append(time.perf_counter() - t)
+        matched = sum(len(book.matching(c)) for c in codes) / len(codes)
+        print(f"{n} rules: compile {compiled * 1000:.1f} ms, full index {filled * 1000:.0f} ms, "
+              f"{matched:.1f} rules match a report on average")
+        print(describe("  linear scan", scan))
+        print(describe("  index, first look", cold))
+        print(describe("  index, seen before", warm))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Streamlit cold start and per-rerun latency of app.py.
+
+Every measurement runs in a fresh interpreter: the time to import the
+modules app.py pulls in, the first script run after the server starts, a
+first run for further browser sessions on the now-warm process, and then
+--reruns plain reruns, as Streamlit does on every widget change. --ref also
+measures an older commit (extracted with git archive) for a before/after
+comparison.
+
+    python benchmarks/bench_startup.py --ref HEAD~1
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+from common import describe
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+PROBE = r"""
+import json, os, sys, time
+root = sys.argv[1]
+sys.path.insert(0, root)
+os.chdir(root)
+t = time.perf_counter()
+import report, pdf_cache  # what app.py imports besides streamlit
+imports = time.perf_counter() - t
+heavy = sorted(m for m in ("fpdf", "requests", "smtplib") if m in sys.modules)
+
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(os.path.join(root, "app.py"), default_timeout=60)
+t = time.perf_counter()
+at.run()
+first = time.perf_counter() - t
+reruns = []
+for _ in range(int(sys.argv[2])):
+    t = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - t)
+sessions = []
+for _ in range(3):
+    fresh = AppTest.from_file(os.path.join(root, "app.py"), default_timeout=60)
+    t = time.perf_counter()
+    fresh.run()
+    sessions.append(time.perf_counter() - t)
+errors = [str(e.value) for e in at.exception]
+print(json.dumps({"imports": imports, "heavy": heavy, "first": first, "reruns": reruns, "sessions": sessions,
+                  "errors": errors}))
+"""
+
+
+def measure(root: str, reruns: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SOULFUL_DB_PATH=os.path.join(tmp, "bench.db"))
+        out = subprocess.run([sys.executable, "-c", PROBE, root, str(reruns)], env=env,
+                             capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def extract(ref: str, into: str) -> str:
+    archive = os.path.join(into, "tree.tar")
+    with open(archive, "wb") as f:
+        subprocess.run(["git", "archive", ref], cwd=ROOT, stdout=f, check=True)
+    tree = os.path.join(into, "tree")
+    with tarfile.open(archive) as tar:
+        tar.extractall(tree)
+    return tree
+
+
+def show(label: str, runs: list):
+    print(f"{label}")
+    print(describe("  imports", [r["imports"] for r in runs]) + f"   loaded: {', '.join(runs[0]['heavy']) or '-'}")
+    print(describe("  first run", [r["first"] for r in runs]))
+    print(describe("  new session", [t for r in runs for t in r["sessions"]]))
+    print(describe("  rerun", [t for r in runs for t in r["reruns"]]))
+    errors = {e for r in runs for e in r["errors"]}
+    if errors:
+        print(f"  errors: {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=30, help="reruns per fresh process")
+    parser.add_argument("--starts", type=int, default=5, help="fresh processes per tree")
+    parser.add_argument("--ref", help="also measure this git ref, e.g. HEAD~1")
+    args = parser.parse_args()
+
+    current = [measure(ROOT, args.reruns) for _ in range(args.starts)]
+    if args.ref:
+        with tempfile.TemporaryDirectory() as tmp:
+            tree = extract(args.ref, tmp)
+            before = [measure(tree, args.reruns) for _ in range(args.starts)]
+        show(args.ref, before)
+    show("working tree", current)
+    if args.ref:
+        def mean(runs, field):
+            values = [v for r in runs for v in (r[field] if isinstance(r[field], list) else [r[field]])]
+            return sum(values) / len(values)
+
+        fields = (("imports", "imports"), ("first run", "first"), ("new session", "sessions"), ("rerun", "reruns"))
+        print("faster by: " + "   ".join(f"{label} {mean(before, field) / mean(current, field):.2f}x"
+                                          for label, field in fields))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Assessment store: batched import speed, size on disk and lookup latency.
+
+    python benchmarks/bench_store.py --n 1000000 --db /tmp/soulful_bench.db
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from common import describe, random_payload, timed
+
+from store import AssessmentStore
+
+COACHES = ["Rekha Babulkar", "Anita Rao", "Meera Shah", "Kiran Patel", "Dev Malhotra"]
+START = datetime.date(2023, 1, 1)
+DAYS = 900
+
+
+def payloads(n: int, clients: int, edited: float, seed: int):
+    rng = random.Random(seed)
+    templates = [random_payload(rng, i, edited) for i in range(500)]
+    for i in range(n):
+        p = dict(rng.choice(templates))
+        p["client_name"] = f"Client {rng.randrange(clients)}"
+        p["coach_name"] = rng.choice(COACHES)
+        p["date"] = (START + datetime.timedelta(days=rng.randrange(DAYS))).strftime("%d-%m-%Y")
+        yield p
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=200_000, help="assessments to import")
+    parser.add_argument("--clients", type=int, default=None, help="distinct clients (default n / 8)")
+    parser.add_argument("--edited", type=float, default=0.1, help="share of chakras with coach-edited notes")
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--db", help="database file (default: a temp file)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    clients = args.clients or max(1, args.n // 8)
+    tmp = None
+    if not args.db:
+        tmp = tempfile.TemporaryDirectory()
+        args.db = os.path.join(tmp.name, "bench.db")
+    store = AssessmentStore(args.db)
+
+    start = time.perf_counter()
+    store.save_many(payloads(args.n, clients, args.edited, args.seed))
+    took = time.perf_counter() - start
+    size = sum(os.path.getsize(args.db + ext) for ext in ("", "-wal") if os.path.exists(args.db + ext))
+    print(f"imported {args.n} assessments in {took:.1f}s ({args.n / took:,.0f}/s), "
+          f"{size / args.n:.0f} bytes per assessment on disk, {store.count()} rows")
+
+    rng = random.Random(args.seed)
+    client_times, coach_times, frame_times = [], [], []
+    rows = 0
+    for _ in range(args.lookups):
+        found, t = timed(store.for_client, f"Client {rng.randrange(clients)}")
+        client_times.append(t)
+        rows += len(found)
+    for _ in range(max(1, args.lookups // 10)):
+        until = START + datetime.timedelta(days=rng.randrange(30, DAYS))
+        found, t = timed(store.for_coach, rng.choice(COACHES), until - datetime.timedelta(days=30), until)
+        coach_times.append(t)
+        frame, t = timed(store.frame, None, until - datetime.timedelta(days=30), until)
+        frame_times.append(t)
+    print(describe("for_client", client_times) + f"   ({rows / args.lookups:.1f} rows)")
+    print(describe("for_coach, 30 days", coach_times) + f"   ({len(found)} rows)")
+    print(describe("frame, all coaches 30 days", frame_times) + f"   ({len(frame)} rows)")
+    store.close()
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Per-report CPU time with and without the precompiled page template.
+
+    python benchmarks/bench_template.py --n 500
+"""
+import argparse
+import random
+
+from common import describe, random_payload, strip_creation_date, timed
+
+from report import build_pdf
+from template import PageTemplate
+
+
+def render(payload, template):
+    return build_pdf(payload, template).output(dest="S").encode("latin-1", "ignore")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=300, help="payloads to render")
+    parser.add_argument("--edited", type=float, default=0.2, help="share of chakras with coach-edited notes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    payloads = [random_payload(rng, i, args.edited) for i in range(args.n)]
+    template = PageTemplate()
+    render(payloads[0], template)   # compile the static blocks
+
+    live, templated = [], []
+    for p in payloads:
+        a, t_live = timed(render, p, None)
+        b, t_tpl = timed(render, p, template)
+        if strip_creation_date(a) != strip_creation_date(b):
+            raise SystemExit(f"output differs for {p['client_name']}")
+        live.append(t_live)
+        templated.append(t_tpl)
+
+    print(f"{args.n} reports, output identical")
+    print(describe("live make_pdf", live))
+    print(describe("templated make_pdf", templated))
+    print(f"speed-up: {sum(live) / sum(templated):.2f}x   "
+          f"(template hits {template.hits}, misses {template.misses})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Default-text reports: full render vs stamping the header into a warmed variant.
+
+Warms a variants file first unless --path already holds a current one, then
+renders --n random default-text payloads both ways and checks that the bytes
+match (creation date aside).
+
+    python benchmarks/bench_variants.py --path /tmp/variants.bin --n 500
+"""
+import argparse
+import io
+import os
+import random
+
+from common import describe, strip_creation_date, timed
+
+import variants
+from report import GENDER_OPTIONS, N_STATES, write_pdf
+
+
+def render(payload) -> bytes:
+    out = io.BytesIO()
+    write_pdf(payload, out)
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default="variants.bin", help="variants file (warmed if missing or stale)")
+    parser.add_argument("--n", type=int, default=500, help="reports per path")
+    parser.add_argument("--workers", type=int, default=None, help="processes for warming")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    arc = variants.archive(args.path)
+    if arc is None:
+        meta = variants.warm(args.path, args.workers)
+        print(f"warmed {N_STATES} combinations in {meta['seconds']:.0f} s, {meta['bytes'] / 2 ** 20:.1f} MB")
+        arc = variants.archive(args.path)
+    print(f"{args.path}: {os.path.getsize(args.path) / 2 ** 20:.1f} MB")
+
+    rng = random.Random(args.seed)
+    payloads = [variants.default_payload(rng.randrange(N_STATES), client_name=f"Client {i}",
+                                         gender=rng.choice(GENDER_OPTIONS), date=f"{rng.randint(1, 28):02d}-05-2026")
+                for i in range(args.n)]
+    full, stamped, mismatches = [], [], 0
+    for p in payloads:
+        a, t = timed(render, p)
+        full.append(t)
+        b, t = timed(arc.stamp, p)
+        stamped.append(t)
+        mismatches += strip_creation_date(a) != strip_creation_date(b)
+    print(describe("full render", full))
+    print(describe("stamped variant", stamped))
+    print(f"speed-up {sum(full) / sum(stamped):.1f}x, {mismatches} of {args.n} differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Shared helpers for the benchmark scripts in this folder."""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report import CHAKRAS, STATUS_OPTIONS, complete_payload  # noqa: E402
+
+
+def random_payload(rng: random.Random, index: int = 0, edited: float = 0.0) -> dict:
+    """A complete payload with random statuses; ``edited`` is the chance a chakra gets coach notes."""
+    chakras = {}
+    for ch in CHAKRAS:
+        entry = {"status": rng.choice(STATUS_OPTIONS)}
+        if rng.random() < edited:
+            entry["notes"] = "Coach note: " + " ".join(rng.choice(["tension", "grief", "hope", "fear", "joy"])
+                                                       for _ in range(rng.randint(5, 120)))
+        chakras[ch] = entry
+    return complete_payload({"client_name": f"Client {index}", "chakras": chakras})
+
+
+def strip_creation_date(pdf_bytes: bytes) -> bytes:
+    return re.sub(rb"/CreationDate \(D:\d+\)", b"", pdf_bytes)
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def describe(label: str, seconds) -> str:
+    ms = [s * 1000 for s in seconds]
+    return (f"{label:<24} mean {sum(ms) / len(ms):7.3f} ms   p50 {percentile(ms, 50):7.3f} ms   "
+            f"p95 {percentile(ms, 95):7.3f} ms")
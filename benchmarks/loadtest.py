@@ -0,0 +1,140 @@
+"""Load test for service.py: throughput, latency and 429s as concurrency grows.
+
+Starts the service in-process on a free port (or targets --url) and runs each
+concurrency level for --duration seconds with keep-alive clients posting
+random payloads. The ceiling is the level where accepted renders per second
+stop growing and 429s / queue time take over.
+
+    python benchmarks/loadtest.py --workers 4 --levels 1,2,4,8,16,32
+    python benchmarks/loadtest.py --url http://127.0.0.1:8502 --duration 20
+"""
+import argparse
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from common import percentile, random_payload
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Client(threading.Thread):
+    def __init__(self, host: str, port: int, stop_at: float, seed: str, repeat: float):
+        super().__init__(daemon=True)
+        self.host, self.port = host, port
+        self.stop_at = stop_at
+        self.rng = random.Random(seed)
+        self.repeat = repeat
+        self.latencies, self.queue_ms, self.render_ms = [], [], []
+        self.statuses = {}
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        seen = []
+        i = 0
+        while time.monotonic() < self.stop_at:
+            if seen and self.rng.random() < self.repeat:
+                body = self.rng.choice(seen)   # same report again: a PDF cache hit in the worker
+            else:
+                body = json.dumps(random_payload(self.rng, i, edited=0.2)).encode("utf-8")
+                seen.append(body)
+                i += 1
+            start = time.perf_counter()
+            try:
+                conn.request("POST", "/render", body, {"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                resp.read()
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+                self.statuses["error"] = self.statuses.get("error", 0) + 1
+                continue
+            self.statuses[resp.status] = self.statuses.get(resp.status, 0) + 1
+            if resp.status == 200:
+                self.latencies.append(time.perf_counter() - start)
+                self.queue_ms.append(float(resp.getheader("X-Queue-Ms", 0)))
+                self.render_ms.append(float(resp.getheader("X-Render-Ms", 0)))
+            elif resp.status == 429:
+                # a polite client backs off; keep it short so the level stays saturated
+                time.sleep(min(0.05, float(resp.getheader("Retry-After", 1))))
+        conn.close()
+
+
+def run_level(host: str, port: int, concurrency: int, duration: float, repeat: float, seed: int) -> dict:
+    stop_at = time.monotonic() + duration
+    clients = [Client(host, port, stop_at, f"{seed}:{concurrency}:{i}", repeat) for i in range(concurrency)]
+    start = time.perf_counter()
+    for c in clients:
+        c.start()
+    for c in clients:
+        c.join()
+    took = time.perf_counter() - start
+    latencies = [x for c in clients for x in c.latencies]
+    statuses = {}
+    for c in clients:
+        for k, v in c.statuses.items():
+            statuses[k] = statuses.get(k, 0) + v
+    total = sum(statuses.values()) or 1
+    ms = [x * 1000 for x in latencies]
+    return {
+        "concurrency": concurrency,
+        "ok_per_s": len(latencies) / took,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "queue_ms": percentile([x for c in clients for x in c.queue_ms], 50),
+        "render_ms": percentile([x for c in clients for x in c.render_ms], 50),
+        "rejected": statuses.get(429, 0) / total,
+        "statuses": statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="running service to test (default: start one in-process)")
+    parser.add_argument("--workers", type=int, help="worker processes for the in-process service")
+    parser.add_argument("--queue", type=int, help="queue slots for the in-process service")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per level")
+    parser.add_argument("--repeat", type=float, default=0.0, help="share of requests re-sending an earlier payload")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    server = service = None
+    if args.url:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        from service import ReportService, make_server
+        service = ReportService(workers=args.workers, queue=args.queue)
+        host, port = "127.0.0.1", free_port()
+        server = make_server(service, host, port, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"in-process service: {service.workers} workers, capacity {service.capacity}")
+
+    best = None
+    try:
+        for level in (int(x) for x in args.levels.split(",")):
+            r = run_level(host, port, level, args.duration, args.repeat, args.seed)
+            print(f"{level:4d} clients  {r['ok_per_s']:7.1f} PDFs/s   p50 {r['p50_ms']:7.1f} ms   "
+                  f"p95 {r['p95_ms']:7.1f} ms   queue {r['queue_ms']:6.1f} ms   render {r['render_ms']:6.1f} ms   "
+                  f"429 {r['rejected']:5.1%}")
+            if best is None or r["ok_per_s"] > best["ok_per_s"]:
+                best = r
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+            service.close()
+    print(f"ceiling: {best['ok_per_s']:.1f} PDFs/s at {best['concurrency']} clients")
+
+
+if __name__ == "__main__":
+    main()
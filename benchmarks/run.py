@@ -0,0 +1,319 @@
+"""Benchmark suite for the report pipeline, with a regression check.
+
+Each case runs in its own forked process so peak RSS is per case. Results
+(p50/p95 latency, throughput, peak RSS) are written as JSON and compared
+against a stored baseline; anything slower or bigger than the tolerance is
+reported as a regression and the exit status is 1.
+
+    python benchmarks/run.py                      # full run, compare with baseline.json
+    python benchmarks/run.py --quick --cases make_pdf,email
+    python benchmarks/run.py --save-baseline      # accept the current numbers
+
+Baselines are machine-specific: refresh baseline.json with --save-baseline
+on the machine the numbers are compared on.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import percentile, random_payload
+
+from report import CHAKRAS, PREDEFINED_INFO, STATUS_OPTIONS, build_quick_reading, clean_txt, complete_payload, make_pdf
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "baseline.json")
+RESULTS = os.path.join(HERE, "results.json")
+NOTE_WORDS = ["tension", "grief", "hope", "fear", "joy", "release", "breath", "heart", "ground", "trust",
+              "“held”", "– softening", "’s"]
+
+
+# --------------------------------------------------
+# INPUTS
+# --------------------------------------------------
+def all_status_payloads(stride: int = 1):
+    """One payload per status combination (4^7 of them), every ``stride``-th only."""
+    combos = itertools.product(STATUS_OPTIONS, repeat=len(CHAKRAS))
+    for i, statuses in enumerate(itertools.islice(combos, 0, None, stride)):
+        chakras = {ch: {"status": s} for ch, s in zip(CHAKRAS, statuses)}
+        yield complete_payload({"client_name": f"Client {i}", "chakras": chakras})
+
+
+def long_notes_payload(rng: random.Random, index: int, words: int) -> dict:
+    payload = random_payload(rng, index)
+    for ch in CHAKRAS:
+        payload["chakras"][ch]["notes"] = " ".join(rng.choice(NOTE_WORDS) for _ in range(words))
+    return payload
+
+
+def clean_txt_inputs(rng: random.Random, n: int) -> list:
+    texts = [text for statuses in PREDEFINED_INFO.values() for info in statuses.values() for text in info.values()]
+    while len(texts) < n:
+        texts.append(" ".join(rng.choice(NOTE_WORDS) for _ in range(rng.randint(3, 400))))
+    return texts[:n]
+
+
+# --------------------------------------------------
+# CASES
+# --------------------------------------------------
+# each returns (per-item latencies in seconds, items processed, wall seconds)
+def timed_each(fn, items):
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t)
+    return latencies, len(latencies), time.perf_counter() - start
+
+
+def timed_chunks(fn, items, chunk: int):
+    """For calls too quick to time one by one: per-call average of each chunk."""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(items), chunk):
+        part = items[i:i + chunk]
+        t = time.perf_counter()
+        for item in part:
+            fn(item)
+        latencies.append((time.perf_counter() - t) / len(part))
+    return latencies, len(items), time.perf_counter() - start
+
+
+def case_clean_txt(args):
+    texts = clean_txt_inputs(random.Random(args.seed), 2000 if args.quick else 20000)
+    return timed_chunks(clean_txt, texts, 100)
+
+
+def case_quick_reading(args):
+    chakras = [p["chakras"] for p in all_status_payloads(args.stride)]
+    return timed_chunks(build_quick_reading, chakras, 64)
+
+
+def case_make_pdf(args):
+    return timed_each(make_pdf, list(all_status_payloads(args.stride)))
+
+
+def case_make_pdf_long_notes(args):
+    rng = random.Random(args.seed)
+    payloads = [long_notes_payload(rng, i, 1500) for i in range(10 if args.quick else 60)]
+    return timed_each(make_pdf, payloads)
+
+
+def case_email(args):
+    # the path send_email_with_pdf takes: Mailer.send_report into a local SMTP sink
+    from aiosmtpd.controller import Controller
+
+    from bench_mailer import CountingHandler, free_port
+    from mailer import Mailer, SmtpConfig
+
+    n = 100 if args.quick else 500
+    pdf_bytes = make_pdf(random_payload(random.Random(args.seed)))
+    port = free_port()
+    controller = Controller(CountingHandler(0.0, args.seed), hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cfg = SmtpConfig(host="127.0.0.1", port=port, use_ssl=False, from_addr="coach@example.com")
+            mailer = Mailer(cfg, queue_size=n, dead_letter_path=os.path.join(tmp, "dead.jsonl"))
+
+            def send(i):
+                return mailer.send_report(f"client{i}@example.com", pdf_bytes, f"Client_{i}.pdf", f"Client {i}")
+
+            # latency one message at a time (no queueing), throughput with everything queued at once
+            latencies, deliveries = [], []
+            for i in range(n // 5):
+                d = send(i)
+                d.wait(60)
+                latencies.append(d.finished_at - d.queued_at)
+                deliveries.append(d)
+            start = time.perf_counter()
+            burst = [send(i) for i in range(n)]
+            for d in burst:
+                d.wait(60)
+            wall = time.perf_counter() - start
+            mailer.stop()
+    finally:
+        controller.stop()
+    failed = [d for d in deliveries + burst if not d.ok]
+    if failed:
+        raise RuntimeError(f"{len(failed)} emails not delivered: {failed[0].error}")
+    return latencies, n, wall
+
+
+def case_batch(args):
+    from batch import render_batch
+
+    rng = random.Random(args.seed)
+    payloads = [random_payload(rng, i, edited=0.2) for i in range(128 if args.quick else 1024)]
+    latencies = []
+    with tempfile.TemporaryDirectory() as tmp:
+        summary = render_batch(payloads, zip_path=os.path.join(tmp, "out.zip"),
+                               on_result=lambda r: latencies.append(r.seconds))
+    if summary.errors:
+        raise RuntimeError(f"{len(summary.errors)} batch items failed: {summary.errors[0].error}")
+    return latencies, summary.rendered, summary.seconds
+
+
+CASES = {
+    "clean_txt": case_clean_txt,
+    "build_quick_reading": case_quick_reading,
+    "make_pdf": case_make_pdf,
+    "make_pdf_long_notes": case_make_pdf_long_notes,
+    "email": case_email,
+    "batch": case_batch,
+}
+
+
+# --------------------------------------------------
+# RUNNING
+# --------------------------------------------------
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux; children covers batch's worker processes
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def _child(name, args, conn):
+    try:
+        latencies, items, wall = CASES[name](args)
+        ms = [x * 1000 for x in latencies]
+        conn.send({
+            "n": items,
+            "p50_ms": round(percentile(ms, 50), 4),
+            "p95_ms": round(percentile(ms, 95), 4),
+            "mean_ms": round(sum(ms) / len(ms), 4) if ms else 0.0,
+            "per_s": round(items / wall, 2) if wall else 0.0,
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+        })
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+def run_case(name: str, args) -> dict:
+    ctx = multiprocessing.get_context("fork")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(name, args, child))
+    proc.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {"error": f"benchmark process died (exit code {proc.exitcode})"}
+    proc.join()
+    return result
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "when": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# --------------------------------------------------
+# REGRESSION CHECK
+# --------------------------------------------------
+def compare(results: dict, baseline: dict, tolerance: float, rss_tolerance: float) -> list:
+    """Human-readable regression lines; empty when nothing got worse."""
+    problems = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before or "error" in before:
+            continue
+        if "error" in now:
+            problems.append(f"{name}: failed ({now['error']})")
+            continue
+        if now["n"] != before["n"]:
+            continue   # different input size (--quick vs. full); not comparable
+        for metric in ("p50_ms", "p95_ms"):
+            # a little absolute slack so microsecond cases don't flap
+            limit = max(before[metric] * (1 + tolerance), before[metric] + 0.01)
+            if now[metric] > limit:
+                problems.append(f"{name}: {metric} {before[metric]:.3f} -> {now[metric]:.3f} "
+                                f"(+{now[metric] / before[metric] - 1:.0%})")
+        if now["per_s"] < before["per_s"] * (1 - tolerance):
+            problems.append(f"{name}: per_s {before['per_s']:.1f} -> {now['per_s']:.1f} "
+                            f"({now['per_s'] / before['per_s'] - 1:.0%})")
+        if now["peak_rss_mb"] > max(before["peak_rss_mb"] * (1 + rss_tolerance), before["peak_rss_mb"] + 5):
+            problems.append(f"{name}: peak RSS {before['peak_rss_mb']:.1f} -> {now['peak_rss_mb']:.1f} MB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--quick", action="store_true", help="every 16th status combination and smaller inputs")
+    parser.add_argument("--out", default=RESULTS, help="where to write this run's JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run to --baseline as well")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--rss-tolerance", type=float, default=0.2, help="allowed peak RSS growth before failing")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    args.stride = 16 if args.quick else 1
+
+    names = [n.strip() for n in args.cases.split(",") if n.strip()]
+    unknown = set(names) - set(CASES)
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in names:
+        results[name] = r = run_case(name, args)
+        if "error" in r:
+            print(f"{name:<22} ERROR {r['error']}", flush=True)
+        else:
+            print(f"{name:<22} n {r['n']:6d}   p50 {r['p50_ms']:9.4f} ms   p95 {r['p95_ms']:9.4f} ms   "
+                  f"{r['per_s']:10.1f}/s   peak RSS {r['peak_rss_mb']:6.1f} MB", flush=True)
+
+    report = {"environment": environment(), "quick": args.quick, "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.out}")
+
+    failed = any("error" in r for r in results.values())
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"saved baseline {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        problems = compare(results, baseline, args.tolerance, args.rss_tolerance)
+        if problems:
+            print("\n" + "!" * 72)
+            print(f"PERFORMANCE REGRESSION against {args.baseline}:")
+            for line in problems:
+                print("  " + line)
+            print("!" * 72)
+            failed = True
+        else:
+            print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    else:
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Compact in-memory form of an assessment payload.
+
+A payload from main() or complete_payload is a dict of eight fields and a
+dict of seven per-chakra dicts; loaded from JSON, every one of them also
+carries its own copy of the predefined notes, remedies and crystal text.
+CompactAssessment keeps the same information in six slots:
+
+    client_name, coach_name, gender, date   interned strings
+    statuses                                report.encode_statuses (one shared int)
+    overrides                               None, or (chakra, field, text) for text
+                                            that differs from the defaults
+
+Predefined text is looked up again (store.DEFAULT_TEXT, the same table the
+database stores by reference) when a dict is needed:
+
+    c = CompactAssessment.from_payload(payload)
+    c.to_payload() == payload    # True for any complete payload
+    make_pdf(c.to_payload())
+
+Missing per-chakra or top-level text counts as the default, so a partial
+payload comes back completed.
+"""
+import sys
+
+from report import CHAKRAS, N_STATES, decode_statuses, encode_statuses
+from store import CHAKRA_FIELDS, DEFAULT_TEXT, TOP, TOP_DEFAULTS
+
+# the payload keys held in slots; anything else at the top level is an override
+NAME_FIELDS = ("client_name", "coach_name", "gender", "date")
+_CODES = tuple(range(N_STATES))   # one int object per status combination, shared by every record
+_DEFAULT_FIELDS = dict.fromkeys(("status",) + CHAKRA_FIELDS)
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class CompactAssessment:
+    __slots__ = ("client_name", "coach_name", "gender", "date", "statuses", "overrides")
+
+    def __init__(self, client_name: str, coach_name: str, gender: str, date: str, statuses: int,
+                 overrides: tuple = None):
+        self.client_name = _intern(client_name)
+        self.coach_name = _intern(coach_name)
+        self.gender = _intern(gender)
+        self.date = _intern(date)
+        self.statuses = _CODES[statuses]
+        self.overrides = overrides or None
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "CompactAssessment":
+        """Packs a payload; ValueError for an unknown status, like complete_payload."""
+        chakras = payload["chakras"]
+        statuses = encode_statuses(chakras)
+        overrides = []
+        for i, ch in enumerate(CHAKRAS):
+            given = chakras[ch]
+            defaults = DEFAULT_TEXT[ch, given["status"]]
+            for f, name in enumerate(CHAKRA_FIELDS):
+                value = given.get(name, defaults[f])
+                if value != defaults[f]:
+                    overrides.append((i, name, value))
+            for name in given.keys() - _DEFAULT_FIELDS.keys():
+                overrides.append((i, name, given[name]))
+        for name, value in payload.items():
+            if name in TOP_DEFAULTS:
+                if value != TOP_DEFAULTS[name]:
+                    overrides.append((TOP, name, value))
+            elif name not in NAME_FIELDS and name != "chakras":
+                overrides.append((TOP, name, value))
+        return cls(payload.get("client_name", ""), payload.get("coach_name", ""), payload.get("gender", ""),
+                   payload.get("date", ""), statuses, tuple(overrides))
+
+    def to_payload(self) -> dict:
+        """The complete payload dict, ready for make_pdf."""
+        chakras = {}
+        for ch, status in zip(CHAKRAS, decode_statuses(self.statuses)):
+            notes, remedies, crystals = DEFAULT_TEXT[ch, status]
+            chakras[ch] = {"status": status, "notes": notes, "remedies": remedies, "crystals": crystals}
+        payload = {
+            "client_name": self.client_name,
+            "gender": self.gender,
+            "coach_name": self.coach_name,
+            "date": self.date,
+            "goal": TOP_DEFAULTS["goal"],
+            "chakras": chakras,
+            "follow_up": TOP_DEFAULTS["follow_up"],
+            "affirmations": TOP_DEFAULTS["affirmations"],
+        }
+        for chakra, name, value in self.overrides or ():
+            if chakra == TOP:
+                payload[name] = value
+            else:
+                chakras[CHAKRAS[chakra]][name] = value
+        return payload
+
+    def status_list(self) -> list:
+        """Statuses in CHAKRAS order."""
+        return decode_statuses(self.statuses)
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactAssessment):
+            return NotImplemented
+        return all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __repr__(self):
+        edits = len(self.overrides or ())
+        return f"<CompactAssessment {self.client_name!r} {self.date} statuses={self.statuses} overrides={edits}>"
@@ -0,0 +1,235 @@
+"""Several app or service processes behind one local load balancer.
+
+    python deploy.py app --workers 4 --port 8501       # Streamlit app x 4
+    python deploy.py service --workers 4 --port 8502   # service.py x 4
+
+Each worker is an ordinary process on its own port (--backend-port and up);
+the balancer is a small asyncio TCP proxy on --port that spreads connections
+over the workers that are up and restarts any worker that exits.
+
+    app       a Streamlit session lives in the process its websocket reached,
+              and its download links are served from that process's memory,
+              so connections stick to a worker by client address
+    service   requests are independent; each connection goes to the worker
+              with the fewest open connections
+
+The workers share everything that isn't per-session through files: the
+SQLite store (SOULFUL_DB_PATH), the PDF cache's disk tier
+(SOULFUL_PDF_CACHE_DIR, where a report being rendered by one worker is
+waited for rather than rendered again), the downloaded logo, and
+variants/rules files if configured. Unset paths default to ./.soulful/.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.path.abspath(os.environ.get("SOULFUL_STATE_DIR", ".soulful"))
+READY_TIMEOUT = 60    # seconds for a worker to open its port
+DOWN_FOR = 5.0        # seconds a worker that refused a connection is skipped
+CHUNK = 64 * 1024
+
+
+@dataclass
+class Backend:
+    port: int
+    command: list
+    proc: Optional[subprocess.Popen] = None
+    active: int = 0          # open proxied connections
+    served: int = 0
+    restarts: int = 0
+    down_until: float = 0.0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def up(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None and time.monotonic() >= self.down_until
+
+
+def worker_command(target: str, port: int, render_workers: int) -> list:
+    if target == "app":
+        return [sys.executable, "-m", "streamlit", "run", os.path.join(HERE, "app.py"),
+                "--server.port", str(port), "--server.address", "127.0.0.1", "--server.headless", "true"]
+    return [sys.executable, os.path.join(HERE, "service.py"), "--port", str(port),
+            "--workers", str(render_workers), "--quiet"]
+
+
+def shared_env() -> dict:
+    """The environment every worker gets: shared store, cache and asset paths."""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    env = dict(os.environ)
+    env.setdefault("SOULFUL_DB_PATH", os.path.join(STATE_DIR, "soulful.db"))
+    env.setdefault("SOULFUL_PDF_CACHE_DIR", os.path.join(STATE_DIR, "pdf_cache"))
+    env.setdefault("SOULFUL_MAIL_DEAD_LETTER", os.path.join(STATE_DIR, "mail_dead_letter.jsonl"))
+    return env
+
+
+def wait_for_port(port: int, timeout: float = READY_TIMEOUT, proc: subprocess.Popen = None) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+# --------------------------------------------------
+# BALANCER
+# --------------------------------------------------
+class Balancer:
+    def __init__(self, backends: list, sticky: bool, env: dict):
+        self.backends = backends
+        self.sticky = sticky
+        self.env = env
+        self.connections = 0
+        self.refused = 0
+
+    def start(self, backend: Backend):
+        backend.proc = subprocess.Popen(backend.command, env=self.env, cwd=HERE,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        backend.started = time.monotonic()
+
+    def pick(self, peer: str, exclude=()) -> Optional[Backend]:
+        up = [b for b in self.backends if b.up and b not in exclude]
+        if not up:
+            return None
+        if self.sticky:
+            # stable per client while the set of live workers doesn't change
+            return up[zlib.crc32(peer.encode()) % len(up)]
+        return min(up, key=lambda b: (b.active, b.served))
+
+    async def handle(self, client_reader, client_writer):
+        self.connections += 1
+        peer = (client_writer.get_extra_info("peername") or ("?",))[0]
+        tried = []
+        while True:
+            backend = self.pick(peer, tried)
+            if backend is None:
+                self.refused += 1
+                client_writer.close()
+                return
+            backend.active += 1   # before the await, so a burst of connections spreads out
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", backend.port)
+                break
+            except OSError:
+                backend.active -= 1
+                backend.down_until = time.monotonic() + DOWN_FOR
+                tried.append(backend)
+        backend.served += 1
+        try:
+            await asyncio.gather(_pipe(client_reader, writer), _pipe(reader, client_writer))
+        except asyncio.CancelledError:
+            pass    # balancer shutting down with the connection still open
+        finally:
+            backend.active -= 1
+            for w in (writer, client_writer):
+                try:
+                    w.close()
+                except (ConnectionError, OSError):
+                    pass
+
+    async def supervise(self):
+        while True:
+            await asyncio.sleep(1)
+            for b in self.backends:
+                if b.proc is not None and b.proc.poll() is not None:
+                    print(f"worker on :{b.port} exited ({b.proc.returncode}), restarting", flush=True)
+                    b.restarts += 1
+                    self.start(b)
+                    # not sent traffic until it has had time to open its port
+                    b.down_until = time.monotonic() + DOWN_FOR
+
+    def stop(self):
+        for b in self.backends:
+            if b.proc is not None and b.proc.poll() is None:
+                # SIGINT, which both workers treat as a clean shutdown (service.py closes its pool)
+                b.proc.send_signal(signal.SIGINT)
+        for b in self.backends:
+            if b.proc is not None:
+                try:
+                    b.proc.wait(10)
+                except subprocess.TimeoutExpired:
+                    b.proc.kill()
+
+    def summary(self) -> str:
+        per = ", ".join(f":{b.port} {b.served}" for b in self.backends)
+        return f"{self.connections} connections ({per}), {self.refused} refused"
+
+
+async def _pipe(reader, writer):
+    # copies one direction until EOF, then passes the EOF on (the other direction may still be busy)
+    try:
+        while True:
+            data = await reader.read(CHUNK)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except (ConnectionError, OSError):
+        writer.close()
+
+
+async def serve(balancer: Balancer, host: str, port: int):
+    server = await asyncio.start_server(balancer.handle, host, port)
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    supervisor = asyncio.create_task(balancer.supervise())
+    print(f"balancing http://{host}:{port} over {len(balancer.backends)} workers", flush=True)
+    async with server:
+        await stop.wait()
+    supervisor.cancel()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run several app or service workers behind a load balancer.")
+    parser.add_argument("target", choices=("app", "service"))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="balancer port (default 8501 app / 8502 service)")
+    parser.add_argument("--backend-port", type=int, default=None, help="first worker port (default port + 100)")
+    parser.add_argument("--render-workers", type=int, default=1, help="render processes per service worker")
+    args = parser.parse_args(argv)
+
+    port = args.port or (8501 if args.target == "app" else 8502)
+    first = args.backend_port or port + 100
+    env = shared_env()
+    backends = [Backend(first + i, worker_command(args.target, first + i, args.render_workers))
+                for i in range(args.workers)]
+    balancer = Balancer(backends, sticky=args.target == "app", env=env)
+    try:
+        for b in backends:
+            balancer.start(b)
+        for b in backends:
+            if not wait_for_port(b.port, proc=b.proc):
+                print(f"worker on :{b.port} didn't start", file=sys.stderr)
+                return 1
+        print(f"{args.workers} {args.target} workers up (state in {STATE_DIR})", flush=True)
+        asyncio.run(serve(balancer, args.host, port))
+    finally:
+        balancer.stop()
+        print(balancer.summary(), flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
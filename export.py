@@ -0,0 +1,240 @@
+"""Bulk export of stored assessments as one zip of PDFs plus an index.
+
+Selects assessments from the store by client, coach and/or date range,
+renders them (through the PDF cache, so reports rendered before are not
+rendered again) in a process pool running ahead of the zip writer, and
+streams the zip as it goes: PDFs in id order, then index.csv with one row per
+assessment. At most ``max_in_flight`` reports are rendered or waiting at
+once, so memory stays flat however many reports are exported, and the output
+can be a file, stdout or any other write-only stream.
+
+    python export.py --client "Asha" --zip asha.zip
+    python export.py --coach "Rekha Babulkar" --since 01-01-2026 --until 31-03-2026 --zip q1.zip
+    python export.py --zip - > everything.zip
+"""
+import argparse
+import collections
+import csv
+import datetime
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+from assets import FETCH_TIMEOUT, LOGO
+from batch import ascii_slug, chakra_slug
+from pdf_cache import PDF_CACHE
+from report import CHAKRAS, DATE_FORMAT, report_filename
+from store import DB_PATH, AssessmentStore, StoredAssessment
+
+INDEX_NAME = "index.csv"
+INDEX_FIELDS = ("file", "id", "client_name", "coach_name", "date", "saved_at",
+                *(chakra_slug(ch) for ch in CHAKRAS), "error")
+INDEX_SPOOL = 1024 * 1024   # index rows kept in memory before spilling to a temp file
+PAGE_SIZE = 500             # assessments read from the store at a time
+EXPORT_DIR = os.environ.get("SOULFUL_EXPORT_DIR", tempfile.gettempdir())   # where the app writes its zips
+EXPORT_KEEP = 24 * 3600     # seconds before an app export left behind by a session is deleted
+# larger app exports are collected from EXPORT_DIR: Streamlit holds a download in memory
+DOWNLOAD_MAX = int(os.environ.get("SOULFUL_EXPORT_DOWNLOAD_MB", "100")) * 2 ** 20
+
+
+@dataclass
+class ExportItem:
+    assessment: StoredAssessment
+    filename: str = ""
+    pdf_bytes: Optional[bytes] = None
+    error: str = ""
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+@dataclass
+class ExportSummary:
+    total: int = 0
+    exported: int = 0
+    errors: list = field(default_factory=list)   # (assessment id, error)
+    seconds: float = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self.exported / self.seconds if self.seconds else 0.0
+
+
+def export_filename(assessment: StoredAssessment) -> str:
+    """ASCII-only, so every unzip tool gets it right; index.csv has the client's name as written."""
+    slug = ascii_slug(assessment.payload["client_name"])
+    return f"{assessment.id:06d}_{report_filename(slug) if slug else 'chakra_report.pdf'}"
+
+
+def _render_stored(payload: dict):
+    # runs in the worker process; any failure is reported, not raised
+    start = time.perf_counter()
+    try:
+        return PDF_CACHE.get_or_render(payload), "", time.perf_counter() - start
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+
+# --------------------------------------------------
+# RENDER
+# --------------------------------------------------
+def iter_export(assessments: Iterable[StoredAssessment], workers: Optional[int] = None,
+                max_in_flight: Optional[int] = None) -> Iterator[ExportItem]:
+    """Renders assessments in a process pool, yielding them in input order.
+
+    Renders run up to ``max_in_flight`` reports ahead of the consumer; a slow
+    report holds back the ones after it rather than letting them pile up.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+
+    # same as batch: one logo for the whole export, parsed once before the workers fork
+    LOGO.prefetch()
+    LOGO.wait(FETCH_TIMEOUT)
+    LOGO.image_info()
+
+    def finish(assessment, fut) -> ExportItem:
+        pdf_bytes, error, seconds = fut.result()
+        return ExportItem(assessment, export_filename(assessment), pdf_bytes, error, seconds)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        window = collections.deque()
+        for assessment in assessments:
+            if len(window) >= max_in_flight:
+                yield finish(*window.popleft())
+            window.append((assessment, pool.submit(_render_stored, assessment.payload)))
+        while window:
+            yield finish(*window.popleft())
+
+
+# --------------------------------------------------
+# ZIP
+# --------------------------------------------------
+def index_row(item: ExportItem) -> dict:
+    a = item.assessment
+    row = {
+        "file": item.filename if item.ok else "",
+        "id": a.id,
+        "client_name": a.payload["client_name"],
+        "coach_name": a.payload["coach_name"],
+        "date": a.payload["date"],
+        "saved_at": datetime.datetime.fromtimestamp(a.created_at, datetime.timezone.utc).isoformat(timespec="seconds"),
+        "error": item.error,
+    }
+    for ch in CHAKRAS:
+        row[chakra_slug(ch)] = a.payload["chakras"][ch]["status"]
+    return row
+
+
+def export_zip(out, assessments: Iterable[StoredAssessment], workers: Optional[int] = None,
+               max_in_flight: Optional[int] = None,
+               on_item: Optional[Callable[[ExportItem], None]] = None) -> ExportSummary:
+    """Writes the zip to ``out`` (a path or a writable binary file, which needn't be seekable).
+
+    Failed reports get an index row with the error and no PDF; they never stop the export.
+    """
+    summary = ExportSummary()
+    start = time.perf_counter()
+    with tempfile.SpooledTemporaryFile(INDEX_SPOOL, mode="w+", encoding="utf-8", newline="") as index, \
+            zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf:
+        writer = csv.DictWriter(index, INDEX_FIELDS)
+        writer.writeheader()
+        for item in iter_export(assessments, workers, max_in_flight):
+            summary.total += 1
+            if item.ok:
+                zf.writestr(item.filename, item.pdf_bytes)
+                summary.exported += 1
+            else:
+                summary.errors.append((item.assessment.id, item.error))
+            writer.writerow(index_row(item))
+            if on_item:
+                on_item(item)
+            item.pdf_bytes = None
+        index.seek(0)
+        info = zipfile.ZipInfo(INDEX_NAME, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with zf.open(info, "w", force_zip64=True) as entry:
+            for chunk in iter(lambda: index.read(64 * 1024), ""):
+                entry.write(chunk.encode("utf-8"))
+    summary.seconds = time.perf_counter() - start
+    return summary
+
+
+def prune_exports(directory: str = EXPORT_DIR, keep: float = EXPORT_KEEP):
+    """Deletes app exports (soulful_export_*.zip) older than ``keep`` seconds."""
+    cutoff = time.time() - keep
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name.startswith("soulful_export_") and entry.name.endswith((".zip", ".zip.part")):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+
+def export_selection(out, store: AssessmentStore, client_name: Optional[str] = None,
+                     coach_name: Optional[str] = None, since=None, until=None, **kwargs) -> ExportSummary:
+    """export_zip over ``store.select(...)``; see AssessmentStore.select for the filters."""
+    selected = store.select(client_name, coach_name, since, until, batch_size=PAGE_SIZE)
+    return export_zip(out, selected, **kwargs)
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+def parse_date(text: str) -> datetime.date:
+    try:
+        return datetime.datetime.strptime(text, DATE_FORMAT).date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a date like {datetime.date.today().strftime(DATE_FORMAT)}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export stored assessments as a zip of PDFs with a CSV index.")
+    parser.add_argument("--zip", dest="zip_path", required=True, help="zip file to write ('-' for stdout)")
+    parser.add_argument("--db", default=DB_PATH, help="store to read (default: SOULFUL_DB_PATH)")
+    parser.add_argument("--client", help="only this client's sessions")
+    parser.add_argument("--coach", help="only this coach's sessions")
+    parser.add_argument("--since", type=parse_date, help=f"sessions dated on or after this day ({DATE_FORMAT})")
+    parser.add_argument("--until", type=parse_date, help="sessions dated on or before this day")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="reports rendered ahead of the zip writer (default: 2 x workers)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args(argv)
+
+    store = AssessmentStore(args.db)
+    total = store.count_matching(args.client, args.coach, args.since, args.until)
+    log = sys.stderr   # stdout may be the zip
+
+    def report(item: ExportItem):
+        if not item.ok:
+            print(f"[{item.assessment.id}] {item.assessment.payload['client_name']}: {item.error}", file=log)
+        elif not args.quiet:
+            print(f"[{item.assessment.id}] {item.filename} ({item.seconds * 1000:.0f} ms)", file=log)
+
+    print(f"exporting {total} assessments", file=log)
+    out = sys.stdout.buffer if args.zip_path == "-" else args.zip_path
+    try:
+        summary = export_selection(out, store, args.client, args.coach, args.since, args.until,
+                                   workers=args.workers, max_in_flight=args.max_in_flight, on_item=report)
+    finally:
+        store.close()
+    print(f"{summary.exported}/{summary.total} reports in {summary.seconds:.1f}s "
+          f"({summary.per_second:.1f}/s), {len(summary.errors)} failed", file=log)
+    return 1 if summary.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""Fonts shared by every report a process renders.
+
+Core fonts need nothing from here: fpdf keeps their metrics in a module-level
+table (fpdf.fonts.fpdf_charwidths) and assets.LOGO parses the logo once. An
+embedded TrueType font is a different story: FPDF.add_font reads its metrics
+again for every document, and closing the document re-parses the whole file,
+builds a subset and recomputes the width table, around 60 ms per style.
+
+Setting SOULFUL_FONT_PATH to a Unicode TTF switches the reports to that font,
+so clean_txt only drops what the font cannot draw and Devanagari (or any
+other) client names survive:
+
+    SOULFUL_FONT_PATH          regular style, e.g. NotoSans-Regular.ttf
+    SOULFUL_FONT_BOLD_PATH     bold style (default: the regular file)
+    SOULFUL_FONT_ITALIC_PATH   italic style (default: the regular file)
+
+Each file is parsed once per process and keeps one shared subset: the
+characters in COVERAGE that any document has used so far. Its font stream,
+width table and CID map are built once and embedded as they are in every
+document whose text stays inside it; a document that brings a new character
+grows the subset (once), and characters outside COVERAGE get a subset of
+their own, cached by the extra characters.
+
+fpdf 1.7 doesn't shape complex scripts: Devanagari comes out as the right
+characters in logical order, without conjuncts or reordered vowel signs.
+"""
+import functools
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+FONT_PATH = os.environ.get("SOULFUL_FONT_PATH", "")
+FONT_FILES = {
+    "": FONT_PATH,
+    "B": os.environ.get("SOULFUL_FONT_BOLD_PATH", "") or FONT_PATH,
+    "I": os.environ.get("SOULFUL_FONT_ITALIC_PATH", "") or FONT_PATH,
+}
+FAMILY = "helvetica"   # what set_font("Arial") resolves to, so the drawing code stays as it is
+
+# code points the shared subset may grow into: Latin, Devanagari, punctuation,
+# currency signs
+COVERAGE = ((0x20, 0x24F), (0x900, 0x97F), (0x2000, 0x206F), (0x20A0, 0x20CF))
+MAX_EXTRA_SUBSETS = 32   # exact subsets kept for text outside COVERAGE
+
+
+class Embedding:
+    """The objects one subset of a font needs in the PDF, ready to write out."""
+
+    __slots__ = ("codes", "widths", "cidtogidmap", "fontstream", "size")
+
+    def __init__(self, codes, widths, cidtogidmap, fontstream, size):
+        self.codes = codes               # code points with glyphs in the subset
+        self.widths = widths             # the CIDFont's /W line
+        self.cidtogidmap = cidtogidmap   # compressed, as a latin-1 str
+        self.fontstream = fontstream     # compressed, as a latin-1 str
+        self.size = size                 # uncompressed font program length
+
+
+class UnicodeFont:
+    """One TTF file: metrics parsed once, subsets built once and shared."""
+
+    def __init__(self, path: str):
+        from fpdf.ttfonts import TTFontFile
+
+        ttf = TTFontFile()
+        ttf.getMetrics(path)
+        self.path = path
+        self.name = re.sub("[ ()]", "", ttf.fullName)
+        self.desc = {
+            "Ascent": int(round(ttf.ascent, 0)),
+            "Descent": int(round(ttf.descent, 0)),
+            "CapHeight": int(round(ttf.capHeight, 0)),
+            "Flags": ttf.flags,
+            "FontBBox": "[%s %s %s %s]" % tuple(int(round(b, 0)) for b in ttf.bbox),
+            "ItalicAngle": int(ttf.italicAngle),
+            "StemV": int(round(ttf.stemV, 0)),
+            "MissingWidth": int(round(ttf.defaultWidth, 0)),
+        }
+        self.up = round(ttf.underlinePosition)
+        self.ut = round(ttf.underlineThickness)
+        self.cw = ttf.charWidths
+        self.covered = frozenset(c for lo, hi in COVERAGE for c in range(lo, hi + 1) if self.has(c))
+        self._base = None             # the shared subset
+        self._extra = OrderedDict()   # frozenset of code points outside COVERAGE -> Embedding
+        self._lock = threading.Lock()
+        self.subsets_built = 0
+
+    def has(self, code: int) -> bool:
+        return code < len(self.cw) and self.cw[code] != 0
+
+    def entry(self, i: int, fontkey: str) -> dict:
+        """A fresh FPDF font entry; only the used-character list is per document."""
+        return {
+            "i": i, "type": "TTF", "name": self.name, "desc": self.desc,
+            "up": self.up, "ut": self.ut, "cw": self.cw,
+            "ttffile": self.path, "fontkey": fontkey, "subset": [], "unifilename": None,
+            "pool": self,
+        }
+
+    def embedding(self, used) -> Embedding:
+        """A subset with every character ``used`` in one document, shared where possible."""
+        used = frozenset(c for c in frozenset(used) if c >= 0x20 and self.has(c))   # fpdf's list repeats
+        with self._lock:
+            base = self._base
+            if base is None or not (used & self.covered) <= base.codes:
+                grown = (base.codes if base else frozenset()) | (used & self.covered)
+                base = self._base = self._build(grown)
+            extra = used - self.covered
+            if not extra:
+                return base
+            emb = self._extra.get(extra)
+            if emb is None or not used <= emb.codes:
+                emb = self._extra[extra] = self._build(base.codes | extra)
+            self._extra.move_to_end(extra)
+            while len(self._extra) > MAX_EXTRA_SUBSETS:
+                self._extra.popitem(last=False)
+            return emb
+
+    def _build(self, codes) -> Embedding:
+        from fpdf import FPDF
+        from fpdf.ttfonts import TTFontFile
+
+        codes = frozenset(codes)
+        ttf = TTFontFile()
+        program = ttf.makeSubset(self.path, sorted(codes))
+        # fpdf's own width table code, run once on a scratch document
+        scratch = FPDF()
+        scratch._putTTfontwidths({"cw": self.cw, "subset": codes, "unifilename": None}, ttf.maxUni)
+        cidtogidmap = bytearray(256 * 256 * 2)
+        for cc, glyph in ttf.codeToGlyph.items():
+            cidtogidmap[cc * 2] = glyph >> 8
+            cidtogidmap[cc * 2 + 1] = glyph & 0xFF
+        self.subsets_built += 1
+        return Embedding(
+            codes,
+            scratch.buffer.rstrip("\n"),
+            zlib.compress(bytes(cidtogidmap)).decode("latin-1"),
+            zlib.compress(program).decode("latin-1"),
+            len(program),
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(path: str) -> UnicodeFont:
+    return UnicodeFont(path)
+
+
+@functools.lru_cache(maxsize=None)
+def unicode_fonts() -> dict:
+    """style -> UnicodeFont for the configured TTF, or {} for the core fonts."""
+    if not FONT_PATH:
+        return {}
+    return {style: load_font(path) for style, path in FONT_FILES.items()}
+
+
+def covers(code: int) -> bool:
+    """True if every configured style can draw ``code``."""
+    return all(font.has(code) for font in unicode_fonts().values())
+
+
+def profile() -> str:
+    """Identifies the fonts a report is set in, for cache keys ("" for the core fonts)."""
+    if not FONT_PATH:
+        return ""
+    return ",".join(os.path.basename(FONT_FILES[s]) for s in ("", "B", "I"))
+
+
+# --------------------------------------------------
+# DOCUMENTS
+# --------------------------------------------------
+def new_document():
+    """A new FPDF, with the configured Unicode font standing in for Arial/Helvetica."""
+    from fpdf import FPDF
+
+    fonts = unicode_fonts()
+    if not fonts:
+        return FPDF()
+    pdf = _document_class()()
+    for style, font in fonts.items():
+        pdf.fonts[FAMILY + style] = font.entry(len(pdf.fonts) + 1, FAMILY + style)
+    return pdf
+
+
+@functools.lru_cache(maxsize=None)
+def _document_class():
+    from fpdf import FPDF
+
+    class UnicodePDF(FPDF):
+        """FPDF that writes pooled fonts from their shared Embedding."""
+
+        def _putfonts(self):
+            pooled = {k: f for k, f in self.fonts.items() if "pool" in f}
+            for k in pooled:
+                del self.fonts[k]
+            try:
+                super()._putfonts()
+            finally:
+                self.fonts.update(pooled)
+            for font in sorted(pooled.values(), key=lambda f: f["i"]):
+                _put_font(self, font, font["pool"].embedding(font["subset"]))
+
+    return UnicodePDF
+
+
+def _put_font(pdf, font, emb: Embedding):
+    # the same objects FPDF._putfonts writes for a TTF font
+    font["n"] = pdf.n + 1
+    fontname = "MPDFAA+" + font["name"]
+    pdf._newobj()
+    pdf._out("<</Type /Font")
+    pdf._out("/Subtype /Type0")
+    pdf._out("/BaseFont /" + fontname)
+    pdf._out("/Encoding /Identity-H")
+    pdf._out("/DescendantFonts [" + str(pdf.n + 1) + " 0 R]")
+    pdf._out("/ToUnicode " + str(pdf.n + 2) + " 0 R")
+    pdf._out(">>")
+    pdf._out("endobj")
+
+    pdf._newobj()
+    pdf._out("<</Type /Font")
+    pdf._out("/Subtype /CIDFontType2")
+    pdf._out("/BaseFont /" + fontname)
+    pdf._out("/CIDSystemInfo " + str(pdf.n + 2) + " 0 R")
+    pdf._out("/FontDescriptor " + str(pdf.n + 3) + " 0 R")
+    if font["desc"].get("MissingWidth"):
+        pdf._out("/DW %d" % font["desc"]["MissingWidth"])
+    pdf._out(emb.widths)
+    pdf._out("/CIDToGIDMap " + str(pdf.n + 4) + " 0 R")
+    pdf._out(">>")
+    pdf._out("endobj")
+
+    pdf._newobj()
+    pdf._out("<</Length " + str(len(_TO_UNICODE)) + ">>")
+    pdf._putstream(_TO_UNICODE)
+    pdf._out("endobj")
+
+    pdf._newobj()
+    pdf._out("<</Registry (Adobe)")
+    pdf._out("/Ordering (UCS)")
+    pdf._out("/Supplement 0")
+    pdf._out(">>")
+    pdf._out("endobj")
+
+    pdf._newobj()
+    pdf._out("<</Type /FontDescriptor")
+    pdf._out("/FontName /" + fontname)
+    for kd in ("Ascent", "Descent", "CapHeight", "Flags", "FontBBox", "ItalicAngle", "StemV", "MissingWidth"):
+        v = font["desc"][kd]
+        if kd == "Flags":
+            v = (v | 4) & ~32   # non-symbolic
+        pdf._out(" /%s %s" % (kd, v))
+    pdf._out("/FontFile2 " + str(pdf.n + 2) + " 0 R")
+    pdf._out(">>")
+    pdf._out("endobj")
+
+    pdf._newobj()
+    pdf._out("<</Length " + str(len(emb.cidtogidmap)))
+    pdf._out("/Filter /FlateDecode")
+    pdf._out(">>")
+    pdf._putstream(emb.cidtogidmap)
+    pdf._out("endobj")
+
+    pdf._newobj()
+    pdf._out("<</Length " + str(len(emb.fontstream)))
+    pdf._out("/Filter /FlateDecode")
+    pdf._out("/Length1 " + str(emb.size))
+    pdf._out(">>")
+    pdf._putstream(emb.fontstream)
+    pdf._out("endobj")
+
+
+_TO_UNICODE = (
+    "/CIDInit /ProcSet findresource begin\n"
+    "12 dict begin\n"
+    "begincmap\n"
+    "/CIDSystemInfo\n"
+    "<</Registry (Adobe)\n"
+    "/Ordering (UCS)\n"
+    "/Supplement 0\n"
+    ">> def\n"
+    "/CMapName /Adobe-Identity-UCS def\n"
+    "/CMapType 2 def\n"
+    "1 begincodespacerange\n"
+    "<0000> <FFFF>\n"
+    "endcodespacerange\n"
+    "1 beginbfrange\n"
+    "<0000> <FFFF> <0000>\n"
+    "endbfrange\n"
+    "endcmap\n"
+    "CMapName currentdict /CMap defineresource pop\n"
+    "end\n"
+    "end"
+)
@@ -0,0 +1,74 @@
+"""Incremental re-rendering for the live preview.
+
+build_pdf() lays the report out as a sequence of per-client sections: the
+client header, the score bars, the quick reading and one block per chakra on
+the summary and detail pages. A SectionCache remembers the page operators of
+each section keyed on the arguments it was drawn from, so when the coach
+changes one chakra only that chakra's blocks (and the sections that depend on
+every status, such as the bars) are laid out again; everything else is
+replayed, moved up or down the page if an earlier block changed height.
+
+    pdf_bytes = render_incremental(payload)
+
+Sections replayed at their recorded position are byte-identical to make_pdf;
+moved ones are drawn through a translation and look the same.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+from instrument import trace
+from report import build_pdf, write_to
+from template import PageTemplate
+
+MAX_SECTIONS = 2048   # distinct section inputs kept, least recently used dropped first
+VARIANTS_PER_SECTION = 2
+
+
+class SectionCache(PageTemplate):
+    """A relocating PageTemplate with a bounded LRU instead of keep-the-first-N."""
+
+    def __init__(self, max_sections: int = MAX_SECTIONS):
+        super().__init__(relocate=True)
+        self.max_sections = max_sections
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _variants(self, key) -> list:
+        with self._lock:
+            variants = self._blocks.get(key)
+            if variants is None:
+                return ()
+            self._blocks.move_to_end(key)
+            return list(variants)
+
+    def _store(self, key, rec):
+        with self._lock:
+            variants = self._blocks.setdefault(key, [])
+            self._blocks.move_to_end(key)
+            variants.insert(0, rec)
+            del variants[VARIANTS_PER_SECTION:]
+            while len(self._blocks) > self.max_sections:
+                self._blocks.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sections = len(self._blocks)
+        return {"hits": self.hits, "relocated": self.relocated, "misses": self.misses, "sections": sections}
+
+
+SECTION_CACHE = SectionCache()
+
+
+def render_incremental(data: dict, sections: SectionCache = SECTION_CACHE, compress: bool = True) -> bytes:
+    """make_pdf, re-laying out only the sections whose inputs changed since earlier renders.
+
+    compress=False skips deflating the page streams: a larger file in roughly
+    half the time, which suits a preview that never leaves the machine.
+    """
+    with trace("preview", client=data.get("client_name", "")):
+        pdf = build_pdf(data, sections=sections)
+        pdf.set_compression(compress)
+        out = io.BytesIO()
+        write_to(pdf, out)
+        return out.getvalue()
@@ -0,0 +1,233 @@
+"""Per-stage timing for renders and email sends.
+
+    with instrument.trace("render", client="Asha"):
+        with instrument.span("page1"):
+            ...
+
+Off unless SOULFUL_TRACE=1 (or enable() is called): span() and trace() then
+hand back one shared no-op context manager, so the hooks left in make_pdf and
+the mailer cost a function call each. When on, every span's duration goes
+into a histogram per span name, and every finished trace is
+
+- logged as one JSON line on the "soulful.trace" logger,
+- counted by kind and outcome,
+- kept in a ring buffer of the last RECENT_TRACES for the debug panel.
+
+prometheus_text() renders the counters and histograms in the Prometheus text
+exposition format.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RECENT_TRACES = int(os.environ.get("SOULFUL_TRACE_RECENT", "50"))
+
+log = logging.getLogger("soulful.trace")
+
+_enabled = os.environ.get("SOULFUL_TRACE", "") not in ("", "0")
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = {}   # span name -> Histogram
+_counters = {}     # (kind, status) -> finished traces
+_recent = deque(maxlen=RECENT_TRACES)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True):
+    global _enabled
+    _enabled = bool(on)
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+# --------------------------------------------------
+# METRICS
+# --------------------------------------------------
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)   # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+def observe(name: str, seconds: float):
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = Histogram()
+        h.observe(seconds)
+
+
+def _labels(**labels) -> str:
+    inner = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels.items())
+    return "{" + inner + "}"
+
+
+def prometheus_text() -> str:
+    """Counters and histograms in the Prometheus text format."""
+    lines = [
+        "# HELP soulful_span_seconds Time spent in each instrumented stage.",
+        "# TYPE soulful_span_seconds histogram",
+    ]
+    with _lock:
+        for name, h in sorted(_histograms.items()):
+            running = 0
+            for le, n in zip(BUCKETS, h.counts):
+                running += n
+                lines.append(f"soulful_span_seconds_bucket{_labels(span=name, le=repr(le))} {running}")
+            lines.append(f"soulful_span_seconds_bucket{_labels(span=name, le='+Inf')} {h.count}")
+            lines.append(f"soulful_span_seconds_sum{_labels(span=name)} {h.sum:.6f}")
+            lines.append(f"soulful_span_seconds_count{_labels(span=name)} {h.count}")
+        lines.append("# HELP soulful_traces_total Finished renders and email sends by outcome.")
+        lines.append("# TYPE soulful_traces_total counter")
+        for (kind, status), n in sorted(_counters.items()):
+            lines.append(f"soulful_traces_total{_labels(kind=kind, status=status)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _recent.clear()
+
+
+# --------------------------------------------------
+# SPANS AND TRACES
+# --------------------------------------------------
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        observe(self.name, seconds)
+        current = getattr(_local, "trace", None)
+        if current is not None:
+            current.spans.append((self.name, seconds))
+        return False
+
+
+def span(name: str):
+    """Times a stage; recorded in the histogram and in the current trace, if any."""
+    return _Span(name) if _enabled else _NOOP
+
+
+class Trace:
+    """One render or email send and the spans timed while it ran."""
+
+    __slots__ = ("kind", "labels", "started", "seconds", "spans", "status", "error", "_start")
+
+    def __init__(self, kind: str, labels: dict = None):
+        self.kind = kind
+        self.labels = labels or {}
+        self.started = time.time()
+        self.seconds = 0.0
+        self.spans = []   # (name, seconds) in the order they finished
+        self.status = "ok"
+        self.error = ""
+
+    def __enter__(self):
+        _local.trace = self
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = time.perf_counter() - self._start
+        _local.trace = None
+        if exc_type is not None:
+            self.status = "error"
+            self.error = f"{exc_type.__name__}: {exc}"
+        record(self)
+        return False
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "labels": self.labels,
+            "started": self.started,
+            "seconds": round(self.seconds, 6),
+            "spans": [[name, round(s, 6)] for name, s in self.spans],
+            "status": self.status,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        t = cls(d["kind"], d.get("labels"))
+        t.started = d.get("started", t.started)
+        t.seconds = d.get("seconds", 0.0)
+        t.spans = [tuple(s) for s in d.get("spans", ())]
+        t.status = d.get("status", "ok")
+        t.error = d.get("error", "")
+        return t
+
+
+def trace(kind: str, **labels):
+    """Groups the spans of one operation; inside another trace it is just a span."""
+    if not _enabled:
+        return _NOOP
+    if getattr(_local, "trace", None) is not None:
+        return _Span(kind)
+    return Trace(kind, labels)
+
+
+def record(t: Trace, remote: bool = False):
+    """Files a finished trace; ``remote`` ones (from worker processes) also feed the histograms."""
+    if remote:
+        for name, seconds in t.spans:
+            observe(name, seconds)
+    observe(t.kind, t.seconds)
+    with _lock:
+        _counters[(t.kind, t.status)] = _counters.get((t.kind, t.status), 0) + 1
+        _recent.append(t)
+    if log.isEnabledFor(logging.INFO):
+        log.info(json.dumps(t.as_dict()))
+
+
+def recent(n: int = None) -> list:
+    """The last ``n`` finished traces as dicts, newest first."""
+    with _lock:
+        traces = list(_recent)
+    traces.reverse()
+    return [t.as_dict() for t in traces[:n]]
+
+
+def breakdown(t: dict) -> dict:
+    """Milliseconds per span name for one trace dict (repeated spans summed)."""
+    out = {}
+    for name, seconds in t["spans"]:
+        out[name] = out.get(name, 0.0) + seconds * 1000
+    return out
@@ -0,0 +1,102 @@
+"""Ahead-of-time line wrapping for FPDF's multi_cell.
+
+layout_text() runs the same line-breaking rules as FPDF.multi_cell (justified,
+no border, core fonts) and keeps the result; flow() then emits exactly what
+multi_cell would have emitted for that text, without re-measuring every
+character. Used for text that repeats across reports, such as the predefined
+chakra notes.
+"""
+from fpdf import FPDF
+from fpdf.fonts import fpdf_charwidths
+
+
+def _page_geometry():
+    # default A4/mm page, the one make_pdf uses
+    pdf = FPDF()
+    return pdf.k, pdf.c_margin, pdf.w - pdf.r_margin - pdf.l_margin
+
+
+PAGE_K, CELL_MARGIN, BODY_WIDTH = _page_geometry()
+
+
+class TextLayout:
+    __slots__ = ("text", "font", "size", "w", "h", "lines")
+
+    def __init__(self, text, font, size, w, h, lines):
+        self.text = text     # cleaned text the layout was made from
+        self.font = font     # FPDF font key, e.g. "helveticaI"
+        self.size = size     # points
+        self.w = w
+        self.h = h
+        self.lines = lines   # (operator before the line or None, word spacing, line text)
+
+
+def layout_text(text: str, font: str = "helvetica", size: float = 10, h: float = 5,
+                w: float = BODY_WIDTH) -> TextLayout:
+    """Breaks ``text`` into lines the way multi_cell(0, h, text) does at the left margin."""
+    cw = fpdf_charwidths[font]
+    k = PAGE_K
+    font_size = size / k
+    wmax = (w - 2 * CELL_MARGIN) * 1000.0 / font_size
+
+    lines = []
+    ws = 0
+    s = text.replace("\r", "")
+    nb = len(s)
+    if nb > 0 and s[nb - 1] == "\n":
+        nb -= 1
+    sep = -1
+    i = j = 0
+    l = ls = 0
+    ns = 0
+    while i < nb:
+        c = s[i]
+        if c == "\n":
+            pre = None
+            if ws > 0:
+                ws, pre = 0, "0 Tw"
+            lines.append((pre, ws, s[j:i]))
+            i += 1
+            sep, j, l, ns = -1, i, 0, 0
+            continue
+        if c == " ":
+            sep, ls = i, l
+            ns += 1
+        l += cw.get(c, 0)
+        if l > wmax:
+            if sep == -1:
+                if i == j:
+                    i += 1
+                pre = None
+                if ws > 0:
+                    ws, pre = 0, "0 Tw"
+                lines.append((pre, ws, s[j:i]))
+            else:
+                ws = (wmax - ls) / 1000.0 * font_size / (ns - 1) if ns > 1 else 0
+                lines.append(("%.3f Tw" % (ws * k), ws, s[j:sep]))
+                i = sep + 1
+            sep, j, l, ns = -1, i, 0, 0
+        else:
+            i += 1
+    pre = None
+    if ws > 0:
+        pre = "0 Tw"
+    lines.append((pre, 0, s[j:i]))
+    return TextLayout(text, font, size, w, h, tuple(lines))
+
+
+def flow(pdf, layout: TextLayout) -> bool:
+    """Emits a precomputed layout like multi_cell would; False if ``pdf`` isn't in a matching state."""
+    if (pdf.unifontsubset or pdf.ws or pdf.k != PAGE_K or pdf.c_margin != CELL_MARGIN
+            or pdf.font_family + pdf.font_style != layout.font or pdf.font_size_pt != layout.size
+            or pdf.w - pdf.r_margin - pdf.x != layout.w):
+        return False
+    w, h = layout.w, layout.h
+    for pre, ws, line in layout.lines:
+        if pre:
+            pdf._out(pre)
+        pdf.ws = ws
+        # cell() handles page breaks (and re-applies word spacing) itself
+        pdf.cell(w, h, line, 0, 2, "J", 0)
+    pdf.x = pdf.l_margin
+    return True
@@ -0,0 +1,477 @@
+"""Outbound email for reports.
+
+A Mailer owns one background thread and one SMTP session that is kept open
+between messages and re-established when the server drops it. send() only
+queues the message and returns a Delivery handle the UI can poll; transient
+failures are retried with exponential backoff, and messages that give up are
+appended to a dead-letter log.
+
+    mailer = Mailer(SmtpConfig(user="me@gmail.com", password="app-password"))
+    delivery = mailer.send_report("client@example.com", pdf_bytes, "Asha_chakra_report.pdf", "Asha")
+    delivery.status   # queued -> sending -> sent / retrying / failed
+
+send_bulk() is the batch counterpart: many reports over a small pool of
+sessions with a shared rate limit, returning a result per recipient.
+"""
+import heapq
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from instrument import span, trace
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+DEAD_LETTER_FILE = os.environ.get("SOULFUL_MAIL_DEAD_LETTER", "mail_dead_letter.jsonl")
+
+
+@dataclass
+class SmtpConfig:
+    host: str = "smtp.gmail.com"
+    port: int = 465
+    user: str = ""
+    password: str = ""
+    use_ssl: bool = True        # SMTP_SSL (Gmail on 465)
+    starttls: bool = False      # plain SMTP upgraded with STARTTLS (e.g. port 587)
+    timeout: float = 30
+    idle_check: float = 30      # NOOP the session before reuse after this many idle seconds
+    idle_close: float = 120     # QUIT the session after this many idle seconds
+    from_addr: str = ""         # defaults to the login user
+
+    @property
+    def sender(self) -> str:
+        return self.from_addr or self.user
+
+    @classmethod
+    def from_env(cls):
+        """SOULFUL_SMTP_HOST/PORT/USER/PASS/FROM, for the command-line tools."""
+        port = int(os.environ.get("SOULFUL_SMTP_PORT", "465"))
+        return cls(
+            host=os.environ.get("SOULFUL_SMTP_HOST", "smtp.gmail.com"),
+            port=port,
+            user=os.environ.get("SOULFUL_SMTP_USER", ""),
+            password=os.environ.get("SOULFUL_SMTP_PASS", ""),
+            from_addr=os.environ.get("SOULFUL_SMTP_FROM", ""),
+            use_ssl=port == 465,
+            starttls=port == 587,
+        )
+
+
+def build_report_email(sender: str, to_email: str, pdf_bytes: bytes, filename: str, client_name: str):
+    from email.message import EmailMessage
+
+    msg = EmailMessage()
+    msg["Subject"] = f"Chakra & Crystal Report for {client_name}"
+    msg["From"] = sender
+    msg["To"] = to_email
+    msg.set_content("Your Soulful Chakra & Crystal report is attached.")
+    msg.add_attachment(pdf_bytes, maintype="application", subtype="pdf", filename=filename)
+    return msg
+
+
+# --------------------------------------------------
+# SMTP SESSION
+# --------------------------------------------------
+class SmtpSession:
+    """One SMTP connection that is reused until it goes stale."""
+
+    def __init__(self, config: SmtpConfig):
+        self.config = config
+        self._smtp = None
+        self._last_used = 0.0
+        self.connects = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._smtp is not None
+
+    def _connect(self):
+        import smtplib
+
+        cfg = self.config
+        with span("smtp.connect"):
+            if cfg.use_ssl:
+                smtp = smtplib.SMTP_SSL(cfg.host, cfg.port, timeout=cfg.timeout)
+            else:
+                smtp = smtplib.SMTP(cfg.host, cfg.port, timeout=cfg.timeout)
+                if cfg.starttls:
+                    smtp.starttls()
+        try:
+            if cfg.user:
+                with span("smtp.login"):
+                    smtp.login(cfg.user, cfg.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self.connects += 1
+
+    def ensure(self):
+        """Connects, or checks an idle connection is still alive and reconnects if not."""
+        if self._smtp is not None and time.monotonic() - self._last_used > self.config.idle_check:
+            try:
+                with span("smtp.noop"):
+                    code, _ = self._smtp.noop()
+                if code != 250:
+                    self.close()
+            except Exception:
+                self.drop()
+        if self._smtp is None:
+            self._connect()
+        return self._smtp
+
+    def send(self, msg):
+        smtp = self.ensure()
+        try:
+            with span("smtp.send"):
+                smtp.send_message(msg)
+        except Exception as e:
+            if _is_connection_error(e):
+                self.drop()
+            raise
+        self._last_used = time.monotonic()
+
+    def idle_for(self) -> float:
+        return time.monotonic() - self._last_used if self._smtp is not None else 0.0
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+        self.drop()
+
+    def drop(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+        self._smtp = None
+
+
+def _is_connection_error(e: Exception) -> bool:
+    import smtplib
+
+    # SMTPException is itself an OSError, so only count socket-level errors
+    return isinstance(e, smtplib.SMTPServerDisconnected) or (
+        isinstance(e, OSError) and not isinstance(e, smtplib.SMTPException))
+
+
+def is_permanent(e: Exception) -> bool:
+    """True for failures a retry can't fix (bad login, rejected recipient, 5xx)."""
+    import smtplib
+
+    if isinstance(e, smtplib.SMTPAuthenticationError):
+        return True
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in e.recipients.values())
+    if isinstance(e, smtplib.SMTPResponseException):
+        return e.smtp_code >= 500
+    return isinstance(e, (ValueError, TypeError))
+
+
+# --------------------------------------------------
+# DELIVERIES
+# --------------------------------------------------
+QUEUED, SENDING, RETRYING, SENT, FAILED, REJECTED = "queued", "sending", "retrying", "sent", "failed", "rejected"
+
+
+class Delivery:
+    """Status handle for one queued message."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, to: str, subject: str, msg=None):
+        self.id = next(self._ids)
+        self.to = to
+        self.subject = subject
+        self.msg = msg
+        self.status = QUEUED
+        self.attempts = 0
+        self.error = ""
+        self.queued_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def ok(self) -> bool:
+        return self.status == SENT
+
+    def wait(self, timeout: float = None) -> bool:
+        self._done.wait(timeout)
+        return self.ok
+
+    def _finish(self, status: str, error: str = ""):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self.msg = None   # don't keep the PDF around once we're done
+        self._done.set()
+
+    def __repr__(self):
+        return f"<Delivery #{self.id} to={self.to!r} {self.status} attempts={self.attempts}>"
+
+
+class Mailer:
+    def __init__(self, config: SmtpConfig, queue_size: int = 200, max_attempts: int = 5,
+                 backoff: float = 2.0, max_backoff: float = 300.0, dead_letter_path: str = DEAD_LETTER_FILE):
+        self.config = config
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.dead_letter_path = dead_letter_path
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._retries = []   # heap of (due, seq, delivery)
+        self._seq = itertools.count()
+        self._session = SmtpSession(config)
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    # ---------- public ----------
+    def send(self, msg) -> Delivery:
+        """Queues an EmailMessage; never blocks on the network."""
+        delivery = Delivery(msg["To"], msg["Subject"], msg)
+        self.start()
+        try:
+            self._queue.put_nowait(delivery)
+        except queue.Full:
+            delivery._finish(REJECTED, "mail queue is full, try again shortly")
+        return delivery
+
+    def send_report(self, to_email: str, pdf_bytes: bytes, filename: str, client_name: str) -> Delivery:
+        with span("email.build"):
+            msg = build_report_email(self.config.sender, to_email, pdf_bytes, filename, client_name)
+        return self.send(msg)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="mailer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stops after the queue drains (pending retries are dead-lettered)."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "retrying": len(self._retries),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "connects": self._session.connects,
+        }
+
+    # ---------- worker ----------
+    def _next(self):
+        # the next delivery that's due: retries whose backoff expired go ahead of new
+        # mail, so they aren't starved while the queue stays busy
+        now = time.monotonic()
+        if self._retries and self._retries[0][0] <= now:
+            return heapq.heappop(self._retries)[2]
+        wait = self._retries[0][0] - now if self._retries else self.config.idle_check
+        try:
+            return self._queue.get(timeout=max(0.0, min(wait, 1.0)))
+        except queue.Empty:
+            return None
+
+    def _run(self):
+        try:
+            while True:
+                delivery = self._next()
+                if delivery is not None:
+                    self._attempt(delivery)
+                    continue
+                if self._stopping.is_set() and self._queue.empty():
+                    break
+                if self._session.idle_for() > self.config.idle_close:
+                    self._session.close()
+        finally:
+            while self._retries:
+                self._give_up(heapq.heappop(self._retries)[2], "mailer stopped")
+            self._session.close()
+
+    def _attempt(self, delivery: Delivery):
+        delivery.attempts += 1
+        delivery.status = SENDING
+        try:
+            with trace("email", attempt=delivery.attempts):
+                self._session.send(delivery.msg)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if is_permanent(e) or delivery.attempts >= self.max_attempts or self._stopping.is_set():
+                self._give_up(delivery, error)
+            else:
+                delivery.status = RETRYING
+                delivery.error = error
+                delay = min(self.backoff * 2 ** (delivery.attempts - 1), self.max_backoff)
+                heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), delivery))
+                self.retried += 1
+            return
+        self.sent += 1
+        delivery._finish(SENT)
+
+    def _give_up(self, delivery: Delivery, error: str):
+        self.failed += 1
+        record = {
+            "id": delivery.id,
+            "to": delivery.to,
+            "subject": delivery.subject,
+            "attempts": delivery.attempts,
+            "error": error,
+            "queued_at": delivery.queued_at,
+            "failed_at": time.time(),
+        }
+        if self.dead_letter_path:
+            try:
+                with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError:
+                pass
+        delivery._finish(FAILED, error)
+
+
+# --------------------------------------------------
+# BULK
+# --------------------------------------------------
+class RateLimiter:
+    """Token bucket shared by all connections: ``rate`` messages per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+@dataclass
+class BulkResult:
+    index: int
+    to: str
+    filename: str
+    status: str = QUEUED
+    attempts: int = 0
+    error: str = ""
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.status == SENT
+
+
+def send_bulk(config: SmtpConfig, jobs: Iterable[tuple], connections: int = 3, rate: Optional[float] = None,
+              burst: int = 5, max_attempts: int = 3, backoff: float = 2.0, max_per_connection: int = 100,
+              on_result: Optional[Callable[[BulkResult], None]] = None) -> list:
+    """Sends (to, pdf_bytes, filename, client_name) jobs over a few long-lived SMTP sessions.
+
+    ``connections`` sessions work in parallel, each sending message after
+    message without reconnecting (a fresh session after ``max_per_connection``
+    messages, as providers cap that). ``rate`` limits messages per second
+    across all of them. Jobs are read lazily, so a generator of rendered
+    reports is never held in memory all at once. Returns one BulkResult per
+    job, in input order; failures never stop the run.
+    """
+    if connections < 1:
+        raise ValueError(f"connections must be at least 1, got {connections}")
+    limiter = RateLimiter(rate, burst) if rate else None
+    work = queue.Queue(maxsize=connections * 2)
+    results = []
+    results_lock = threading.Lock()
+    done = object()
+
+    def finish(result: BulkResult, status: str, error: str, start: float):
+        result.status, result.error = status, error
+        result.seconds = time.perf_counter() - start
+        if on_result:
+            with results_lock:
+                on_result(result)
+
+    def worker():
+        session = SmtpSession(config)
+        sent_here = 0
+        try:
+            while True:
+                item = work.get()
+                if item is done:
+                    return
+                result, job = item
+                start = time.perf_counter()
+                try:
+                    to, pdf_bytes, filename, client_name = job
+                    msg = build_report_email(config.sender, to, pdf_bytes, filename, client_name)
+                except Exception as e:
+                    finish(result, FAILED, f"{type(e).__name__}: {e}", start)
+                    continue
+                while True:
+                    if sent_here >= max_per_connection:
+                        session.close()
+                        sent_here = 0
+                    if limiter:
+                        limiter.acquire()
+                    result.attempts += 1
+                    try:
+                        with trace("email", attempt=result.attempts, bulk=True):
+                            session.send(msg)
+                    except Exception as e:
+                        error = f"{type(e).__name__}: {e}"
+                        if is_permanent(e) or result.attempts >= max_attempts:
+                            finish(result, FAILED, error, start)
+                            break
+                        time.sleep(min(backoff * 2 ** (result.attempts - 1), 60))
+                        continue
+                    sent_here += 1
+                    finish(result, SENT, "", start)
+                    break
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, name=f"bulk-mail-{n}", daemon=True) for n in range(connections)]
+    for t in threads:
+        t.start()
+    try:
+        for index, job in enumerate(jobs):
+            # a malformed job still gets its result; the worker records why it failed
+            fields = tuple(job) if isinstance(job, (tuple, list)) and len(job) == 4 else ("", None, "", "")
+            result = BulkResult(index, str(fields[0]), str(fields[2]))
+            results.append(result)
+            work.put((result, job))
+    finally:
+        for _ in threads:
+            work.put(done)
+        for t in threads:
+            t.join()
+    return results
@@ -0,0 +1,225 @@
+"""Content-addressed cache of rendered report PDFs.
+
+Streamlit reruns main() on every interaction, so "Create & Download PDF"
+followed by "Send PDF to Email" used to render the same payload twice. PDFs
+are keyed on a canonical hash of the payload plus everything else that ends
+up in the file (template version, logo, embedded font, quick-reading rules),
+held in an in-memory LRU and, optionally, in a directory shared by sessions
+and worker processes.
+
+    SOULFUL_PDF_CACHE_DIR   enables the on-disk tier; processes sharing it also
+                            take turns rendering the same report (file locks)
+    SOULFUL_PDF_CACHE_MB    memory budget (default 64)
+    SOULFUL_PDF_CACHE_DISK_MB   disk budget (default 1024)
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from assets import LOGO, file_lock
+from fonts import profile
+from report import TEMPLATE_VERSION, make_pdf
+from rules import version as rules_version
+
+MB = 1024 * 1024
+PRUNE_EVERY = 64   # disk puts between directory scans
+LOCK_STRIPE_CHARS = 3   # 4096 lock files, shared by the keys with the same prefix
+
+
+def render_key(payload: dict) -> str:
+    """Stable hash of everything that decides the PDF's content."""
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    head = f"v{TEMPLATE_VERSION}|{os.path.basename(LOGO.path() or '')}|"
+    if profile():
+        head += profile() + "|"
+    if rules_version():
+        head += "rules:" + rules_version() + "|"
+    return hashlib.sha256((head + blob).encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    def __init__(self, max_items: int = 256, max_bytes: int = 64 * MB, disk_dir: str = None,
+                 disk_max_items: int = 100_000, disk_max_bytes: int = 1024 * MB):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_items = disk_max_items
+        self.disk_max_bytes = disk_max_bytes
+
+        self._items = OrderedDict()   # key -> pdf bytes, oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_puts = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.shared_hits = 0   # rendered by another process while this one waited
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_bytes=int(os.environ.get("SOULFUL_PDF_CACHE_MB", "64")) * MB,
+            disk_dir=os.environ.get("SOULFUL_PDF_CACHE_DIR") or None,
+            disk_max_bytes=int(os.environ.get("SOULFUL_PDF_CACHE_DISK_MB", "1024")) * MB,
+        )
+
+    # ---------- memory tier ----------
+    def _remember(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = data
+            self._bytes += len(data)
+            while len(self._items) > self.max_items or self._bytes > self.max_bytes:
+                _, dropped = self._items.popitem(last=False)
+                self._bytes -= len(dropped)
+                self.evictions += 1
+
+    # ---------- disk tier ----------
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".pdf")
+
+    def _disk_get(self, key: str):
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)   # recency for pruning
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key: str, data: bytes):
+        path = self._disk_path(key)
+        tmp = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)   # readers in other processes never see a partial file
+        except OSError:
+            if tmp:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+            return
+        with self._lock:
+            self._disk_puts += 1
+            prune = self._disk_puts % PRUNE_EVERY == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Drops the least recently used files until the disk tier is within budget."""
+        if not self.disk_dir:
+            return
+        files = []
+        try:
+            subdirs = [sub.path for sub in os.scandir(self.disk_dir) if sub.is_dir()]
+        except OSError:
+            return
+        for sub in subdirs:
+            for entry in os.scandir(sub):
+                if entry.name.endswith(".pdf"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        files.sort()
+        count = len(files)
+        for _, size, path in files:
+            if count <= self.disk_max_items and total <= self.disk_max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            count -= 1
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    # ---------- API ----------
+    def get(self, key: str):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return data
+        if self.disk_dir:
+            data = self._disk_get(key)
+            if data is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, data)
+                return data
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes):
+        self._remember(key, data)
+        if self.disk_dir:
+            self._disk_put(key, data)
+
+    def get_or_render(self, payload: dict, render=make_pdf) -> bytes:
+        key = render_key(payload)
+        data = self.get(key)
+        if data is not None:
+            return data
+        if not self.disk_dir:
+            data = render(payload)
+            self.put(key, data)
+            return data
+        # one process (or thread) renders a given report; the others wait and read its file
+        with file_lock(self._lock_path(key)):
+            data = self._disk_get(key)
+            if data is not None:
+                with self._lock:
+                    self.misses -= 1   # counted by get() before the wait
+                    self.shared_hits += 1
+                self._remember(key, data)
+                return data
+            data = render(payload)
+            self.put(key, data)
+        return data
+
+    def _lock_path(self, key: str) -> str:
+        # striped: a fixed set of lock files that is never pruned (unlinking a lock file races)
+        locks = os.path.join(self.disk_dir, ".locks")
+        os.makedirs(locks, exist_ok=True)
+        return os.path.join(locks, key[:LOCK_STRIPE_CHARS])
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.shared_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits + self.shared_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "items": len(self._items),
+                "bytes": self._bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+PDF_CACHE = PdfCache.from_env()
@@ -0,0 +1,273 @@
+"""Submission pipeline: render once, then persist, email and notify concurrently.
+
+One asyncio event loop runs in a background thread per process. submit() is
+called from ordinary (Streamlit) threads and hands back a Submission at once;
+its pdf() returns as soon as the render stage is done, while the side effects
+carry on in the background:
+
+    render    the CPU-bound make_pdf, in an executor (threads by default)
+    persist   AssessmentStore.save, in a thread
+    email     Mailer.send_report, then waits for the delivery to finish
+    webhook   POSTs a small JSON notice to SOULFUL_WEBHOOK_URL, if set
+
+    sub = pipeline.submit(payload, email_to="client@example.com", mailer=mailer)
+    pdf_bytes = sub.pdf(timeout=30)
+    sub.stages["email"].status   # pending -> running -> done / failed / timeout / cancelled
+
+Every stage has its own timeout (SOULFUL_*_TIMEOUT, in seconds). The side
+effects run in one TaskGroup, but a failing stage only records its error: it
+doesn't cancel the others. Submission.cancel() and Pipeline.close() cancel
+whatever is still running. Work already handed to a thread (a SQLite write,
+an SMTP session) can't be interrupted; the stage is marked and the thread is
+left to finish.
+"""
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import os
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import instrument
+from report import make_pdf, report_filename
+
+PENDING, RUNNING, DONE, FAILED, TIMEOUT, CANCELLED, SKIPPED = (
+    "pending", "running", "done", "failed", "timeout", "cancelled", "skipped")
+FINISHED = (DONE, FAILED, TIMEOUT, CANCELLED, SKIPPED)
+
+TIMEOUTS = {"render": 30.0, "persist": 10.0, "email": 300.0, "webhook": 10.0}
+EMAIL_POLL = 0.25   # seconds between looks at the mailer's Delivery
+
+
+@dataclass
+class Stage:
+    name: str
+    status: str = PENDING
+    detail: str = ""      # e.g. the email delivery's own status
+    error: str = ""
+    seconds: float = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+
+class Submission:
+    """Handle for one submitted payload; safe to read from any thread."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, client_name: str, stages: list):
+        self.id = next(self._ids)
+        self.client_name = client_name
+        self.stages = {name: Stage(name) for name in stages}
+        self.submitted_at = time.time()
+        self.delivery = None   # mailer.Delivery, once the email is queued
+        self._pdf = concurrent.futures.Future()
+        self._task = None      # concurrent future of the pipeline coroutine
+
+    def pdf(self, timeout: float = None) -> bytes:
+        """The rendered PDF; raises the render error (or TimeoutError/CancelledError)."""
+        return self._pdf.result(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._pdf.done()
+
+    @property
+    def done(self) -> bool:
+        return all(s.done for s in self.stages.values())
+
+    @property
+    def ok(self) -> bool:
+        return all(s.status in (DONE, SKIPPED) for s in self.stages.values())
+
+    def cancel(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until every stage finished; True if they all succeeded."""
+        if self._task is not None:
+            try:
+                self._task.result(timeout)
+            except concurrent.futures.CancelledError:
+                pass
+        return self.ok
+
+    def __repr__(self):
+        stages = " ".join(f"{s.name}={s.status}" for s in self.stages.values())
+        return f"<Submission #{self.id} {self.client_name!r} {stages}>"
+
+
+def post_json(url: str, body: dict, timeout: float) -> int:
+    data = json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(url, data=data, method="POST", headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return resp.status
+
+
+class Pipeline:
+    def __init__(self, store=None, render: Callable[[dict], bytes] = make_pdf, executor=None,
+                 webhook_url: Optional[str] = None, timeouts: Optional[dict] = None):
+        self.store = store
+        self.render = render
+        # threads by default: PDF_CACHE and the page templates live in this process.
+        # A ProcessPoolExecutor works too if ``render`` can be pickled.
+        self._own_executor = executor is None
+        self.executor = executor or concurrent.futures.ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 1, thread_name_prefix="render")
+        self.webhook_url = webhook_url
+        self.timeouts = dict(TIMEOUTS, **(timeouts or {}))
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="pipeline", daemon=True)
+        self._thread.start()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.failed = 0
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        timeouts = {name: float(os.environ.get(f"SOULFUL_{name.upper()}_TIMEOUT", default))
+                    for name, default in TIMEOUTS.items()}
+        kwargs.setdefault("webhook_url", os.environ.get("SOULFUL_WEBHOOK_URL") or None)
+        kwargs.setdefault("timeouts", timeouts)
+        return cls(**kwargs)
+
+    # ---------- public ----------
+    def submit(self, payload: dict, persist: bool = True, email_to: Optional[str] = None,
+               mailer=None) -> Submission:
+        """Starts a submission and returns immediately; see Submission.pdf()."""
+        stages = ["render"]
+        if persist and self.store is not None:
+            stages.append("persist")
+        if email_to and mailer is not None:
+            stages.append("email")
+        if self.webhook_url:
+            stages.append("webhook")
+        sub = Submission(payload.get("client_name", ""), stages)
+        with self._lock:
+            self.submitted += 1
+        sub._task = asyncio.run_coroutine_threadsafe(self._run(sub, payload, email_to, mailer), self._loop)
+        return sub
+
+    def close(self, timeout: float = 10.0):
+        """Cancels what's still running and stops the loop thread."""
+        if self._loop.is_closed():
+            return
+        fut = asyncio.run_coroutine_threadsafe(self._cancel_all(), self._loop)
+        try:
+            fut.result(timeout)
+        except concurrent.futures.TimeoutError:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop.close()
+        if self._own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {"submitted": self.submitted, "failed": self.failed}
+
+    # ---------- loop side ----------
+    async def _cancel_all(self):
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _stage(self, sub: Submission, name: str, work):
+        """Runs one stage under its timeout and records how it ended; re-raises."""
+        stage = sub.stages[name]
+        stage.status = RUNNING
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(self.timeouts[name]):
+                result = await work
+        except TimeoutError:
+            stage.status, stage.error = TIMEOUT, f"took longer than {self.timeouts[name]:g}s"
+            raise
+        except asyncio.CancelledError:
+            stage.status = CANCELLED
+            raise
+        except Exception as e:
+            stage.status, stage.error = FAILED, f"{type(e).__name__}: {e}"
+            raise
+        else:
+            stage.status = DONE
+            return result
+        finally:
+            stage.seconds = time.perf_counter() - start
+            if instrument.enabled():
+                instrument.observe(f"pipeline.{name}", stage.seconds)
+
+    async def _side_effect(self, sub: Submission, name: str, work):
+        # failures stay in the stage's status instead of cancelling the sibling stages
+        try:
+            await self._stage(sub, name, work)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+
+    async def _run(self, sub: Submission, payload: dict, email_to, mailer):
+        loop = asyncio.get_running_loop()
+        work = loop.run_in_executor(self.executor, self.render, payload)
+        try:
+            pdf = await self._stage(sub, "render", work)
+        except asyncio.CancelledError:
+            work.cancel()   # drops it if it hasn't started yet
+            self._abandon(sub, CANCELLED)
+            sub._pdf.cancel()
+            raise
+        except Exception as e:
+            self._abandon(sub, SKIPPED)
+            sub._pdf.set_exception(e)
+            return
+        sub._pdf.set_result(pdf)
+
+        try:
+            async with asyncio.TaskGroup() as tg:
+                if "persist" in sub.stages:
+                    tg.create_task(self._side_effect(sub, "persist", asyncio.to_thread(self.store.save, payload)))
+                if "email" in sub.stages:
+                    tg.create_task(self._side_effect(sub, "email", self._email(sub, mailer, email_to, pdf, payload)))
+                if "webhook" in sub.stages:
+                    tg.create_task(self._side_effect(sub, "webhook", self._webhook(payload, pdf)))
+        finally:
+            for stage in sub.stages.values():
+                if stage.status == PENDING:
+                    stage.status = CANCELLED
+
+    def _abandon(self, sub: Submission, status: str):
+        # the render didn't produce a PDF: nothing to save or send
+        for stage in sub.stages.values():
+            if stage.status == PENDING:
+                stage.status = status
+        with self._lock:
+            self.failed += 1
+
+    async def _email(self, sub: Submission, mailer, to: str, pdf: bytes, payload: dict):
+        name = payload.get("client_name", "")
+        delivery = await asyncio.to_thread(mailer.send_report, to, pdf, report_filename(name), name)
+        sub.delivery = delivery
+        stage = sub.stages["email"]
+        while not delivery.done:
+            stage.detail = delivery.status
+            await asyncio.sleep(EMAIL_POLL)
+        stage.detail = delivery.status
+        if not delivery.ok:
+            raise RuntimeError(delivery.error or delivery.status)
+
+    async def _webhook(self, payload: dict, pdf: bytes):
+        body = {
+            "event": "report.ready",
+            "client_name": payload.get("client_name", ""),
+            "coach_name": payload.get("coach_name", ""),
+            "date": payload.get("date", ""),
+            "pdf_bytes": len(pdf),
+        }
+        await asyncio.to_thread(post_json, self.webhook_url, body, self.timeouts["webhook"])
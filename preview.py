@@ -0,0 +1,145 @@
+"""Live report preview, rendered off the Streamlit script thread.
+
+Each browser session owns a PreviewWorker. Every rerun submits the current
+payload; the worker waits until the inputs have been quiet for DEBOUNCE
+seconds, renders the PDF incrementally and rasterises page thumbnails. A
+newer submit cancels work on an older one (checked between pages), and a
+result is only handed back for the exact inputs it was made from.
+
+Thumbnails need pypdfium2; without it the preview is the PDF alone.
+"""
+import io
+import threading
+import time
+
+from incremental import render_incremental
+from pdf_cache import render_key
+
+DEBOUNCE = 0.4       # seconds of quiet before rendering
+THUMB_SCALE = 0.6    # 1.0 = 72 dpi
+IDLE_EXIT = 300      # worker thread ends after this long without submits
+
+# PDFium isn't thread-safe and every session has its own preview thread, so
+# every pypdfium2 call in the process goes through this lock
+_PDFIUM_LOCK = threading.Lock()
+
+
+class Preview:
+    __slots__ = ("key", "pdf_bytes", "pages", "seconds", "error")
+
+    def __init__(self, key, pdf_bytes=None, pages=(), seconds=0.0, error=""):
+        self.key = key
+        self.pdf_bytes = pdf_bytes
+        self.pages = pages       # PNG bytes per page (empty without a rasteriser)
+        self.seconds = seconds
+        self.error = error
+
+
+def thumbnails(pdf_bytes: bytes, scale: float = THUMB_SCALE, cancelled=lambda: False) -> list:
+    """PNG bytes per page, or [] when pypdfium2 isn't installed or ``cancelled()`` turns true."""
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        return []
+    with _PDFIUM_LOCK:
+        doc = pdfium.PdfDocument(pdf_bytes)
+        count = len(doc)
+    pages = []
+    try:
+        for i in range(count):
+            if cancelled():
+                return []
+            # held per page, so other sessions' previews interleave; PNG encoding needs no lock
+            with _PDFIUM_LOCK:
+                page = doc[i]
+                bitmap = page.render(scale=scale)
+                image = bitmap.to_pil().copy()   # detached from PDFium's buffer before it is freed
+                bitmap.close()
+                page.close()
+            buf = io.BytesIO()
+            image.save(buf, format="PNG", optimize=False)
+            pages.append(buf.getvalue())
+    finally:
+        with _PDFIUM_LOCK:
+            doc.close()
+    return pages
+
+
+class PreviewWorker:
+    def __init__(self, render=render_incremental, debounce: float = DEBOUNCE, scale: float = THUMB_SCALE):
+        self.render = render
+        self.debounce = debounce
+        self.scale = scale
+        self._cond = threading.Condition()
+        self._thread = None
+        self._generation = 0
+        self._wanted = None       # (generation, key, payload) still to render
+        self._wanted_key = None
+        self._changed_at = 0.0
+        self._latest = None       # most recent finished Preview
+        self.renders = 0
+        self.cancelled = 0
+
+    def submit(self, payload: dict) -> str:
+        """Asks for a preview of ``payload``; returns the key to look the result up with."""
+        key = render_key(payload)
+        with self._cond:
+            if key == self._wanted_key:
+                return key
+            self._generation += 1
+            self._wanted_key = key
+            if self._latest is not None and self._latest.key == key:
+                self._wanted = None   # back to inputs we already have a preview for
+            else:
+                self._wanted = (self._generation, key, payload)
+                self._changed_at = time.monotonic()
+            self._cond.notify()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="pdf-preview", daemon=True)
+                self._thread.start()
+        return key
+
+    def result(self, key: str):
+        """The finished Preview for ``key``, or None while it's still pending."""
+        latest = self._latest
+        return latest if latest is not None and latest.key == key else None
+
+    def _stale(self, generation: int) -> bool:
+        return self._generation != generation
+
+    def _next(self):
+        # blocks until there is work whose inputs have settled; None means exit
+        with self._cond:
+            idle_since = time.monotonic()
+            while True:
+                if self._wanted is not None:
+                    wait = self._changed_at + self.debounce - time.monotonic()
+                    if wait <= 0:
+                        job, self._wanted = self._wanted, None
+                        return job
+                else:
+                    wait = idle_since + IDLE_EXIT - time.monotonic()
+                    if wait <= 0:
+                        self._thread = None
+                        return None
+                self._cond.wait(wait)
+
+    def _run(self):
+        while True:
+            job = self._next()
+            if job is None:
+                return
+            generation, key, payload = job
+            start = time.perf_counter()
+            try:
+                pdf_bytes = self.render(payload)
+                pages = thumbnails(pdf_bytes, self.scale, lambda: self._stale(generation))
+                preview = Preview(key, pdf_bytes, pages, time.perf_counter() - start)
+            except Exception as e:
+                preview = Preview(key, error=f"{type(e).__name__}: {e}")
+            with self._cond:
+                if self._stale(generation):
+                    self.cancelled += 1   # inputs changed while rendering; the newer job is queued
+                    continue
+                self._latest = preview
+                self.renders += 1
@@ -0,0 +1,372 @@
+"""Progress reports: one PDF covering every session of one client.
+
+A ClientProgress is a running aggregate of a client's sessions in date order.
+add() folds in one session in constant time: per-chakra status counts, the
+number of status changes, the first and the latest reading, the most recent
+changes, and a score trajectory of at most MAX_POINTS buckets. When the
+trajectory is full, neighbouring buckets are merged pairwise and every later
+bucket holds twice as many sessions, so memory and drawing cost depend on
+MAX_POINTS, not on the length of the history.
+
+The aggregate is kept in the store (progress table) next to the last
+assessment folded in; client_progress() loads it and adds only the sessions
+saved since.
+
+    progress = client_progress(store, "Asha")
+    pdf_bytes = make_progress_pdf(progress)
+"""
+import io
+import json
+from collections import deque
+from typing import Optional
+
+from report import (CHAKRA_COLORS, CHAKRAS, LOGO, STATUS_OPTIONS, STATUS_SCORE, clean_txt,
+                    download_logo, write_to)
+from store import day_to_date
+
+N_CHAKRAS = len(CHAKRAS)
+SCORES = tuple(STATUS_SCORE.get(s, 60) for s in STATUS_OPTIONS)   # by status index
+MAX_POINTS = 48        # trajectory buckets kept (and drawn) per client
+RECENT_CHANGES = 30    # status changes listed in the report
+STATE_VERSION = 1      # bump when to_dict() changes shape (stored aggregates are rebuilt)
+
+
+class OutOfOrder(ValueError):
+    """A session dated before ones already folded in; the aggregate has to be rebuilt."""
+
+
+def unpack(code: int) -> tuple:
+    # report.encode_statuses packing: two bits per chakra, root lowest
+    return tuple((code >> (2 * i)) & 3 for i in range(N_CHAKRAS))
+
+
+# --------------------------------------------------
+# AGGREGATE
+# --------------------------------------------------
+class ClientProgress:
+    def __init__(self, client: str):
+        self.client = client
+        self.sessions = 0
+        self.last_id = 0          # highest assessment id folded in
+        self.last_key = None      # (day, id) of the latest session, for ordering
+        self.first_day = None
+        self.first = None         # status indices of the first session
+        self.latest = None        # ... and of the latest one
+        self.since = [None] * N_CHAKRAS                            # day the latest status started
+        self.counts = [[0] * len(STATUS_OPTIONS) for _ in CHAKRAS]   # sessions per chakra and status
+        self.changes = [0] * N_CHAKRAS
+        self.recent = deque(maxlen=RECENT_CHANGES)   # (day, chakra, from, to), oldest first
+        self.width = 1            # sessions per trajectory bucket
+        self.buckets = []         # [first day, last day, sessions, score sum per chakra...]
+
+    def add(self, assessment_id: int, day: int, code: int):
+        """Folds in one session; sessions must come in (day, id) order."""
+        key = (day, assessment_id)
+        if self.last_key is not None and key <= self.last_key:
+            raise OutOfOrder(f"session {assessment_id} on day {day} is before {self.last_key}")
+        statuses = unpack(code)
+        if self.latest is None:
+            self.first_day = day
+            self.first = statuses
+            self.since = [day] * N_CHAKRAS
+        else:
+            for i, (before, now) in enumerate(zip(self.latest, statuses)):
+                if before != now:
+                    self.changes[i] += 1
+                    self.since[i] = day
+                    self.recent.append((day, i, before, now))
+        for i, s in enumerate(statuses):
+            self.counts[i][s] += 1
+        self.latest = statuses
+        self.last_key = key
+        self.last_id = max(self.last_id, assessment_id)
+        self.sessions += 1
+        self._add_point(day, statuses)
+
+    def _add_point(self, day: int, statuses: tuple):
+        last = self.buckets[-1] if self.buckets else None
+        if last is None or last[2] >= self.width:
+            last = [day, day, 0] + [0] * N_CHAKRAS
+            self.buckets.append(last)
+        last[1] = day
+        last[2] += 1
+        for i, s in enumerate(statuses):
+            last[3 + i] += SCORES[s]
+        if len(self.buckets) > MAX_POINTS:
+            self._halve()
+
+    def _halve(self):
+        merged = []
+        for a, b in zip(self.buckets[::2], self.buckets[1::2]):
+            merged.append([a[0], b[1], a[2] + b[2]] + [x + y for x, y in zip(a[3:], b[3:])])
+        if len(self.buckets) % 2:
+            merged.append(self.buckets[-1])
+        self.buckets = merged
+        self.width *= 2
+
+    def trajectory(self) -> list:
+        """(first day, last day, sessions, mean score per chakra) per bucket, oldest first."""
+        return [(b[0], b[1], b[2], tuple(x / b[2] for x in b[3:])) for b in self.buckets]
+
+    # ---------- storage ----------
+    def to_dict(self) -> dict:
+        return {
+            "v": STATE_VERSION,
+            "client": self.client,
+            "sessions": self.sessions,
+            "last_id": self.last_id,
+            "last_key": list(self.last_key) if self.last_key else None,
+            "first_day": self.first_day,
+            "first": self.first,
+            "latest": self.latest,
+            "since": self.since,
+            "counts": self.counts,
+            "changes": self.changes,
+            "recent": list(self.recent),
+            "width": self.width,
+            "buckets": self.buckets,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> Optional["ClientProgress"]:
+        if d.get("v") != STATE_VERSION:
+            return None
+        p = cls(d["client"])
+        p.sessions = d["sessions"]
+        p.last_id = d["last_id"]
+        p.last_key = tuple(d["last_key"]) if d["last_key"] else None
+        p.first_day = d["first_day"]
+        p.first = tuple(d["first"]) if d["first"] else None
+        p.latest = tuple(d["latest"]) if d["latest"] else None
+        p.since = d["since"]
+        p.counts = d["counts"]
+        p.changes = d["changes"]
+        p.recent.extend(tuple(c) for c in d["recent"])
+        p.width = d["width"]
+        p.buckets = d["buckets"]
+        return p
+
+
+def client_progress(store, client_name: str) -> ClientProgress:
+    """The client's aggregate, updated with sessions saved since it was last stored."""
+    progress = None
+    saved = store.progress_state(client_name)
+    if saved is not None:
+        progress = ClientProgress.from_dict(json.loads(saved[1]))
+    if progress is None:
+        progress = ClientProgress(client_name)
+    rows = store.client_sessions(client_name, after_id=progress.last_id)
+    if not rows:
+        return progress
+    try:
+        for row in rows:
+            progress.add(*row)
+    except OutOfOrder:
+        # a back-dated session: fold everything in again, in date order
+        progress = ClientProgress(client_name)
+        for row in store.client_sessions(client_name):
+            progress.add(*row)
+    store.save_progress_state(client_name, progress.last_id, json.dumps(progress.to_dict(), separators=(",", ":")))
+    return progress
+
+
+# --------------------------------------------------
+# PDF
+# --------------------------------------------------
+CHART_W, CHART_H = 86, 30          # one small chart per chakra, two per row
+CHART_LEFT = (14, 112)
+CHART_ROW = 46                     # mm from one row of charts to the next
+SCORE_MIN, SCORE_MAX = 30, 100     # y range of the charts
+GRID = sorted(set(SCORES))
+
+
+def _date(day) -> str:
+    return day_to_date(day) if day is not None else "-"
+
+
+def _short_status(index: int) -> str:
+    return STATUS_OPTIONS[index].split(" / ")[0]
+
+
+def _header(pdf, progress: ClientProgress, subtitle: str):
+    pdf.add_page()
+    pdf.set_fill_color(139, 92, 246)
+    pdf.rect(0, 0, 210, 15, "F")
+    LOGO.place(pdf, x=10, y=2, w=14)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", "B", 14)
+    pdf.set_xy(28, 3)
+    pdf.cell(0, 6, clean_txt("Soulful Academy"), ln=True)
+    pdf.set_x(28)
+    pdf.set_font("Arial", "", 10)
+    pdf.cell(0, 5, clean_txt(subtitle), ln=True)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_y(20)
+
+
+def _draw_overview(pdf, progress: ClientProgress):
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 6, clean_txt(f"Client: {progress.client}"), ln=True)
+    pdf.set_font("Arial", "", 10)
+    pdf.cell(0, 5, clean_txt(f"Sessions: {progress.sessions}, {_date(progress.first_day)} to "
+                             f"{_date(progress.last_key[0])}"), ln=True)
+    pdf.ln(4)
+
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 6, clean_txt("First session and today"), ln=True)
+    pdf.set_font("Arial", "", 9)
+    y = pdf.get_y() + 2
+    max_bar = 90
+    for i, ch in enumerate(CHAKRAS):
+        first, latest = SCORES[progress.first[i]], SCORES[progress.latest[i]]
+        pdf.set_xy(15, y)
+        pdf.cell(0, 5, clean_txt(ch), ln=0)
+        pdf.set_fill_color(225, 225, 225)
+        pdf.rect(75, y + 0.5, max_bar * first / 100.0, 2, "F")
+        pdf.set_fill_color(*CHAKRA_COLORS[ch])
+        pdf.rect(75, y + 2.5, max_bar * latest / 100.0, 2.5, "F")
+        pdf.set_xy(170, y)
+        delta = latest - first
+        pdf.cell(0, 5, clean_txt(f"{first}% -> {latest}%" + (f" ({delta:+d})" if delta else "")), ln=1)
+        y += 7
+    pdf.set_y(y + 2)
+    pdf.set_font("Arial", "I", 8)
+    pdf.cell(0, 4, clean_txt("Grey: first session. Colour: latest session."), ln=True)
+    pdf.ln(4)
+
+    # status table
+    widths = (48, 24, 20, 16, 19, 22, 19, 20)
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 6, clean_txt("Status by chakra"), ln=True)
+    pdf.set_font("Arial", "B", 8)
+    pdf.set_fill_color(243, 240, 255)
+    heads = ("Chakra", "Latest status", "Since", "Changes") + tuple(map(_short_status, range(len(STATUS_OPTIONS))))
+    for w, head in zip(widths, heads):
+        pdf.cell(w, 6, clean_txt(head), border=1, fill=True)
+    pdf.ln()
+    pdf.set_font("Arial", "", 8)
+    for i, ch in enumerate(CHAKRAS):
+        row = (ch, _short_status(progress.latest[i]), _date(progress.since[i]), str(progress.changes[i]))
+        row += tuple(str(n) for n in progress.counts[i])
+        for w, text in zip(widths, row):
+            pdf.cell(w, 6, clean_txt(text), border=1)
+        pdf.ln()
+    pdf.set_font("Arial", "I", 8)
+    pdf.cell(0, 5, clean_txt("The last four columns count the sessions in each status."), ln=True)
+
+
+def _draw_chart(pdf, x, y, ch, index, points, start, span):
+    w, h = CHART_W, CHART_H
+    pdf.set_font("Arial", "B", 9)
+    pdf.set_xy(x, y - 5)
+    pdf.cell(w, 5, clean_txt(ch), ln=0)
+
+    def py(score):
+        return y + h - (score - SCORE_MIN) / float(SCORE_MAX - SCORE_MIN) * h
+
+    pdf.set_line_width(0.1)
+    pdf.set_draw_color(220, 220, 220)
+    pdf.set_font("Arial", "", 6)
+    for score in GRID:
+        pdf.line(x, py(score), x + w, py(score))
+        pdf.set_xy(x - 7, py(score) - 1.5)
+        pdf.cell(6, 3, str(score), align="R")
+    pdf.set_draw_color(160, 160, 160)
+    pdf.rect(x, y, w, h)
+
+    pdf.set_draw_color(*CHAKRA_COLORS[ch])
+    pdf.set_fill_color(*CHAKRA_COLORS[ch])
+    pdf.set_line_width(0.5)
+    prev = None
+    for n, (d0, d1, _, means) in enumerate(points):
+        if span:
+            px = x + ((d0 + d1) / 2.0 - start) / span * w
+        else:
+            px = x + (n + 0.5) / len(points) * w
+        here = (px, py(means[index]))
+        if prev is not None:
+            pdf.line(prev[0], prev[1], here[0], here[1])
+        prev = here
+    if len(points) == 1:
+        pdf.rect(prev[0] - 0.6, prev[1] - 0.6, 1.2, 1.2, "F")
+
+
+def _draw_trajectories(pdf, progress: ClientProgress):
+    points = progress.trajectory()
+    start, end = points[0][0], points[-1][1]
+    span = end - start
+    pdf.set_font("Arial", "", 9)
+    per = f" (each point averages {progress.width} sessions)" if progress.width > 1 else ""
+    pdf.multi_cell(0, 5, clean_txt(f"Energy score per session, {_date(start)} to {_date(end)}{per}. "
+                                   f"100 = Balanced, 75 = Slightly Weak, 55 = Overactive, 40 = Blocked."))
+    top = pdf.get_y() + 8
+    for i, ch in enumerate(CHAKRAS):
+        x = CHART_LEFT[i % 2]
+        y = top + (i // 2) * CHART_ROW
+        _draw_chart(pdf, x, y, ch, i, points, start, span)
+        pdf.set_font("Arial", "", 6)
+        pdf.set_text_color(120, 120, 120)
+        pdf.set_xy(x, y + CHART_H + 0.5)
+        pdf.cell(CHART_W / 2, 3, _date(start))
+        pdf.cell(CHART_W / 2, 3, _date(end), align="R")
+        pdf.set_text_color(0, 0, 0)
+    pdf.set_line_width(0.2)
+    pdf.set_draw_color(0, 0, 0)
+
+
+def _draw_changes(pdf, progress: ClientProgress):
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 6, clean_txt("Status changes"), ln=True)
+    pdf.set_font("Arial", "", 9)
+    if not progress.recent:
+        pdf.cell(0, 5, clean_txt("No chakra has changed status across these sessions."), ln=True)
+        return
+    shown = len(progress.recent)
+    total = sum(progress.changes)
+    note = f"The latest {shown} of {total} changes, newest first." if total > shown else "Newest first."
+    pdf.cell(0, 5, clean_txt(note), ln=True)
+    pdf.ln(1)
+    widths = (24, 60, 50, 50)
+    pdf.set_font("Arial", "B", 8)
+    pdf.set_fill_color(243, 240, 255)
+    for w, head in zip(widths, ("Date", "Chakra", "From", "To")):
+        pdf.cell(w, 6, clean_txt(head), border=1, fill=True)
+    pdf.ln()
+    pdf.set_font("Arial", "", 8)
+    for day, i, before, now in reversed(progress.recent):
+        better = SCORES[now] > SCORES[before]
+        cells = (_date(day), CHAKRAS[i], STATUS_OPTIONS[before], STATUS_OPTIONS[now])
+        for n, (w, text) in enumerate(zip(widths, cells)):
+            if n == 3:
+                pdf.set_text_color(*((22, 130, 60) if better else (200, 40, 40)))
+            pdf.cell(w, 5.5, clean_txt(text), border=1)
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln()
+
+
+def build_progress_pdf(progress: ClientProgress):
+    """Lays out the progress report for ``progress`` (at least one session) and returns the FPDF."""
+    from fonts import new_document
+
+    if not progress.sessions:
+        raise ValueError(f"no sessions for {progress.client!r}")
+    download_logo()
+    pdf = new_document()
+    pdf.set_auto_page_break(auto=True, margin=12)
+    _header(pdf, progress, "Chakra Progress Report")
+    _draw_overview(pdf, progress)
+    _header(pdf, progress, "Chakra Progress Report: score trajectory")
+    _draw_trajectories(pdf, progress)
+    _header(pdf, progress, "Chakra Progress Report: status changes")
+    _draw_changes(pdf, progress)
+    return pdf
+
+
+def make_progress_pdf(progress: ClientProgress) -> bytes:
+    out = io.BytesIO()
+    write_to(build_progress_pdf(progress), out)
+    return out.getvalue()
+
+
+def progress_filename(client_name: str) -> str:
+    return f"{client_name or 'client'}_Chakra_Progress.pdf".replace(" ", "_")
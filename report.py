@@ -0,0 +1,840 @@
+"""Report content and PDF rendering for the Soulful Chakra Report.
+
+Kept free of Streamlit so it can be imported by the UI (app.py) and by
+headless tools such as batch.py. fpdf (and layout, which needs it) is only
+imported once something is rendered, so the UI starts without it.
+"""
+import datetime
+import functools
+import io
+from typing import TYPE_CHECKING
+
+from assets import LOGO, LOGO_URL, LOGO_FILE  # noqa: F401 (re-exported)
+from instrument import span, trace
+from template import PAGE_TEMPLATE
+
+if TYPE_CHECKING:
+    from fpdf import FPDF
+
+# --------------------------------------------------
+# CHAKRA DEFINITIONS
+# --------------------------------------------------
+CHAKRAS = [
+    "Root (Muladhara)",
+    "Sacral (Svadhisthana)",
+    "Solar Plexus (Manipura)",
+    "Heart (Anahata)",
+    "Throat (Vishuddha)",
+    "Third Eye (Ajna)",
+    "Crown (Sahasrara)",
+]
+
+STATUS_OPTIONS = [
+    "Balanced / Radiant",
+    "Slightly Weak",
+    "Blocked / Underactive",
+    "Overactive / Dominant",
+]
+
+CHAKRA_COLORS = {
+    "Root (Muladhara)": (220, 38, 38),
+    "Sacral (Svadhisthana)": (249, 115, 22),
+    "Solar Plexus (Manipura)": (234, 179, 8),
+    "Heart (Anahata)": (34, 197, 94),
+    "Throat (Vishuddha)": (59, 130, 246),
+    "Third Eye (Ajna)": (79, 70, 229),
+    "Crown (Sahasrara)": (168, 85, 247),
+}
+
+STATUS_SCORE = {
+    "Balanced / Radiant": 100,
+    "Slightly Weak": 75,
+    "Blocked / Underactive": 40,
+    "Overactive / Dominant": 55,
+}
+
+# --------------------------------------------------
+# TEXT CLEANER
+# --------------------------------------------------
+class _Latin1Table(dict):
+    # str.translate table: known punctuation is mapped, anything else outside
+    # Latin-1 is dropped; each new code point is resolved once and remembered
+    def __missing__(self, code):
+        value = None if code > 0xFF else code
+        self[code] = value
+        return value
+
+
+_CLEAN_TABLE = _Latin1Table({
+    ord("•"): "- ",
+    ord("–"): "-",
+    ord("—"): "-",
+    ord("’"): "'",
+    ord("‘"): "'",
+    ord("“"): '"',
+    ord("”"): '"',
+})
+_CLEAN_CACHE_MAX_LEN = 2048   # longer (coach-written) text isn't worth keeping
+
+
+class _FontTable(dict):
+    # the same for an embedded Unicode font (fonts.py): keep whatever the font
+    # can draw, map or drop the rest like the Latin-1 table does
+    def __missing__(self, code):
+        from fonts import covers
+
+        value = code if covers(code) else _CLEAN_TABLE[code]
+        self[code] = value
+        return value
+
+
+@functools.lru_cache(maxsize=None)
+def _clean_table() -> dict:
+    from fonts import FONT_PATH
+
+    return _FontTable() if FONT_PATH else _CLEAN_TABLE
+
+
+@functools.lru_cache(maxsize=1024)
+def _clean_cached(text: str) -> str:
+    return text.translate(_clean_table())
+
+
+def can_render(text: str) -> bool:
+    """True if clean_txt keeps every character of ``text`` (punctuation may be mapped) in the active font."""
+    table = _clean_table()
+    return all(table[ord(c)] is not None for c in set(text) if ord(c) > 0x7F)
+
+
+def clean_txt(text: str) -> str:
+    if not text:
+        return ""
+    if text.isascii():
+        # nothing to map or drop
+        return text
+    if len(text) <= _CLEAN_CACHE_MAX_LEN:
+        return _clean_cached(text)
+    return text.translate(_clean_table())
+
+# --------------------------------------------------
+# PREDEFINED INFO
+# --------------------------------------------------
+PREDEFINED_INFO = {
+    "Root (Muladhara)": {
+        "Balanced / Radiant": {
+            "notes": "Grounded, safe, present in the body. Money and home energy are stable.",
+            "remedies": "Continue grounding, mindful walks, red-color energy and money gratitude.",
+        },
+        "Slightly Weak": {
+            "notes": "Mild insecurity about money/safety, a little rushing in life.",
+            "remedies": "Walk barefoot, chant LAM 108x, Ho'oponopono for parents/lineage.",
+        },
+        "Blocked / Underactive": {
+            "notes": "Feeling unsafe, overthinking about survival, lower-back/leg fatigue.",
+            "remedies": "Do Root Chakra meditation daily, money forgiveness, physical grounding.",
+        },
+        "Overactive / Dominant": {
+            "notes": "Too much control, anger bursts, rigid around family/money.",
+            "remedies": "Slow breathing, trust practices, yin yoga, soften control.",
+        },
+    },
+    "Sacral (Svadhisthana)": {
+        "Balanced / Radiant": {
+            "notes": "Creative, emotionally expressive, open to pleasure and relationships.",
+            "remedies": "Dance, water meditation, creative expression.",
+        },
+        "Slightly Weak": {
+            "notes": "Little guilt, emotional waves, may postpone joy.",
+            "remedies": "Ho'oponopono for past partners, mirror work, womb blessing.",
+        },
+        "Blocked / Underactive": {
+            "notes": "Suppressed emotion, relationship blocks, difficulty receiving.",
+            "remedies": "Womb healing, sacral Reiki, self-nurture ritual, art/dance.",
+        },
+        "Overactive / Dominant": {
+            "notes": "Emotional dependency, drama loops, intensity in relationships.",
+            "remedies": "Boundaries, emotional detox, self-love affirmations.",
+        },
+    },
+    "Solar Plexus (Manipura)": {
+        "Balanced / Radiant": {
+            "notes": "Confident, speaks needs clearly, takes action.",
+            "remedies": "Power pose, gratitude before tasks, citrine work.",
+        },
+        "Slightly Weak": {
+            "notes": "Procrastination, some self-doubt, low motivation.",
+            "remedies": "Breath of fire, success journaling, 3 wins a day.",
+        },
+        "Blocked / Underactive": {
+            "notes": "People pleasing, fear of visibility, indecision.",
+            "remedies": "Solar breathing, visibility challenge, burn old identity.",
+        },
+        "Overactive / Dominant": {
+            "notes": "Overworking, control, anger, burnout.",
+            "remedies": "Cooling breath, rest days, forgiveness, delegate.",
+        },
+    },
+    "Heart (Anahata)": {
+        "Balanced / Radiant": {
+            "notes": "Loving, compassionate, peaceful, grateful.",
+            "remedies": "Green light meditation, heart appreciation.",
+        },
+        "Slightly Weak": {
+            "notes": "Occasional loneliness, fear to receive.",
+            "remedies": "Self hug, forgiveness letters, green color therapy.",
+        },
+        "Blocked / Underactive": {
+            "notes": "Grief, heartbreak, rejection, resentment.",
+            "remedies": "108x Ho'oponopono, heart Reiki, rose-quartz meditation.",
+        },
+        "Overactive / Dominant": {
+            "notes": "Overgiving, mothering, guilt after saying no.",
+            "remedies": "Receive more, boundaries, let others give to you.",
+        },
+    },
+    "Throat (Vishuddha)": {
+        "Balanced / Radiant": {
+            "notes": "Clear expression, confident voice, authentic sharing.",
+            "remedies": "Blue light visualization, chanting, journaling.",
+        },
+        "Slightly Weak": {
+            "notes": "Hesitation to speak truth, fear of judgment.",
+            "remedies": "Mirror talk, 'My voice matters', talk to safe person.",
+        },
+        "Blocked / Underactive": {
+            "notes": "Unspoken truth, throat tightness, suppressed emotion.",
+            "remedies": "Singing therapy, voice-note release, emotional expression.",
+        },
+        "Overactive / Dominant": {
+            "notes": "Talking too much, dominating calls, gossip.",
+            "remedies": "Mindful silence, blue stones, pause-before-speak ritual.",
+        },
+    },
+    "Third Eye (Ajna)": {
+        "Balanced / Radiant": {
+            "notes": "Intuitive, sees patterns, calm mind.",
+            "remedies": "Meditation, candle gazing, dream journaling.",
+        },
+        "Slightly Weak": {
+            "notes": "Mild confusion, too much screen.",
+            "remedies": "Third-eye breathing, reduce screens, nature time.",
+        },
+        "Blocked / Underactive": {
+            "notes": "Overthinking, self-doubt, no clear direction.",
+            "remedies": "Trust practice, guided visualization, surrender journaling.",
+        },
+        "Overactive / Dominant": {
+            "notes": "Too many ideas, mental exhaustion, floating.",
+            "remedies": "Grounding, root work, simple daily routine.",
+        },
+    },
+    "Crown (Sahasrara)": {
+        "Balanced / Radiant": {
+            "notes": "Spiritually connected, peaceful, gratitude.",
+            "remedies": "Silence, prayer, seva.",
+        },
+        "Slightly Weak": {
+            "notes": "Some doubt or disconnection from Divine.",
+            "remedies": "White light meditation, gratitude, chanting.",
+        },
+        "Blocked / Underactive": {
+            "notes": "Loss of purpose, spiritual fatigue, 'why me' feeling.",
+            "remedies": "Daily prayer, gratitude journal, crown Reiki.",
+        },
+        "Overactive / Dominant": {
+            "notes": "Too much in upper chakras, not grounded in life.",
+            "remedies": "Earthing, grounding meals, body movement.",
+        },
+    },
+}
+
+CRYSTAL_REMEDIES = {
+    "Root (Muladhara)": {
+        "Balanced / Radiant": "Red Jasper / Lava Rock. Visit: https://myaurabliss.com/product-category/chakra/root-chakra/",
+        "Slightly Weak": "Black Tourmaline, Hematite. Visit: https://myaurabliss.com/product-category/chakra/root-chakra/",
+        "Blocked / Underactive": "Obsidian, 7-Chakra bracelet. Visit: https://myaurabliss.com/product/lava-rock-7-chakra-strand-bracelet/",
+        "Overactive / Dominant": "Smoky Quartz to soften. Visit: https://myaurabliss.com/product-category/chakra/root-chakra/",
+    },
+    "Sacral (Svadhisthana)": {
+        "Balanced / Radiant": "Carnelian, Peach Moonstone. Visit: https://myaurabliss.com/product-category/chakra/sacral-chakra/",
+        "Slightly Weak": "Carnelian bracelet, Sunstone. Visit: https://myaurabliss.com/product-category/chakra/sacral-chakra/",
+        "Blocked / Underactive": "Peach Moonstone, Rose Quartz. Visit: https://myaurabliss.com/product-category/chakra/sacral-chakra/",
+        "Overactive / Dominant": "Moonstone, Amethyst. Visit: https://myaurabliss.com/product-category/chakra/sacral-chakra/",
+    },
+    "Solar Plexus (Manipura)": {
+        "Balanced / Radiant": "Citrine, Tiger Eye. Visit: https://myaurabliss.com/product-category/chakra/solar-plexus-chakra/",
+        "Slightly Weak": "Citrine tumble, Pyrite. Visit: https://myaurabliss.com/product/natural-citrine-bracelet/",
+        "Blocked / Underactive": "Golden calcite, Tiger eye. Visit: https://myaurabliss.com/product-category/chakra/solar-plexus-chakra/",
+        "Overactive / Dominant": "Yellow calcite + Lepidolite. Visit: https://myaurabliss.com/product-category/chakra/solar-plexus-chakra/",
+    },
+    "Heart (Anahata)": {
+        "Balanced / Radiant": "Rose Quartz, Green Aventurine. Visit: https://myaurabliss.com/product-category/chakra/heart-chakra/",
+        "Slightly Weak": "Rose Quartz bracelet. Visit: https://myaurabliss.com/product-category/chakra/heart-chakra/",
+        "Blocked / Underactive": "Malachite, Rhodochrosite. Visit: https://myaurabliss.com/product-category/chakra/heart-chakra/",
+        "Overactive / Dominant": "Pink Opal, Amethyst. Visit: https://myaurabliss.com/product-category/chakra/heart-chakra/",
+    },
+    "Throat (Vishuddha)": {
+        "Balanced / Radiant": "Blue Lace Agate, Aquamarine. Visit: https://myaurabliss.com/product-category/chakra/throat-chakra/",
+        "Slightly Weak": "Sodalite, Amazonite. Visit: https://myaurabliss.com/product-category/chakra/throat-chakra/",
+        "Blocked / Underactive": "Lapis pendant. Visit: https://myaurabliss.com/product-category/chakra/throat-chakra/",
+        "Overactive / Dominant": "Celestite, Blue calcite. Visit: https://myaurabliss.com/product-category/chakra/throat-chakra/",
+    },
+    "Third Eye (Ajna)": {
+        "Balanced / Radiant": "Amethyst, Lapis. Visit: https://myaurabliss.com/product-category/chakra/third-eye-chakra/",
+        "Slightly Weak": "Fluorite, Labradorite. Visit: https://myaurabliss.com/product-category/chakra/third-eye-chakra/",
+        "Blocked / Underactive": "Chevron Amethyst. Visit: https://myaurabliss.com/product-category/chakra/third-eye-chakra/",
+        "Overactive / Dominant": "Obsidian + Amethyst. Visit: https://myaurabliss.com/product-category/chakra/third-eye-chakra/",
+    },
+    "Crown (Sahasrara)": {
+        "Balanced / Radiant": "Clear Quartz, Selenite. Visit: https://myaurabliss.com/product-category/chakra/crown-chakra/",
+        "Slightly Weak": "Selenite bowl, Angel aura. Visit: https://myaurabliss.com/product-category/chakra/crown-chakra/",
+        "Blocked / Underactive": "Clear Quartz point, Crown kit. Visit: https://myaurabliss.com/product-category/chakra/crown-chakra/",
+        "Overactive / Dominant": "Smoky Quartz + Selenite. Visit: https://myaurabliss.com/product-category/chakra/crown-chakra/",
+    },
+}
+
+# --------------------------------------------------
+# FRAGMENTS
+# --------------------------------------------------
+def summary_crystal_line(chakra: str, status: str) -> str:
+    """Crystal line for the summary page, with long product links shortened."""
+    crystal_line = CRYSTAL_REMEDIES.get(chakra, {}).get(status, "")
+    if "Visit:" in crystal_line and len(crystal_line) > 120:
+        before, after = crystal_line.split("Visit:", 1)
+        crystal_line = before.strip() + " Visit: " + after.strip()[:75] + " ..."
+    return crystal_line
+
+
+class Fragment:
+    __slots__ = ("source", "text", "layout")
+
+    def __init__(self, source, text, layout=None):
+        self.source = source   # text as it appears in the payload / tables
+        self.text = text       # label + source, cleaned
+        self.layout = layout   # wrapped lines, for multi_cell sections
+
+
+# section: (label, font key, size, line height); None font = single cell, no wrapping
+FRAGMENT_SECTIONS = {
+    "summary_status": ("Energy Status: ", None, 9, 5),
+    "summary_crystal": ("Crystal Suggestion: ", "helvetica", 9, 5),
+    "detail_status": ("Status: ", None, 10, 5),
+    "notes": ("Notes / Symptoms: ", "helvetica", 10, 5),
+    "remedies": ("Energy Remedies: ", "helvetica", 10, 5),
+    "crystals": ("Crystal Remedies: ", "helveticaI", 9, 5),
+}
+
+
+def _fragment_source(chakra, status, section):
+    if section in ("summary_status", "detail_status"):
+        return status
+    if section == "summary_crystal":
+        return summary_crystal_line(chakra, status)
+    if section == "crystals":
+        return CRYSTAL_REMEDIES[chakra][status]
+    return PREDEFINED_INFO[chakra][status][section]
+
+
+def _build_fragments():
+    from layout import layout_text
+
+    fragments = {}
+    for ch in CHAKRAS:
+        for status in STATUS_OPTIONS:
+            for section, (label, font, size, h) in FRAGMENT_SECTIONS.items():
+                source = _fragment_source(ch, status, section)
+                text = clean_txt(label + source)
+                layout = layout_text(text, font, size, h) if font else None
+                fragments[(ch, status, section)] = Fragment(source, text, layout)
+    return fragments
+
+
+@functools.lru_cache(maxsize=None)
+def fragments() -> dict:
+    """7 chakras x 4 statuses, laid out once on first use."""
+    return _build_fragments()
+
+
+def _section_text(pdf, chakra, status, section, source):
+    """multi_cell for one chakra section, reusing the precomputed layout for unedited text."""
+    frag = fragments().get((chakra, status, section))
+    if frag is not None and frag.source == source:
+        from layout import flow
+
+        if flow(pdf, frag.layout):
+            return
+    label, _, _, h = FRAGMENT_SECTIONS[section]
+    pdf.multi_cell(0, h, clean_txt(label + source))
+
+
+def _section_label(chakra, status, section):
+    frag = fragments().get((chakra, status, section))
+    if frag is not None:
+        return frag.text
+    return clean_txt(FRAGMENT_SECTIONS[section][0] + status)
+
+
+# --------------------------------------------------
+# HELPERS
+# --------------------------------------------------
+def download_logo():
+    # starts the background download; renders use whatever logo is available now
+    LOGO.prefetch()
+
+
+def build_quick_reading(chakras: dict, language: str = None) -> str:
+    """Builds a more detailed 'Quick Reading' paragraph based on which chakras are weak/blocked.
+
+    With SOULFUL_RULES_PATH set, the matching coach rules are added (see rules.py).
+    """
+    import rules   # imports this module, so it can't be imported at the top
+
+    text = _builtin_quick_reading(chakras)
+    if not rules.RULES_PATH:
+        return text
+    return rules.reading(encode_statuses(chakras), text, language)
+
+
+def _builtin_quick_reading(chakras: dict) -> str:
+    blocked_parts = []
+    weak_parts = []
+    overactive_parts = []
+
+    for ch, info in chakras.items():
+        stt = info["status"]
+        if stt == "Blocked / Underactive":
+            blocked_parts.append(ch)
+        elif stt == "Slightly Weak":
+            weak_parts.append(ch)
+        elif stt == "Overactive / Dominant":
+            overactive_parts.append(ch)
+
+    lines = []
+    if not blocked_parts and not weak_parts and not overactive_parts:
+        return "All 7 chakras are currently flowing well. Maintain your present rituals, keep your emotions clean, and continue crystal support weekly."
+
+    if blocked_parts:
+        lines.append(
+            "The following chakras are showing energy blocks or past emotional residue: "
+            + ", ".join(blocked_parts)
+            + ". This usually happens when we carry old stories, fear, or unprocessed pain in those areas."
+        )
+    if weak_parts:
+        lines.append(
+            "These chakras are a little under-energized or not used enough: "
+            + ", ".join(weak_parts)
+            + ". Activate them with daily movement, color therapy and breathwork."
+        )
+    if overactive_parts:
+        lines.append(
+            "These chakras are working too hard or compensating for another area: "
+            + ", ".join(overactive_parts)
+            + ". Soften them with grounding, slow breathing and better boundaries."
+        )
+
+    lines.append(
+        "Start with the root or the lowest blocked chakra first, then move upwards. Use the crystal suggestions given in this report and pair it with 108x Ho'oponopono on the main person/event connected to that chakra."
+    )
+    return " ".join(lines)
+
+
+def build_follow_up_text() -> str:
+    return (
+        "1) Day 1-2: Chakra awareness – 7 to 11 minutes morning meditation (Root to Crown). "
+        "2) Day 3-4: Emotional cleaning – journal on 'Who or what am I still holding in this chakra?' and do 108x Ho'oponopono. "
+        "3) Day 5: Crystal activation – wear / hold / place the suggested MyAuraBliss crystal on the body for 11 minutes. "
+        "4) Day 6: Relationship repair – speak your truth to at least one person (Throat/Heart). "
+        "5) Day 7: Integration – repeat the chakra meditation and note the shift. "
+        "Track progress inside Soulful Academy app / workbook."
+    )
+
+
+def build_affirmations() -> str:
+    return (
+        "I am safe in my body. "
+        "I allow myself to receive love, support and money. "
+        "My inner power is gentle and firm. "
+        "My heart forgives and moves forward. "
+        "My voice is heard. "
+        "My mind is clear. "
+        "I am divinely guided and supported."
+    )
+
+
+DEFAULT_FOLLOW_UP = build_follow_up_text()
+DEFAULT_AFFIRMATIONS = build_affirmations()
+
+
+# --------------------------------------------------
+# PAYLOAD
+# --------------------------------------------------
+GENDER_OPTIONS = ["Female", "Male", "Other"]
+DEFAULT_COACH = "Rekha Babulkar"
+DEFAULT_GOAL = "Relationship healing / Money flow / Health"
+DATE_FORMAT = "%d-%m-%Y"
+
+
+def default_chakra_entry(chakra: str, status: str) -> dict:
+    """Per-chakra fields as main() pre-fills them when a status is picked."""
+    info = PREDEFINED_INFO.get(chakra, {}).get(status, {})
+    return {
+        "status": status,
+        "notes": info.get("notes", ""),
+        "remedies": info.get("remedies", ""),
+        "crystals": CRYSTAL_REMEDIES.get(chakra, {}).get(status, ""),
+    }
+
+
+def complete_payload(raw: dict) -> dict:
+    """Fills a partial payload with the same defaults the UI starts from.
+
+    Raises ValueError for a missing client name or an unknown chakra/status,
+    so headless callers get the same checks main() does.
+    """
+    client_name = (raw.get("client_name") or "").strip()
+    if not client_name:
+        raise ValueError("client_name is required")
+
+    raw_chakras = raw.get("chakras") or {}
+    unknown = set(raw_chakras) - set(CHAKRAS)
+    if unknown:
+        raise ValueError(f"unknown chakra(s): {', '.join(sorted(unknown))}")
+
+    chakras = {}
+    for ch in CHAKRAS:
+        given = raw_chakras.get(ch) or {}
+        status = given.get("status") or STATUS_OPTIONS[0]
+        if status not in STATUS_OPTIONS:
+            raise ValueError(f"unknown status for {ch}: {status!r}")
+        entry = default_chakra_entry(ch, status)
+        for field in ("notes", "remedies", "crystals"):
+            if given.get(field) is not None:
+                entry[field] = given[field]
+        chakras[ch] = entry
+
+    payload = {
+        "client_name": client_name,
+        "gender": raw.get("gender") or GENDER_OPTIONS[0],
+        "coach_name": raw.get("coach_name") or DEFAULT_COACH,
+        "date": raw.get("date") or datetime.date.today().strftime(DATE_FORMAT),
+        "goal": raw.get("goal") if raw.get("goal") is not None else DEFAULT_GOAL,
+        "chakras": chakras,
+        "follow_up": raw.get("follow_up") if raw.get("follow_up") is not None else build_follow_up_text(),
+        "affirmations": raw.get("affirmations") if raw.get("affirmations") is not None else build_affirmations(),
+    }
+    if raw.get("language"):
+        payload["language"] = raw["language"]   # Quick Reading rules (rules.py)
+    return payload
+
+
+def report_filename(client_name: str) -> str:
+    return f"{client_name}_chakra_report.pdf"
+
+
+# seven statuses packed two bits each, root in the lowest bits: 4 ** 7 = 16384 states
+STATUS_INDEX = {s: i for i, s in enumerate(STATUS_OPTIONS)}
+N_STATES = len(STATUS_OPTIONS) ** len(CHAKRAS)
+
+
+def encode_statuses(chakras: dict) -> int:
+    """Packs the per-chakra statuses of a payload into one int (ValueError for unknown ones)."""
+    code = 0
+    for shift, ch in enumerate(CHAKRAS):
+        status = chakras[ch]["status"]
+        if status not in STATUS_INDEX:
+            raise ValueError(f"unknown status for {ch}: {status!r}")
+        code |= STATUS_INDEX[status] << (2 * shift)
+    return code
+
+
+def decode_statuses(code: int) -> list:
+    """Statuses in CHAKRAS order for a code from encode_statuses()."""
+    return [STATUS_OPTIONS[(code >> (2 * shift)) & 3] for shift in range(len(CHAKRAS))]
+
+
+# --------------------------------------------------
+# PDF
+# --------------------------------------------------
+TEMPLATE_VERSION = 1   # bump whenever the PDF layout or wording changes (invalidates cached PDFs)
+
+SUMMARY_INTRO = "Use this to explain the current energy story to the client. Focus first on the root-most blocked chakra, then move upwards."
+CRYSTAL_SUPPORT_TEXT = "Visit https://myaurabliss.com and choose the bracelet / crystal set for the chakras that showed Blocked or Overactive. Wear it daily for 21 days, cleanse it every full moon, and charge it with the affirmation given above."
+FOOTER_TEXT = "Generated by Soulful Academy | What You Seek is Seeking You."
+
+
+# static blocks: drawn through PAGE_TEMPLATE, so they must only depend on their arguments
+def _draw_title(pdf):
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", "B", 14)
+    pdf.set_xy(28, 3)
+    pdf.cell(0, 6, clean_txt("Soulful Academy"), ln=True)
+    pdf.set_font("Arial", "", 10)
+    pdf.cell(0, 6, clean_txt("Chakra & Crystal Healing Report"), ln=True)
+
+
+def _draw_heading(pdf, title, size, gap_before=0, gap_after=0, body_style="", body_size=None):
+    if gap_before:
+        pdf.ln(gap_before)
+    pdf.set_font("Arial", "B", size)
+    pdf.cell(0, 6, clean_txt(title), ln=True)
+    if gap_after:
+        pdf.ln(gap_after)
+    if body_size:
+        pdf.set_font("Arial", body_style, body_size)
+
+
+def _draw_summary_intro(pdf):
+    _draw_heading(pdf, "Chakra Summary (Coach View)", 12, gap_after=2, body_size=9)
+    pdf.multi_cell(0, 5, clean_txt(SUMMARY_INTRO))
+
+
+def _draw_follow_up(pdf, follow_up):
+    _draw_heading(pdf, "Follow-up and Home Practice", 12, gap_after=2, body_size=10)
+    pdf.multi_cell(0, 5, clean_txt(follow_up))
+
+
+def _draw_affirmations(pdf, affirmations):
+    _draw_heading(pdf, "Affirmations for Client", 12, gap_before=3, body_size=10)
+    pdf.multi_cell(0, 5, clean_txt(affirmations))
+
+
+def _draw_closing(pdf):
+    _draw_heading(pdf, "Crystal Support from MyAuraBliss", 11, gap_before=4, body_size=10)
+    pdf.multi_cell(0, 5, clean_txt(CRYSTAL_SUPPORT_TEXT))
+
+    pdf.ln(4)
+    pdf.set_font("Arial", "I", 8)
+    pdf.multi_cell(0, 4, clean_txt(FOOTER_TEXT))
+
+
+# per-client sections: pure functions of their arguments, so build_pdf can
+# hand them to a SectionCache keyed on those arguments
+def _draw_client_header(pdf, client_name, gender, date, coach_name, goal):
+    pdf.ln(10)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", "B", 12)
+    pdf.cell(0, 6, clean_txt(f"Client: {client_name}"), ln=True)
+    pdf.cell(0, 6, clean_txt(f"Gender: {gender}"), ln=True)
+    pdf.cell(0, 6, clean_txt(f"Date: {date}"), ln=True)
+    pdf.cell(0, 6, clean_txt(f"Healer: {coach_name}"), ln=True)
+    pdf.cell(0, 6, clean_txt(f"Intent: {goal}"), ln=True)
+
+
+def _draw_health(pdf, blocked, blocked_pct, scores):
+    pdf.cell(0, 5, clean_txt(f"Blocked chakras: {blocked} of 7 ({blocked_pct}%)"), ln=True)
+
+    # bars
+    y = pdf.get_y() + 2
+    max_bar = 120
+    for ch, score in zip(CHAKRAS, scores):
+        r, g, b = CHAKRA_COLORS[ch]
+        pdf.set_xy(15, y)
+        pdf.set_font("Arial", "", 9)
+        pdf.cell(0, 5, clean_txt(ch), ln=0)
+        pdf.set_fill_color(r, g, b)
+        pdf.rect(75, y + 1, max_bar * (score / 100.0), 4, "F")
+        pdf.set_xy(165, y)
+        pdf.cell(0, 5, clean_txt(f"{score}%"), ln=1)
+        y += 7
+
+
+def _draw_quick_reading(pdf, qr_text):
+    pdf.multi_cell(0, 5, clean_txt(qr_text))
+
+
+def _draw_summary_block(pdf, ch, status):
+    r, g, b = CHAKRA_COLORS[ch]
+    pdf.set_fill_color(r, g, b)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", "B", 10)
+    pdf.cell(0, 6, clean_txt(ch), ln=True, fill=True)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", "", 9)
+    pdf.cell(0, 5, _section_label(ch, status, "summary_status"), ln=True)
+    _section_text(pdf, ch, status, "summary_crystal", summary_crystal_line(ch, status))
+
+
+def _draw_detail_block(pdf, ch, status, notes, remedies, crystals):
+    r, g, b = CHAKRA_COLORS[ch]
+    pdf.set_fill_color(r, g, b)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 6, clean_txt(ch), ln=True, fill=True)
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", "", 10)
+    pdf.cell(0, 5, _section_label(ch, status, "detail_status"), ln=True)
+    # predefined text reuses its precomputed layout; coach edits are wrapped live
+    _section_text(pdf, ch, status, "notes", notes)
+    _section_text(pdf, ch, status, "remedies", remedies)
+    pdf.set_font("Arial", "I", 9)
+    _section_text(pdf, ch, status, "crystals", crystals)
+
+
+def build_pdf(data, template=PAGE_TEMPLATE, sections=None):
+    """Lays out the full report and returns the (unclosed) FPDF document.
+
+    Static blocks go through ``template``; pass None to lay out everything live.
+    ``sections`` (an incremental.SectionCache) also reuses the per-client
+    sections (header, bars, quick reading, each chakra block) whose inputs
+    haven't changed since an earlier render.
+    """
+    from fonts import new_document
+
+    download_logo()
+    pdf = new_document()
+    pdf.set_auto_page_break(auto=True, margin=12)
+
+    def static(key, fn, *args):
+        if template is None:
+            fn(pdf, *args)
+        else:
+            template.draw(pdf, key, fn, *args)
+
+    def section(name, fn, *args):
+        if sections is None:
+            fn(pdf, *args)
+        else:
+            sections.draw(pdf, (name,) + args, fn, *args)
+
+    chakras = data["chakras"]
+    # score calc
+    chakra_scores = {}
+    blocked = 0
+    for ch, info in chakras.items():
+        s = info["status"]
+        score = STATUS_SCORE.get(s, 60)
+        chakra_scores[ch] = score
+        if s == "Blocked / Underactive":
+            blocked += 1
+    blocked_pct = round((blocked / 7.0) * 100, 1)
+
+    # ---------- PAGE 1 ----------
+    with span("page1"):
+        pdf.add_page()
+        # header strip
+        pdf.set_fill_color(139, 92, 246)
+        pdf.rect(0, 0, 210, 15, "F")
+
+        # logo (parsed once per process; none until the download lands)
+        with span("logo"):
+            LOGO.place(pdf, x=10, y=2, w=14)
+
+        static("title", _draw_title)
+        section("header", _draw_client_header,
+                data["client_name"], data["gender"], data["date"], data["coach_name"], data["goal"])
+
+        static("health_heading", _draw_heading, "Overall Chakra Health", 11, 4, 0, "", 9)
+        section("health", _draw_health, blocked, blocked_pct, tuple(chakra_scores[ch] for ch in CHAKRAS))
+
+        # quick reading
+        static("quick_reading_heading", _draw_heading, "Quick Reading", 11, 4, 0, "", 9)
+        section("quick_reading", _draw_quick_reading, build_quick_reading(chakras, data.get("language")))
+
+    # ---------- PAGE 2: SUMMARY ----------
+    with span("summary"):
+        pdf.add_page()
+        static("summary_intro", _draw_summary_intro)
+
+        for ch in CHAKRAS:
+            pdf.ln(2)
+            section("summary", _draw_summary_block, ch, chakras[ch]["status"])
+
+    # ---------- PAGE 3 & 4: DETAILED ----------
+    with span("detail"):
+        pdf.add_page()
+        static("detail_heading", _draw_heading, "Detailed Chakra Guidance", 12, 0, 3, "", 10)
+
+        for ch in CHAKRAS:
+            if pdf.get_y() > 250:
+                pdf.add_page()
+                _draw_heading(pdf, "Detailed Chakra Guidance (contd.)", 12, 0, 3, "", 10)
+
+            info = chakras[ch]
+            section("detail", _draw_detail_block, ch, info["status"], info["notes"], info["remedies"], info["crystals"])
+            pdf.ln(2)
+
+    # ---------- PAGE 5: FOLLOW-UP ----------
+    with span("follow_up"):
+        pdf.add_page()
+        # coach-edited text is laid out live; the defaults come from the template
+        follow_up, affirmations = data["follow_up"], data["affirmations"]
+        static("follow_up" if follow_up == DEFAULT_FOLLOW_UP else None, _draw_follow_up, follow_up)
+        static("affirmations" if affirmations == DEFAULT_AFFIRMATIONS else None, _draw_affirmations, affirmations)
+        static("closing", _draw_closing)
+
+    return pdf
+
+
+# --------------------------------------------------
+# OUTPUT
+# --------------------------------------------------
+SINK_CHUNK = 64 * 1024   # bytes gathered before each write to the sink
+
+
+class _SinkBuffer:
+    """Stands in for FPDF.buffer while the document is closed.
+
+    fpdf appends every line of the file to ``buffer`` and later copies the
+    whole string out again as latin-1 bytes. This encodes each line as it
+    arrives and passes it on to a binary sink in SINK_CHUNK pieces instead;
+    len() is the byte count so far, which is what fpdf uses for the xref
+    offsets.
+    """
+
+    __slots__ = ("sink", "size", "_parts", "_pending")
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.size = 0
+        self._parts = []
+        self._pending = 0
+
+    def __iadd__(self, s):
+        data = s.encode("latin-1", "ignore")
+        self.size += len(data)
+        self._parts.append(data)
+        self._pending += len(data)
+        if self._pending >= SINK_CHUNK:
+            self.flush()
+        return self
+
+    def __len__(self):
+        return self.size
+
+    def flush(self):
+        if self._parts:
+            self.sink.write(b"".join(self._parts))
+            self._parts = []
+            self._pending = 0
+
+
+def write_to(pdf: "FPDF", sink) -> int:
+    """Closes ``pdf`` straight into a binary file-like ``sink``; returns the bytes written."""
+    buf = _SinkBuffer(sink)
+    if pdf.buffer:
+        buf += pdf.buffer
+    pdf.buffer = buf
+    with span("output"):
+        pdf.close()
+        buf.flush()
+    pdf.buffer = ""   # nothing left to hold on to
+    return buf.size
+
+
+def write_pdf(data, sink, template=PAGE_TEMPLATE) -> int:
+    """make_pdf into an open file, zip entry or socket file instead of a bytes object."""
+    return write_to(build_pdf(data, template), sink)
+
+
+def make_pdf(data):
+    with trace("render", client=data.get("client_name", "")):
+        import variants   # imports this module, so it can't be imported at the top
+
+        if variants.VARIANTS_PATH:
+            with span("variant"):
+                found = variants.stamp(data)
+            if found is not None:
+                return found
+        out = io.BytesIO()
+        write_pdf(data, out)
+        return out.getvalue()
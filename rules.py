@@ -0,0 +1,268 @@
+"""Coach-maintained rules for the Quick Reading.
+
+SOULFUL_RULES_PATH points at a JSON rule file. Every rule whose conditions
+match the report's seven statuses adds its text to the Quick Reading:
+
+    {
+      "base": true,
+      "rules": [
+        {"id": "root-blocked-solar-overactive",
+         "when": {"root": "blocked", "solar plexus": "overactive"},
+         "priority": 10,
+         "text": {"en": "Safety fears are being pushed through willpower ...",
+                  "hi": "..."}},
+        {"id": "many-blocked", "when": {"heart": ["blocked", "weak"], "throat": "!balanced"},
+         "group": "heart", "text": "{blocked} need gentle work first."}
+      ]
+    }
+
+Chakras are named by their English or Sanskrit name ("solar plexus",
+"manipura") and statuses by any word of theirs ("blocked", "underactive",
+"weak"); a list allows several statuses and "!" negates one. Chakras left
+out of "when" match anything. Rules apply in priority order (highest first,
+then file order); within a "group" only the first matching rule applies.
+Text may use {blocked}, {weak}, {overactive} and {balanced}, the matching
+chakra names. "base": false drops the built-in reading, so the rules
+provide all of it (e.g. in another language); it is still used when no
+rule matches.
+
+The language is the payload's "language", else SOULFUL_RULES_LANG (default
+"en"); a rule without that language falls back to "en", then to its first
+text.
+
+Rules are compiled once per file version into one bitset of rules per
+(chakra, status), so the rules matching a report are seven ANDs away
+however many there are, and each of the 4 ** 7 status combinations keeps
+its result. The file is checked for changes at most every RELOAD_CHECK
+seconds; a file that fails to load is logged and the previous rules stay.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from report import CHAKRAS, N_STATES, STATUS_OPTIONS, can_render, decode_statuses
+
+RULES_PATH = os.environ.get("SOULFUL_RULES_PATH", "")
+DEFAULT_LANG = os.environ.get("SOULFUL_RULES_LANG", "en")
+RELOAD_CHECK = 2.0   # seconds between looks at the rule file's mtime
+
+log = logging.getLogger("soulful.rules")
+
+ALL = (1 << len(STATUS_OPTIONS)) - 1
+PLACEHOLDERS = {"blocked": "Blocked / Underactive", "weak": "Slightly Weak",
+                "overactive": "Overactive / Dominant", "balanced": "Balanced / Radiant"}
+
+
+def _aliases(names, split: str) -> dict:
+    found = {}
+    for i, name in enumerate(names):
+        lower = name.lower()
+        parts = [p.strip(" )") for p in lower.split(split)]
+        for alias in [lower] + parts + [p.split()[-1] for p in parts]:
+            found.setdefault(alias, i)
+            found.setdefault(alias.replace(" ", "_"), i)
+    return found
+
+
+CHAKRA_ALIASES = _aliases(CHAKRAS, "(")          # "root", "muladhara", "solar plexus", "solar_plexus", ...
+STATUS_ALIASES = _aliases(STATUS_OPTIONS, "/")   # "blocked", "underactive", "weak", "slightly weak", ...
+
+
+class Rule:
+    __slots__ = ("id", "masks", "priority", "group", "text")
+
+    def __init__(self, id: str, masks: tuple, priority: int, group: Optional[str], text: dict):
+        self.id = id
+        self.masks = masks        # per chakra, bit s set if status index s matches
+        self.priority = priority
+        self.group = group
+        self.text = text          # language -> text
+
+    def matches(self, code: int) -> bool:
+        return all(m >> ((code >> (2 * c)) & 3) & 1 for c, m in enumerate(self.masks))
+
+    def text_for(self, lang: str) -> str:
+        return self.text.get(lang) or self.text.get("en") or next(iter(self.text.values()))
+
+
+def _status_mask(value, where: str) -> int:
+    mask = 0
+    for item in [value] if isinstance(value, str) else value:
+        negate = item.startswith("!")
+        key = item.lstrip("!").strip().lower()
+        if key not in STATUS_ALIASES:
+            raise ValueError(f"{where}: unknown status {item!r}")
+        bit = 1 << STATUS_ALIASES[key]
+        mask |= (ALL & ~bit) if negate else bit
+    return mask
+
+
+def parse_rule(raw: dict, n: int) -> Rule:
+    """One rule from its JSON object; ValueError says which rule and what's wrong."""
+    rule_id = str(raw.get("id", f"#{n + 1}"))
+    where = f"rule {rule_id}"
+    masks = [ALL] * len(CHAKRAS)
+    for chakra, value in (raw.get("when") or {}).items():
+        key = chakra.strip().lower()
+        if key not in CHAKRA_ALIASES:
+            raise ValueError(f"{where}: unknown chakra {chakra!r}")
+        masks[CHAKRA_ALIASES[key]] &= _status_mask(value, where)
+    text = raw.get("text")
+    if isinstance(text, str):
+        text = {"en": text}
+    if not text or not all(isinstance(t, str) and t for t in text.values()):
+        raise ValueError(f"{where}: needs a non-empty text")
+    for t in text.values():
+        try:
+            t.format_map(dict.fromkeys(PLACEHOLDERS, ""))
+        except (KeyError, ValueError, IndexError) as e:
+            raise ValueError(f"{where}: bad placeholder in text ({e})") from None
+    return Rule(rule_id, tuple(masks), int(raw.get("priority", 0)), raw.get("group"), text)
+
+
+class Rulebook:
+    """Compiled rules: the matching rules for a status code in seven ANDs, then cached."""
+
+    def __init__(self, rules: list, base: bool = True, version: str = ""):
+        # bit i of an accept set is the i-th rule in application order
+        self.rules = sorted(rules, key=lambda r: -r.priority)   # stable: file order within a priority
+        self.base = base
+        self.version = version
+        self._accept = [[0] * len(STATUS_OPTIONS) for _ in CHAKRAS]
+        for bit, rule in enumerate(self.rules):
+            for c, mask in enumerate(rule.masks):
+                for s in range(len(STATUS_OPTIONS)):
+                    if mask >> s & 1:
+                        self._accept[c][s] |= 1 << bit
+        self._index = [None] * N_STATES   # status code -> tuple of rules, filled on first use
+        self._texts = {}                  # (code, lang) -> joined rule text
+
+    @classmethod
+    def from_json(cls, data: dict, version: str = "") -> "Rulebook":
+        rules = [parse_rule(raw, n) for n, raw in enumerate(data.get("rules") or [])]
+        return cls(rules, base=bool(data.get("base", True)), version=version)
+
+    @classmethod
+    def load(cls, path: str) -> "Rulebook":
+        with open(path, "rb") as f:
+            raw = f.read()
+        return cls.from_json(json.loads(raw), version=hashlib.sha256(raw).hexdigest()[:16])
+
+    @property
+    def languages(self) -> list:
+        """Languages the rules are written in, DEFAULT_LANG first."""
+        found = {lang for rule in self.rules for lang in rule.text}
+        return sorted(found, key=lambda lang: (lang != DEFAULT_LANG, lang))
+
+    @functools.cached_property
+    def renderable_languages(self) -> list:
+        """``languages`` without those the report font would strip to blanks (e.g. Hindi in the core fonts).
+
+        DEFAULT_LANG always stays. The font is fixed per process, so this is worked out once per rule file.
+        """
+        return [lang for lang in self.languages
+                if lang == DEFAULT_LANG or all(can_render(r.text_for(lang)) for r in self.rules)]
+
+    def matching(self, code: int) -> tuple:
+        """The rules that apply to a status code, in order, one per group."""
+        found = self._index[code]
+        if found is None:
+            accept = self._accept
+            bits = accept[0][code & 3]
+            for c in range(1, len(CHAKRAS)):
+                bits &= accept[c][(code >> (2 * c)) & 3]
+            found, groups = [], set()
+            digits = bin(bits)[:1:-1]   # lowest bit first
+            i = digits.find("1")
+            while i >= 0:
+                rule = self.rules[i]
+                i = digits.find("1", i + 1)
+                if rule.group is not None:
+                    if rule.group in groups:
+                        continue
+                    groups.add(rule.group)
+                found.append(rule)
+            found = self._index[code] = tuple(found)
+        return found
+
+    def compile_all(self):
+        """Fills the whole index up front (about 2 s for 5000 rules); lookups fill it as they go anyway."""
+        for code in range(N_STATES):
+            self.matching(code)
+
+    def text(self, code: int, lang: str = None) -> str:
+        """The rules' contribution to the Quick Reading for a status code ("" if none match)."""
+        lang = lang or DEFAULT_LANG
+        key = (code, lang)
+        found = self._texts.get(key)
+        if found is None:
+            names = {}
+            for ch, status in zip(CHAKRAS, decode_statuses(code)):
+                names.setdefault(status, []).append(ch)
+            values = {k: ", ".join(names.get(status, ())) for k, status in PLACEHOLDERS.items()}
+            found = self._texts[key] = " ".join(r.text_for(lang).format_map(values) for r in self.matching(code))
+        return found
+
+
+# --------------------------------------------------
+# HOT RELOAD
+# --------------------------------------------------
+_lock = threading.Lock()
+# (path, Rulebook or None, (mtime_ns, size), checked at): replaced as a whole, so readers never see half of it
+_loaded = (None, None, None, 0.0)
+
+
+def current(path: str = None) -> Optional[Rulebook]:
+    """The Rulebook for SOULFUL_RULES_PATH, reloaded when the file changes; None without rules."""
+    global _loaded
+    path = path or RULES_PATH
+    if not path:
+        return None
+    loaded_path, book, stat, checked = _loaded
+    if loaded_path == path and time.monotonic() - checked < RELOAD_CHECK:
+        return book
+    with _lock:
+        loaded_path, book, stat, checked = _loaded
+        if loaded_path != path:
+            book = stat = None
+        try:
+            st = os.stat(path)
+            if (st.st_mtime_ns, st.st_size) != stat:
+                book = Rulebook.load(path)
+                stat = (st.st_mtime_ns, st.st_size)
+                log.info("loaded %d rules from %s", len(book.rules), path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            log.warning("keeping the previous rules, %s failed to load: %s", path, e)
+        _loaded = (path, book, stat, time.monotonic())
+        return book
+
+
+def version() -> str:
+    """Identifies the rules in effect, for cache keys ("" without rules)."""
+    book = current()
+    return book.version if book is not None else ""
+
+
+def languages() -> list:
+    """Languages to offer for the Quick Reading: those the rules define and the report font can draw."""
+    book = current()
+    return book.renderable_languages if book is not None else []
+
+
+def reading(code: int, base: str, lang: str = None) -> str:
+    """The Quick Reading for a status code: the built-in ``base`` text and/or the matching rules."""
+    book = current()
+    if book is None:
+        return base
+    if lang and lang not in book.renderable_languages:
+        lang = None   # the default language rather than text the font would drop
+    extra = book.text(code, lang)
+    if not extra:
+        return base
+    return f"{base} {extra}" if book.base else extra
+
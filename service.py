@@ -0,0 +1,402 @@
+"""HTTP service that renders chakra reports for other systems.
+
+    python service.py --port 8502 --workers 4
+
+    POST /render    JSON payload (as accepted by complete_payload) -> application/pdf
+    POST /batch     {"payloads": [...]} or a JSON list -> application/zip, streamed
+    GET  /health    liveness plus queue figures as JSON
+    GET  /metrics   Prometheus text: queue gauges, plus per-stage timings with SOULFUL_TRACE=1
+
+Renders run in a pool of worker processes that are started and warmed up
+(logo parsed, one report rendered) before the port opens. At most
+workers + queue renders are admitted at once; beyond that /render answers
+429 with a Retry-After estimate instead of letting requests pile up. Every
+PDF response carries its queue and render time in X-Queue-Ms / X-Render-Ms
+and a Server-Timing header.
+
+    SOULFUL_SERVICE_WORKERS   worker processes (default: CPU count)
+    SOULFUL_SERVICE_QUEUE     renders allowed to wait for a worker (default 2 per worker)
+    SOULFUL_SERVICE_TIMEOUT   seconds before a render answers 504 (default 30)
+"""
+import argparse
+import json
+import math
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+import instrument
+from assets import FETCH_TIMEOUT, LOGO
+from batch import ascii_slug, safe_filename
+from pdf_cache import PDF_CACHE
+from report import complete_payload, make_pdf, report_filename
+
+MAX_BODY = 1024 * 1024          # bytes accepted by /render
+MAX_BATCH_BODY = 32 * 1024 * 1024
+MAX_BATCH = 500                 # payloads per /batch request
+
+
+# --------------------------------------------------
+# WORKER PROCESSES
+# --------------------------------------------------
+def _warm_worker():
+    # pool initializer: pay for the logo, the fonts and the first layout before serving
+    LOGO.prefetch()
+    LOGO.wait(FETCH_TIMEOUT)
+    LOGO.image_info()
+    make_pdf(complete_payload({"client_name": "Warm-up"}))
+
+
+def _ping():
+    return os.getpid()
+
+
+def _render(raw: dict):
+    """(pdf_bytes, start time, render seconds, trace dict or None); ValueError for a bad payload."""
+    started = time.time()
+    with instrument.trace("request") as t:
+        payload = complete_payload(raw)
+        pdf_bytes = PDF_CACHE.get_or_render(payload)
+    return pdf_bytes, started, time.time() - started, t.as_dict() if t is not None else None
+
+
+# --------------------------------------------------
+# ADMISSION
+# --------------------------------------------------
+class Saturated(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"server busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ReportService:
+    """The worker pool plus the bookkeeping that decides who gets in."""
+
+    def __init__(self, workers: int = None, queue: int = None, timeout: float = 30.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue = self.workers * 2 if queue is None else queue
+        self.capacity = self.workers + self.queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rendered = 0
+        self.rejected = 0
+        self.failed = 0
+        self._render_avg = 0.2   # seconds, moving average used for Retry-After
+
+        # forked workers inherit the parsed logo; the initializer does the rest
+        LOGO.prefetch()
+        LOGO.wait(FETCH_TIMEOUT)
+        LOGO.image_info()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        pings = [self.pool.submit(_ping) for _ in range(self.workers)]
+        for fut in pings:
+            fut.result()
+
+    @classmethod
+    def from_env(cls, **overrides):
+        queue = os.environ.get("SOULFUL_SERVICE_QUEUE")
+        kwargs = {
+            "workers": int(os.environ.get("SOULFUL_SERVICE_WORKERS", "0")) or None,
+            "queue": int(queue) if queue else None,
+            "timeout": float(os.environ.get("SOULFUL_SERVICE_TIMEOUT", "30")),
+        }
+        kwargs.update({k: v for k, v in overrides.items() if v is not None})
+        return cls(**kwargs)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._render_avg * self.capacity / self.workers))
+
+    def submit(self, raw: dict, block: bool = False):
+        """Queues one render; raises Saturated when no slot is free (and block is False)."""
+        if not self._slots.acquire(blocking=block, timeout=self.timeout if block else None):
+            with self._lock:
+                self.rejected += 1
+            raise Saturated(self.retry_after())
+        with self._lock:
+            self.in_flight += 1
+        submitted = time.time()
+        fut = self.pool.submit(_render, raw)
+        fut.submitted = submitted
+        fut.add_done_callback(self._done)
+        return fut
+
+    def _done(self, fut):
+        self._slots.release()
+        with self._lock:
+            self.in_flight -= 1
+            if fut.exception() is None:
+                self.rendered += 1
+                self._render_avg = 0.9 * self._render_avg + 0.1 * fut.result()[2]
+            else:
+                self.failed += 1
+
+    def result(self, fut):
+        """(pdf_bytes, queue_seconds, render_seconds) for a future from submit()."""
+        pdf_bytes, started, seconds, spans = fut.result(timeout=self.timeout)
+        if spans is not None:
+            # timed in the worker process; file it here where /metrics can see it
+            instrument.record(instrument.Trace.from_dict(spans), remote=True)
+        return pdf_bytes, max(0.0, started - fut.submitted), seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "in_flight": self.in_flight,
+                "rendered": self.rendered,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "render_ms_avg": round(self._render_avg * 1000, 1),
+            }
+
+    def metrics_text(self) -> str:
+        stats = self.stats()
+        lines = []
+        for name, kind, help_text in (
+            ("in_flight", "gauge", "Renders admitted and not yet finished."),
+            ("capacity", "gauge", "Renders admitted at most (workers + queue)."),
+            ("rendered", "counter", "Renders finished."),
+            ("rejected", "counter", "Requests turned away with 429."),
+            ("failed", "counter", "Renders that raised."),
+        ):
+            metric = f"soulful_service_{name}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}", f"{metric} {stats[name]}"]
+        return "\n".join(lines) + "\n" + instrument.prometheus_text()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# --------------------------------------------------
+# HTTP
+# --------------------------------------------------
+class _Chunked:
+    """Write-only file object that frames everything as HTTP/1.1 chunks."""
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, data) -> int:
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def timing_headers(queue_s: float, render_s: float, total_s: float) -> dict:
+    return {
+        "X-Queue-Ms": f"{queue_s * 1000:.1f}",
+        "X-Render-Ms": f"{render_s * 1000:.1f}",
+        "X-Total-Ms": f"{total_s * 1000:.1f}",
+        "Server-Timing": f"queue;dur={queue_s * 1000:.1f}, render;dur={render_s * 1000:.1f}, "
+                         f"total;dur={total_s * 1000:.1f}",
+    }
+
+
+def content_disposition(client_name: str) -> str:
+    """Attachment header for a client's report: an ASCII filename plus the real one (RFC 6266)."""
+    slug = ascii_slug(client_name)
+    fallback = report_filename(slug) if slug else "chakra_report.pdf"
+    # percent-encoding makes any character safe; only path separators and control characters go
+    name = re.sub(r'[\\/\x00-\x1f\x7f]+', "_", report_filename(client_name)).strip(" .")
+    return f'attachment; filename="{fallback}"; filename*=UTF-8\'\'{quote(name, safe="")}'
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, and chunked /batch responses
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    service: ReportService = None
+    quiet = False
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: dict = None):
+        headers = {"Content-Type": content_type, "Content-Length": str(len(body)), **(headers or {})}
+        for value in headers.values():
+            value.encode("latin-1")   # http.server's encoding; fail before anything is written
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, obj, headers: dict = None):
+        self._send(status, json.dumps(obj).encode("utf-8"), "application/json", headers)
+
+    def _read_json(self, limit: int):
+        text = (self.headers.get("Content-Length") or "0").strip()
+        if not (text.isascii() and text.isdigit()):
+            # can't tell where the body ends, so don't read it or keep the connection
+            self.close_connection = True
+            self._json(400, {"error": f"invalid Content-Length: {text[:40]!r}"})
+            return None
+        length = int(text)
+        if length > limit:
+            self.close_connection = True
+            self._json(413, {"error": f"body larger than {limit} bytes"})
+            return None
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError as e:
+            self._json(400, {"error": f"invalid JSON: {e}"})
+            return None
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._json(200, {"ok": True, **self.service.stats()})
+        elif self.path == "/metrics":
+            self._send(200, self.service.metrics_text().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path == "/render":
+            self._render()
+        elif self.path == "/batch":
+            self._batch()
+        else:
+            self._json(404, {"error": "not found"})
+
+    def _render(self):
+        start = time.perf_counter()
+        raw = self._read_json(MAX_BODY)
+        if raw is None:
+            return
+        if not isinstance(raw, dict):
+            self._json(400, {"error": "expected a JSON object"})
+            return
+        try:
+            fut = self.service.submit(raw)
+        except Saturated as e:
+            self._json(429, {"error": str(e)}, {"Retry-After": str(e.retry_after)})
+            return
+        try:
+            pdf_bytes, queued, rendered = self.service.result(fut)
+        except ValueError as e:
+            self._json(400, {"error": str(e)})
+            return
+        except FutureTimeout:
+            self._json(504, {"error": f"render took longer than {self.service.timeout:g}s"})
+            return
+        except Exception as e:
+            self._json(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        headers = timing_headers(queued, rendered, time.perf_counter() - start)
+        try:
+            headers["Content-Disposition"] = content_disposition(str(raw.get("client_name") or ""))
+            self._send(200, pdf_bytes, "application/pdf", headers)
+        except UnicodeEncodeError as e:
+            self._json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _batch(self):
+        start = time.perf_counter()
+        body = self._read_json(MAX_BATCH_BODY)
+        if body is None:
+            return
+        payloads = body.get("payloads") if isinstance(body, dict) else body
+        if not isinstance(payloads, list) or not all(isinstance(p, dict) for p in payloads):
+            self._json(400, {"error": "expected a list of JSON objects"})
+            return
+        if len(payloads) > MAX_BATCH:
+            self._json(413, {"error": f"at most {MAX_BATCH} payloads per batch"})
+            return
+
+        # the first render must get in straight away; the rest wait for slots,
+        # keeping at most one per worker of this batch in flight
+        try:
+            pending = [self.service.submit(payloads[0])] if payloads else []
+        except Saturated as e:
+            self._json(429, {"error": str(e)}, {"Retry-After": str(e.retry_after)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Disposition", 'attachment; filename="reports.zip"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        out = _Chunked(self.wfile)
+        errors = []
+        render_s = 0.0
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_STORED) as zf:
+            nxt = len(pending)
+            for index in range(len(payloads)):
+                while nxt < len(payloads) and len(pending) < self.service.workers:
+                    try:
+                        pending.append(self.service.submit(payloads[nxt], block=True))
+                    except Saturated as e:
+                        pending.append(e)
+                    nxt += 1
+                fut = pending.pop(0)
+                raw = payloads[index]
+                try:
+                    if isinstance(fut, Exception):
+                        raise fut
+                    pdf_bytes, _, seconds = self.service.result(fut)
+                except Exception as e:
+                    errors.append({"index": index, "client_name": raw.get("client_name"),
+                                   "error": f"{type(e).__name__}: {e}"})
+                    continue
+                render_s += seconds
+                name = f"{index:05d}_{safe_filename(report_filename(raw['client_name']))}"
+                with zf.open(name, "w") as entry:
+                    entry.write(pdf_bytes)
+            zf.writestr("manifest.json", json.dumps({
+                "rendered": len(payloads) - len(errors),
+                "errors": errors,
+                "render_ms": round(render_s * 1000, 1),
+                "total_ms": round((time.perf_counter() - start) * 1000, 1),
+            }, indent=2))
+        out.close()
+
+
+def make_server(service: ReportService, host: str = "127.0.0.1", port: int = 8502,
+                quiet: bool = False) -> ThreadingHTTPServer:
+    handler = type("BoundReportHandler", (ReportHandler,), {"service": service, "quiet": quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve chakra report rendering over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SOULFUL_SERVICE_PORT", "8502")))
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--queue", type=int, help="renders allowed to wait for a worker")
+    parser.add_argument("--timeout", type=float, help="seconds before a render answers 504")
+    parser.add_argument("--quiet", action="store_true", help="no per-request log lines")
+    args = parser.parse_args(argv)
+
+    service = ReportService.from_env(workers=args.workers, queue=args.queue, timeout=args.timeout)
+    server = make_server(service, args.host, args.port, args.quiet)
+    print(f"serving on http://{args.host}:{server.server_port} "
+          f"({service.workers} workers, {service.queue} queued)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,435 @@
+"""Persistent store of assessments (SQLite).
+
+Each assessment is one narrow row: client, coach, session day and the seven
+statuses packed into one integer (report.encode_statuses). Text that still
+equals the predefined notes/remedies/crystals or the default goal,
+follow-up and affirmations is not stored at all; edited text goes to the
+overrides table, pointing into a de-duplicated texts table.
+
+    store = AssessmentStore("soulful.db")
+    store.save(payload)
+    store.for_client("Asha")                       # newest first
+    store.for_coach("Rekha Babulkar", since=datetime.date.today() - datetime.timedelta(days=30))
+
+Set SOULFUL_DB_PATH to choose where the app keeps its database.
+"""
+import datetime
+import functools
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from report import (CHAKRAS, DATE_FORMAT, DEFAULT_AFFIRMATIONS, DEFAULT_COACH, DEFAULT_FOLLOW_UP, DEFAULT_GOAL,
+                    GENDER_OPTIONS, STATUS_OPTIONS, decode_statuses, default_chakra_entry, encode_statuses)
+
+DB_PATH = os.environ.get("SOULFUL_DB_PATH", "soulful.db")
+EPOCH = datetime.date(1970, 1, 1)
+BATCH_SIZE = 5000
+MAX_PARAMS = 900   # stay under SQLite's bound-parameter limit on older builds
+
+# overrides.chakra is the CHAKRAS index, or TOP for payload-level fields
+TOP = -1
+CHAKRA_FIELDS = ("notes", "remedies", "crystals")
+TOP_FIELDS = ("goal", "follow_up", "affirmations", "date", "gender", "language")
+TOP_DEFAULTS = {"goal": DEFAULT_GOAL, "follow_up": DEFAULT_FOLLOW_UP, "affirmations": DEFAULT_AFFIRMATIONS}
+
+# (chakra, status) -> predefined (notes, remedies, crystals), the text stored by reference
+DEFAULT_TEXT = {
+    (ch, status): tuple(default_chakra_entry(ch, status)[f] for f in CHAKRA_FIELDS)
+    for ch in CHAKRAS for status in STATUS_OPTIONS
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS coaches (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS texts (
+    id INTEGER PRIMARY KEY,
+    hash INTEGER UNIQUE,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assessments (
+    id INTEGER PRIMARY KEY,
+    client_id INTEGER NOT NULL REFERENCES clients(id),
+    coach_id INTEGER NOT NULL REFERENCES coaches(id),
+    day INTEGER,                 -- days since 1970-01-01, NULL if the date isn't DATE_FORMAT
+    statuses INTEGER NOT NULL,   -- report.encode_statuses
+    gender INTEGER,              -- GENDER_OPTIONS index, NULL if overridden
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS overrides (
+    assessment_id INTEGER NOT NULL REFERENCES assessments(id) ON DELETE CASCADE,
+    chakra INTEGER NOT NULL,
+    field INTEGER NOT NULL,
+    text_id INTEGER NOT NULL REFERENCES texts(id),
+    PRIMARY KEY (assessment_id, chakra, field)
+) WITHOUT ROWID;
+-- progress.ClientProgress per client, as JSON, up to and including assessment last_id
+CREATE TABLE IF NOT EXISTS progress (
+    client_id INTEGER PRIMARY KEY REFERENCES clients(id),
+    last_id INTEGER NOT NULL,
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assessments_client ON assessments(client_id, day);
+-- sessions saved since a client's progress aggregate (client_sessions(after_id=...))
+CREATE INDEX IF NOT EXISTS assessments_client_id ON assessments(client_id, id);
+-- statuses ride along so analytics range scans (frame()) never touch the table
+CREATE INDEX IF NOT EXISTS assessments_coach ON assessments(coach_id, day, statuses);
+CREATE INDEX IF NOT EXISTS assessments_day ON assessments(day, coach_id, statuses);
+"""
+
+
+@functools.lru_cache(maxsize=4096)
+def date_to_day(text: str) -> Optional[int]:
+    """Day number for a DATE_FORMAT string, or None if it doesn't round-trip."""
+    try:
+        d = datetime.datetime.strptime(text, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+    return (d - EPOCH).days if d.strftime(DATE_FORMAT) == text else None
+
+
+@functools.lru_cache(maxsize=4096)
+def day_to_date(day: int) -> str:
+    return (EPOCH + datetime.timedelta(days=day)).strftime(DATE_FORMAT)
+
+
+def _day(value) -> Optional[int]:
+    if value is None:
+        return None
+    if isinstance(value, datetime.date):
+        return (value - EPOCH).days
+    return date_to_day(value)
+
+
+def _text_hash(body: str) -> int:
+    return int.from_bytes(hashlib.blake2b(body.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+@dataclass
+class StoredAssessment:
+    id: int
+    created_at: float
+    payload: dict   # complete payload, ready for make_pdf
+
+
+class AssessmentStore:
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        # shared by Streamlit sessions (threads); every use goes through the lock
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._client_ids = {}
+        self._coach_ids = {}
+        self._text_ids = {}   # hash -> id, for texts seen by this process
+        with self._lock:
+            if path != ":memory:":
+                self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute("PRAGMA foreign_keys=ON")
+            self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ---------- ids ----------
+    def _name_id(self, table: str, cache: dict, name: str) -> int:
+        found = cache.get(name)
+        if found is None:
+            self._db.execute(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", (name,))
+            found = self._db.execute(f"SELECT id FROM {table} WHERE name = ?", (name,)).fetchone()[0]
+            cache[name] = found
+        return found
+
+    def _text_id(self, body: str) -> int:
+        h = _text_hash(body)
+        found = self._text_ids.get(h)
+        if found is None:
+            row = self._db.execute("SELECT id, body FROM texts WHERE hash = ?", (h,)).fetchone()
+            if row is None:
+                found = self._db.execute("INSERT INTO texts (hash, body) VALUES (?, ?)", (h, body)).lastrowid
+            elif row[1] == body:
+                found = row[0]
+            else:
+                # 64-bit collision: keep the text, just without the dedup hash
+                return self._db.execute("INSERT INTO texts (hash, body) VALUES (NULL, ?)", (body,)).lastrowid
+            self._text_ids[h] = found
+        return found
+
+    # ---------- writing ----------
+    def _rows(self, assessment_id: int, payload: dict, created_at: float):
+        """(assessment row, override rows) for one payload."""
+        chakras = payload["chakras"]
+        overrides = []
+
+        def override(chakra: int, field: int, body):
+            overrides.append((assessment_id, chakra, field, self._text_id(str(body))))
+
+        for i, ch in enumerate(CHAKRAS):
+            given = chakras[ch]
+            defaults = DEFAULT_TEXT.get((ch, given["status"]))
+            if defaults is None:
+                encode_statuses(chakras)   # raises the usual ValueError
+            for f, name in enumerate(CHAKRA_FIELDS):
+                value = given.get(name, defaults[f])
+                if value != defaults[f]:
+                    override(i, f, value)
+        for f, name in enumerate(TOP_FIELDS[:3]):
+            value = payload.get(name, TOP_DEFAULTS[name])
+            if value != TOP_DEFAULTS[name]:
+                override(TOP, f, value)
+
+        day = _day(payload.get("date"))
+        if day is None and payload.get("date"):
+            override(TOP, TOP_FIELDS.index("date"), payload["date"])
+        gender = payload.get("gender") or GENDER_OPTIONS[0]
+        gender_code = GENDER_OPTIONS.index(gender) if gender in GENDER_OPTIONS else None
+        if gender_code is None:
+            override(TOP, TOP_FIELDS.index("gender"), gender)
+        if payload.get("language"):
+            override(TOP, TOP_FIELDS.index("language"), payload["language"])
+
+        row = (
+            assessment_id,
+            self._name_id("clients", self._client_ids, payload["client_name"]),
+            self._name_id("coaches", self._coach_ids, payload.get("coach_name") or DEFAULT_COACH),
+            day,
+            encode_statuses(chakras),
+            gender_code,
+            created_at,
+        )
+        return row, overrides
+
+    def save(self, payload: dict, created_at: float = None) -> int:
+        """Stores one complete payload and returns its id."""
+        return self.save_many([payload], created_at=created_at)[0]
+
+    def save_many(self, payloads: Iterable[dict], batch_size: int = BATCH_SIZE, created_at: float = None) -> list:
+        """Stores payloads in transactions of ``batch_size`` rows; returns the new ids in order."""
+        ids = []
+        batch = []
+        for payload in payloads:
+            batch.append(payload)
+            if len(batch) >= batch_size:
+                ids.extend(self._insert(batch, created_at))
+                batch = []
+        if batch:
+            ids.extend(self._insert(batch, created_at))
+        return ids
+
+    def _insert(self, payloads: list, created_at: float = None) -> list:
+        now = time.time() if created_at is None else created_at
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # ids are handed out here so override rows can be written in the same executemany
+                next_id = self._db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM assessments").fetchone()[0]
+                rows, overrides = [], []
+                for n, payload in enumerate(payloads):
+                    row, extra = self._rows(next_id + n, payload, now)
+                    rows.append(row)
+                    overrides.extend(extra)
+                self._db.executemany("INSERT INTO assessments VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._db.executemany("INSERT INTO overrides VALUES (?, ?, ?, ?)", overrides)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                # ids/texts cached during the failed transaction may not exist
+                self._client_ids.clear()
+                self._coach_ids.clear()
+                self._text_ids.clear()
+                raise
+        return [row[0] for row in rows]
+
+    def delete(self, assessment_id: int):
+        with self._lock:
+            # the client's progress aggregate included this row: rebuild it next time
+            self._db.execute("DELETE FROM progress WHERE client_id = "
+                             "(SELECT client_id FROM assessments WHERE id = ?)", (assessment_id,))
+            self._db.execute("DELETE FROM assessments WHERE id = ?", (assessment_id,))
+
+    # ---------- reading ----------
+    _SELECT = ("SELECT a.id, cl.name, co.name, a.day, a.statuses, a.gender, a.created_at "
+               "FROM assessments a JOIN clients cl ON cl.id = a.client_id JOIN coaches co ON co.id = a.coach_id ")
+
+    def _overrides(self, ids: list) -> dict:
+        found = {}
+        for start in range(0, len(ids), MAX_PARAMS):
+            chunk = ids[start:start + MAX_PARAMS]
+            marks = ",".join("?" * len(chunk))
+            for aid, chakra, field, body in self._db.execute(
+                    "SELECT o.assessment_id, o.chakra, o.field, t.body FROM overrides o "
+                    f"JOIN texts t ON t.id = o.text_id WHERE o.assessment_id IN ({marks})", chunk):
+                found.setdefault(aid, []).append((chakra, field, body))
+        return found
+
+    @staticmethod
+    def _assessment(row, overrides) -> StoredAssessment:
+        aid, client, coach, day, statuses, gender, created_at = row
+        chakras = {}
+        for ch, status in zip(CHAKRAS, decode_statuses(statuses)):
+            notes, remedies, crystals = DEFAULT_TEXT[ch, status]
+            chakras[ch] = {"status": status, "notes": notes, "remedies": remedies, "crystals": crystals}
+        payload = {
+            "client_name": client,
+            "gender": GENDER_OPTIONS[gender] if gender is not None else "",
+            "coach_name": coach,
+            "date": day_to_date(day) if day is not None else "",
+            "goal": DEFAULT_GOAL,
+            "chakras": chakras,
+            "follow_up": DEFAULT_FOLLOW_UP,
+            "affirmations": DEFAULT_AFFIRMATIONS,
+        }
+        for chakra, field, body in overrides:
+            if chakra == TOP:
+                payload[TOP_FIELDS[field]] = body
+            else:
+                chakras[CHAKRAS[chakra]][CHAKRA_FIELDS[field]] = body
+        return StoredAssessment(aid, created_at, payload)
+
+    def _query(self, where: str, params: tuple, order: str = "a.day DESC, a.id DESC",
+               limit: Optional[int] = None) -> list:
+        """StoredAssessments for the matching rows."""
+        sql = self._SELECT + where + f" ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+            overrides = self._overrides([r[0] for r in rows])
+        return [self._assessment(r, overrides.get(r[0], ())) for r in rows]
+
+    def get(self, assessment_id: int) -> Optional[StoredAssessment]:
+        found = self._query("WHERE a.id = ?", (assessment_id,))
+        return found[0] if found else None
+
+    def for_client(self, client_name: str, limit: Optional[int] = None) -> list:
+        """All sessions of one client, newest first."""
+        return self._query("WHERE a.client_id = (SELECT id FROM clients WHERE name = ?)", (client_name,),
+                           limit=limit)
+
+    def for_coach(self, coach_name: str, since=None, until=None, limit: Optional[int] = None) -> list:
+        """One coach's sessions dated within [since, until], newest first."""
+        where, params = self._day_range("WHERE a.coach_id = (SELECT id FROM coaches WHERE name = ?)",
+                                        (coach_name,), since, until)
+        return self._query(where, params, limit=limit)
+
+    def between(self, since=None, until=None, limit: Optional[int] = None) -> list:
+        where, params = self._day_range("WHERE 1", (), since, until)
+        return self._query(where, params, limit=limit)
+
+    @staticmethod
+    def _day_range(where: str, params: tuple, since, until):
+        if since is not None:
+            where += " AND a.day >= ?"
+            params += (_day(since),)
+        if until is not None:
+            where += " AND a.day <= ?"
+            params += (_day(until),)
+        return where, params
+
+    def iter_all(self, batch_size: int = BATCH_SIZE) -> Iterator[StoredAssessment]:
+        """Every assessment in id order, read in pages so memory stays flat."""
+        return self.select(batch_size=batch_size)
+
+    def select(self, client_name: Optional[str] = None, coach_name: Optional[str] = None, since=None, until=None,
+               batch_size: int = BATCH_SIZE) -> Iterator[StoredAssessment]:
+        """Matching assessments in id order, read in pages so memory stays flat. Filters combine with AND."""
+        where, params = self._filter(client_name, coach_name, since, until)
+        last = 0
+        while True:
+            page = self._query(where + " AND a.id > ?", params + (last,), order="a.id", limit=batch_size)
+            if not page:
+                return
+            yield from page
+            last = page[-1].id
+
+    def count_matching(self, client_name: Optional[str] = None, coach_name: Optional[str] = None,
+                       since=None, until=None) -> int:
+        """How many assessments select() would yield."""
+        where, params = self._filter(client_name, coach_name, since, until)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM assessments a {where}", params).fetchone()[0]
+
+    @classmethod
+    def _filter(cls, client_name, coach_name, since, until):
+        where, params = "WHERE 1", ()
+        if client_name is not None:
+            where += " AND a.client_id = (SELECT id FROM clients WHERE name = ?)"
+            params += (client_name,)
+        if coach_name is not None:
+            where += " AND a.coach_id = (SELECT id FROM coaches WHERE name = ?)"
+            params += (coach_name,)
+        return cls._day_range(where, params, since, until)
+
+    def client_sessions(self, client_name: str, after_id: int = 0) -> list:
+        """(id, day, packed statuses) of one client's sessions with id > ``after_id``, oldest first.
+
+        Sessions without a usable date are placed on the day they were saved.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, COALESCE(day, CAST(created_at / 86400 AS INTEGER)) AS d, statuses FROM assessments "
+                "WHERE client_id = (SELECT id FROM clients WHERE name = ?) AND id > ? ORDER BY d, id",
+                (client_name, after_id)).fetchall()
+
+    def progress_state(self, client_name: str) -> Optional[tuple]:
+        """(last_id, state) saved by save_progress_state, or None."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT last_id, state FROM progress WHERE client_id = (SELECT id FROM clients WHERE name = ?)",
+                (client_name,)).fetchone()
+
+    def save_progress_state(self, client_name: str, last_id: int, state: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO progress (client_id, last_id, state) "
+                "SELECT id, ?, ? FROM clients WHERE name = ?", (last_id, state, client_name))
+
+    def clients(self) -> list:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT name FROM clients ORDER BY name")]
+
+    def coaches(self) -> list:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT name FROM coaches ORDER BY name")]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+
+    def frame(self, coach_name: Optional[str] = None, since=None, until=None):
+        """analytics.AssessmentFrame straight from the packed columns, without building payloads."""
+        import numpy as np
+
+        from analytics import AssessmentFrame
+
+        where, params = ("WHERE 1", ())
+        if coach_name is not None:
+            where, params = "WHERE a.coach_id = (SELECT id FROM coaches WHERE name = ?)", (coach_name,)
+        where, params = self._day_range(where, params, since, until)
+        with self._lock:
+            coaches = dict(self._db.execute("SELECT id, name FROM coaches"))
+            rows = self._db.execute(f"SELECT a.statuses, COALESCE(a.day, -2147483648), a.coach_id "
+                                    f"FROM assessments a {where}", params).fetchall()
+        if not rows:
+            return AssessmentFrame.empty()
+        packed, days, coach_ids = (np.array(col, dtype=np.int64) for col in zip(*rows))
+        shifts = 2 * np.arange(len(CHAKRAS), dtype=np.int64)
+        statuses = ((packed[:, None] >> shifts) & 3).astype(np.uint8)
+        dates = days.astype("datetime64[D]")
+        dates[days == -2147483648] = np.datetime64("NaT")
+        names = sorted(coaches.values())
+        remap = np.zeros(max(coaches) + 1, dtype=np.int32)
+        for cid, name in coaches.items():
+            remap[cid] = names.index(name)
+        return AssessmentFrame(statuses, dates, remap[coach_ids], names)
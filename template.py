@@ -0,0 +1,180 @@
+"""Precompiled static blocks for make_pdf.
+
+Most of the report (title block, section headings, the default follow-up,
+affirmations and the MyAuraBliss footer) comes out the same for every client.
+A block is laid out once with the normal FPDF calls; the page operators it
+produced are kept together with the FPDF state before and after it. Later
+documents that reach the block in the same state get those operators appended
+directly and skip the set_font/cell/multi_cell work.
+
+Replay only happens when the starting state (position, font, colours, margins)
+matches the recording exactly, so the output is identical to a live render.
+A template created with relocate=True may also replay a block further up or
+down the page (wrapped in a translation), as long as it still fits above the
+page break; incremental.SectionCache uses that for the per-client sections.
+"""
+import threading
+
+# FPDF attributes that decide what a block draws and where it leaves the cursor
+_STATE = (
+    "x", "y", "k", "h", "w", "l_margin", "r_margin", "c_margin", "page_break_trigger",
+    "font_family", "font_style", "font_size_pt", "underline",
+    "text_color", "fill_color", "draw_color", "color_flag", "line_width", "ws", "lasth",
+)
+
+MAX_VARIANTS = 4   # recordings kept per block (different starting states)
+_Y = _STATE.index("y")
+BREAK_MARGIN = 0.001   # mm kept clear of the page break when relocating, against float drift
+
+
+def _state(pdf) -> tuple:
+    return tuple(getattr(pdf, a, None) for a in _STATE)
+
+
+def _font_ids(pdf) -> dict:
+    return {key: (entry["i"], entry["type"]) for key, entry in pdf.fonts.items()}
+
+
+def _subsets(pdf) -> dict:
+    # per embedded (TTF) font, the characters used so far; fpdf appends to it on every cell
+    return {key: entry["subset"] for key, entry in pdf.fonts.items() if entry["type"] == "TTF"}
+
+
+def _without_y(state: tuple) -> tuple:
+    return state[:_Y] + state[_Y + 1:]
+
+
+class _Recording:
+    __slots__ = ("before", "after", "ops", "font_ids", "new_fonts", "glyphs")
+
+    def __init__(self, before, after, ops, font_ids, new_fonts, glyphs):
+        self.before = before
+        self.after = after
+        self.ops = ops
+        self.font_ids = font_ids     # fonts registered before the block: fontkey -> (/F number, type)
+        self.new_fonts = new_fonts   # fonts the block registered itself
+        self.glyphs = glyphs         # embedded fonts: fontkey -> characters the block drew
+
+    def fits(self, pdf) -> bool:
+        # /F<n> references in the ops must mean the same fonts in this document
+        return _state(pdf) == self.before and _font_ids(pdf) == self.font_ids
+
+    def offset(self, pdf):
+        """How far down to move the block to start at the cursor, or None if it can't go there."""
+        state = _state(pdf)
+        if _without_y(state) != _without_y(self.before) or _font_ids(pdf) != self.font_ids:
+            return None
+        dy = state[_Y] - self.before[_Y]
+        # the block never broke the page where it was recorded; it mustn't need to here
+        if self.after[_Y] + dy > pdf.page_break_trigger - BREAK_MARGIN:
+            return None
+        return dy
+
+    def replay(self, pdf, dy: float = 0.0):
+        if dy:
+            pdf.pages[pdf.page] += "q 1 0 0 1 0 %.3f cm\n" % (-dy * pdf.k) + self.ops + "Q\n"
+        else:
+            pdf.pages[pdf.page] += self.ops
+        for key, entry in self.new_fonts.items():
+            pdf.fonts[key] = dict(entry)
+        for key, codes in self.glyphs.items():
+            pdf.fonts[key]["subset"].extend(codes)
+        for attr, value in zip(_STATE, self.after):
+            setattr(pdf, attr, value)
+        if pdf.font_family:
+            pdf.font_size = pdf.font_size_pt / pdf.k
+            pdf.current_font = pdf.fonts[pdf.font_family + pdf.font_style]
+            pdf.unifontsubset = pdf.current_font["type"] == "TTF"
+        if dy:
+            pdf.y += dy
+            self._restore_graphics(pdf)
+
+    def _restore_graphics(self, pdf):
+        # Q put back the page's graphics state from before the block, but FPDF
+        # believes the block's last font/colours are active: emit those again
+        before = dict(zip(_STATE, self.before))
+        if (pdf.font_family, pdf.font_style, pdf.font_size_pt) != (
+                before["font_family"], before["font_style"], before["font_size_pt"]) and pdf.font_family:
+            pdf._out("BT /F%d %.2f Tf ET" % (pdf.current_font["i"], pdf.font_size_pt))
+        if pdf.draw_color != before["draw_color"]:
+            pdf._out(pdf.draw_color)
+        if pdf.fill_color != before["fill_color"]:
+            pdf._out(pdf.fill_color)
+        if pdf.line_width != before["line_width"]:
+            pdf._out("%.2f w" % (pdf.line_width * pdf.k))
+        if pdf.ws != before["ws"]:
+            pdf._out("%.3f Tw" % (pdf.ws * pdf.k))
+
+
+class PageTemplate:
+    def __init__(self, relocate: bool = False):
+        self.relocate = relocate
+        self._blocks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.relocated = 0
+        self.misses = 0
+
+    def draw(self, pdf, key, fn, *args):
+        """Draws ``fn(pdf, *args)``, replaying a recording of block ``key`` when possible.
+
+        ``key`` must identify everything ``fn`` draws; pass None for content
+        that changes per client and it is simply drawn live.
+        """
+        if key is None:
+            fn(pdf, *args)
+            return
+        variants = self._variants(key)
+        for rec in variants:
+            if rec.fits(pdf):
+                rec.replay(pdf)
+                self.hits += 1
+                return
+        if self.relocate:
+            for rec in variants:
+                dy = rec.offset(pdf)
+                if dy is not None:
+                    rec.replay(pdf, dy)
+                    self.relocated += 1
+                    return
+        self.misses += 1
+        self._record(pdf, key, fn, args)
+
+    def _variants(self, key) -> list:
+        return self._blocks.get(key, ())
+
+    def _store(self, key, rec):
+        with self._lock:
+            variants = self._blocks.setdefault(key, [])
+            if len(variants) < MAX_VARIANTS:
+                variants.append(rec)
+
+    def _record(self, pdf, key, fn, args):
+        page = pdf.page
+        start = len(pdf.pages[page])
+        before = _state(pdf)
+        font_ids = _font_ids(pdf)
+        subsets = _subsets(pdf)
+        marks = {key: len(used) for key, used in subsets.items()}
+        n_images, n_links = len(pdf.images), len(pdf.page_links.get(page, ()))
+
+        fn(pdf, *args)
+
+        # blocks that broke onto a new page, touched images/links or registered
+        # an embedded font of their own stay live-only
+        new_fonts = {k: dict(v) for k, v in pdf.fonts.items() if k not in font_ids}
+        if (pdf.page != page or len(pdf.images) != n_images
+                or len(pdf.page_links.get(page, ())) != n_links
+                or any(entry["type"] != "core" for entry in new_fonts.values())):
+            return
+        # a replay must still put the block's characters into the font subsets
+        glyphs = {key: tuple(sorted(set(used[marks[key]:]))) for key, used in subsets.items()}
+        glyphs = {key: codes for key, codes in glyphs.items() if codes}
+        self._store(key, _Recording(before, _state(pdf), pdf.pages[page][start:], font_ids, new_fonts, glyphs))
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+
+PAGE_TEMPLATE = PageTemplate()
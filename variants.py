@@ -0,0 +1,340 @@
+"""Pre-rendered report bodies for all 4 ** 7 status combinations.
+
+A report whose chakra text, follow-up and affirmations are all the defaults
+is decided by its seven statuses, except for the client header on page 1
+(name, gender, date, healer, intent), which is always the same height. The
+warm command renders every combination once and packs the results into one
+file; make_pdf then only has to draw the header, compress page 1 and put
+the file together:
+
+    python variants.py warm --out variants.bin --workers 4
+    SOULFUL_VARIANTS_PATH=variants.bin streamlit run app.py
+
+The file is an offset index over per-combination records, read through
+mmap:
+
+    magic, meta length, meta (JSON: what the bodies were rendered with,
+                              and where the shared blobs are)
+    shared blobs     file head, page-1 operators before the header, and each
+                     distinct set of resource objects (fonts, logo)
+    records          page-1 operators after the header (zlib), the other
+                     pages as written, and the object offsets
+    index            4 ** 7 x (offset, length)
+
+The output is byte-for-byte what make_pdf writes, apart from the creation
+date. A file warmed with another template version, logo, font profile or
+rule base is ignored, and reports with any edited text, a reading language
+or a Unicode font fall back to a normal render.
+"""
+import argparse
+import copy
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+import fonts
+import rules
+from assets import FETCH_TIMEOUT, LOGO
+from report import (CHAKRAS, DEFAULT_AFFIRMATIONS, DEFAULT_FOLLOW_UP, N_STATES, TEMPLATE_VERSION, _draw_client_header,
+                    build_pdf, complete_payload, decode_statuses, encode_statuses, write_to)
+from store import DEFAULT_TEXT
+
+VARIANTS_PATH = os.environ.get("SOULFUL_VARIANTS_PATH", "")
+MAGIC = b"SOULVAR1"
+HEADER_FIELDS = ("client_name", "gender", "date", "coach_name", "goal")
+TEXT_FIELDS = ("notes", "remedies", "crystals")
+PAGE1 = 3   # fpdf numbers the first page 3 and its content stream 4
+
+_INDEX = struct.Struct("<QI")       # record offset, length
+_RECORD = struct.Struct("<IIIHH")   # suffix length, pages length, old page-1 object length, resources id, offsets
+
+
+def fingerprint() -> dict:
+    """Everything besides the statuses that the pre-rendered bodies depend on."""
+    from fpdf import FPDF_VERSION
+
+    return {
+        "template": TEMPLATE_VERSION,
+        "logo": os.path.basename(LOGO.path() or ""),
+        "fonts": fonts.profile(),
+        "rules": rules.version(),
+        "fpdf": FPDF_VERSION,
+    }
+
+
+# --------------------------------------------------
+# RENDERING ONE COMBINATION
+# --------------------------------------------------
+class _HeaderMark:
+    """Stands in for build_pdf's SectionCache to note where the header's operators are."""
+
+    def __init__(self):
+        self.start = self.end = 0
+        self.before = None   # the document as it was just before the header
+
+    def draw(self, pdf, key, fn, *args):
+        if key[0] == "header":
+            self.start = len(pdf.pages[pdf.page])
+            self.before = copy.copy(pdf)
+            self.before.fonts = dict(pdf.fonts)
+            fn(pdf, *args)
+            self.end = len(pdf.pages[pdf.page])
+        else:
+            fn(pdf, *args)
+
+
+def default_payload(code: int, **header) -> dict:
+    chakras = {ch: {"status": status} for ch, status in zip(CHAKRAS, decode_statuses(code))}
+    return complete_payload(dict(header, client_name=header.get("client_name") or "Client", chakras=chakras))
+
+
+def _render(code: int):
+    """(head, page-1 prefix, suffix, pages, resources, old page-1 object length, offsets) for one code."""
+    mark = _HeaderMark()
+    pdf = build_pdf(default_payload(code), sections=mark)
+    ops = pdf.pages[1]
+    out = io.BytesIO()
+    write_to(pdf, out)
+    data = out.getvalue()
+    offsets = pdf.offsets
+    content, after = offsets[PAGE1 + 1], offsets[PAGE1 + 2]
+    # file order: pages and their content streams, the pages root (object 1), then
+    # fonts, images and the resource dictionary, info, catalog
+    return (
+        data[:content],
+        ops[:mark.start].encode("latin-1"),
+        zlib.compress(ops[mark.end:].encode("latin-1")),
+        data[after:offsets[1]],
+        data[offsets[1]:offsets[pdf.n - 1]],
+        after - content,
+        [offsets[i] for i in range(1, pdf.n - 1)],
+    )
+
+
+def _render_chunk(codes):
+    return [(code,) + _render(code) for code in codes]
+
+
+# --------------------------------------------------
+# WARM
+# --------------------------------------------------
+def warm(path: str, workers: Optional[int] = None, chunk: int = 256, progress=None) -> dict:
+    """Renders every combination into ``path`` (written to a temp file, then renamed)."""
+    if fonts.profile():
+        raise RuntimeError("variants need the core fonts: an embedded font's subset depends on the header text")
+    workers = workers or os.cpu_count() or 1
+    LOGO.prefetch()
+    LOGO.wait(FETCH_TIMEOUT)
+    start = time.perf_counter()
+    head = prefix = None
+    resources = {}   # bytes -> id
+    index = [None] * N_STATES
+    tmp = f"{path}.{os.getpid()}.tmp"
+    chunks = [range(i, min(i + chunk, N_STATES)) for i in range(0, N_STATES, chunk)]
+    try:
+        with open(tmp, "wb") as f, ProcessPoolExecutor(workers) as pool:
+            f.write(b"\0" * 1024)   # room for the header; rewritten once the meta is known
+            for done, results in enumerate(pool.map(_render_chunk, chunks), 1):
+                for code, h, p, suffix, pages, res, old_len, offsets in results:
+                    if head is None:
+                        head, prefix = h, p
+                    elif (h, p) != (head, prefix):
+                        raise RuntimeError(f"page 1 before the header differs for status code {code}")
+                    res_id = resources.setdefault(res, len(resources))
+                    record = (_RECORD.pack(len(suffix), len(pages), old_len, res_id, len(offsets))
+                              + struct.pack(f"<{len(offsets)}I", *offsets) + suffix + pages)
+                    index[code] = (f.tell(), len(record))
+                    f.write(record)
+                if progress:
+                    progress(done * chunk, N_STATES)
+            shared = {}
+            for name, blob in [("head", head), ("prefix", prefix)] + [(f"res{i}", r) for r, i in resources.items()]:
+                shared[name] = (f.tell(), len(blob))
+                f.write(blob)
+            index_at = f.tell()
+            for entry in index:
+                f.write(_INDEX.pack(*entry))
+            meta = dict(fingerprint(), shared=shared, index=index_at, warmed=time.time())
+            blob = json.dumps(meta).encode("utf-8")
+            if len(MAGIC) + 4 + len(blob) > 1024:
+                raise RuntimeError("variant meta doesn't fit its header")
+            f.seek(0)
+            f.write(MAGIC + struct.pack("<I", len(blob)) + blob)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    meta["seconds"] = time.perf_counter() - start
+    meta["bytes"] = os.path.getsize(path)
+    return meta
+
+
+# --------------------------------------------------
+# STAMPING
+# --------------------------------------------------
+class VariantArchive:
+    """A warmed file, memory-mapped; stamp() assembles one report from it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a variants file")
+        (size,) = struct.unpack_from("<I", self._mm, len(MAGIC))
+        at = len(MAGIC) + 4
+        self.meta = json.loads(self._mm[at:at + size])
+        self._shared = {name: self._mm[o:o + n] for name, (o, n) in self.meta["shared"].items()}
+        self._index = self.meta["index"]
+        self._before = None   # document state just before the header, rebuilt once per process
+        self._lock = threading.Lock()
+        self.stamped = 0
+
+    def current(self) -> bool:
+        """False once the template, logo, fonts or rules have moved on from the warmed ones."""
+        return all(self.meta[k] == v for k, v in fingerprint().items())
+
+    def close(self):
+        self._mm.close()
+
+    def _header_ops(self, payload: dict) -> bytes:
+        before = self._before
+        if before is None:
+            with self._lock:
+                if self._before is None:
+                    mark = _HeaderMark()
+                    build_pdf(default_payload(0), sections=mark)
+                    self._before = mark.before
+                before = self._before
+        pdf = copy.copy(before)
+        pdf.fonts = dict(before.fonts)
+        pdf.pages = {pdf.page: ""}
+        _draw_client_header(pdf, *(payload[k] for k in HEADER_FIELDS))
+        return pdf.pages[pdf.page].encode("latin-1")
+
+    def stamp(self, payload: dict) -> bytes:
+        """The report for a payload with default text (see eligible())."""
+        code = encode_statuses(payload["chakras"])
+        at, length = _INDEX.unpack_from(self._mm, self._index + code * _INDEX.size)
+        suffix_len, pages_len, old_len, res_id, n = _RECORD.unpack_from(self._mm, at)
+        offsets = struct.unpack_from(f"<{n}I", self._mm, at + _RECORD.size)
+        at += _RECORD.size + 4 * n
+        suffix = zlib.decompress(self._mm[at:at + suffix_len])
+        pages = self._mm[at + suffix_len:at + suffix_len + pages_len]
+
+        head = self._shared["head"]
+        stream = zlib.compress(self._shared["prefix"] + self._header_ops(payload) + suffix)
+        # the page-1 content object exactly as FPDF._putpages writes it
+        content = (b"%d 0 obj\n<</Filter /FlateDecode /Length %d>>\nstream\n" % (PAGE1 + 1, len(stream))
+                   + stream + b"\nendstream\nendobj\n")
+        shift = len(content) - old_len
+        body = b"".join((head, content, pages, self._shared[f"res{res_id}"]))
+        self.stamped += 1
+        return body + _trailer([o + shift if o > len(head) else o for o in offsets], len(body))
+
+
+def _trailer(offsets: list, start: int) -> bytes:
+    # info, catalog, xref and trailer as FPDF._enddoc writes them
+    from fpdf import FPDF_VERSION
+
+    n = len(offsets) + 1
+    info = ("%d 0 obj\n<<\n/Producer (PyFPDF %s http://pyfpdf.googlecode.com/)\n/CreationDate (D:%s)\n>>\nendobj\n"
+            % (n, FPDF_VERSION, datetime.now().strftime("%Y%m%d%H%M%S")))
+    catalog = ("%d 0 obj\n<<\n/Type /Catalog\n/Pages 1 0 R\n/OpenAction [3 0 R /FitH null]\n"
+               "/PageLayout /OneColumn\n>>\nendobj\n" % (n + 1))
+    xref_at = start + len(info) + len(catalog)
+    lines = [info, catalog, "xref\n0 %d\n0000000000 65535 f \n" % (n + 2)]
+    lines.extend("%010d 00000 n \n" % o for o in offsets + [start, start + len(info)])
+    lines.append("trailer\n<<\n/Size %d\n/Root %d 0 R\n/Info %d 0 R\n>>\nstartxref\n%d\n%%%%EOF\n"
+                 % (n + 2, n + 1, n, xref_at))
+    return "".join(lines).encode("latin-1")
+
+
+def eligible(payload: dict) -> bool:
+    """True if everything but the header comes from the predefined tables."""
+    if payload.get("follow_up") != DEFAULT_FOLLOW_UP or payload.get("affirmations") != DEFAULT_AFFIRMATIONS:
+        return False
+    if payload.get("language"):
+        return False
+    chakras = payload.get("chakras") or {}
+    for ch in CHAKRAS:
+        given = chakras.get(ch)
+        defaults = DEFAULT_TEXT.get((ch, given.get("status"))) if given else None
+        if defaults is None or any(given.get(f) != d for f, d in zip(TEXT_FIELDS, defaults)):
+            return False
+    return all(isinstance(payload.get(k), str) for k in HEADER_FIELDS)
+
+
+_opened = {}   # (path, mtime_ns) -> VariantArchive, so a re-warmed file is picked up
+_open_lock = threading.Lock()
+
+
+def archive(path: str = None) -> Optional[VariantArchive]:
+    """The archive at SOULFUL_VARIANTS_PATH if it matches this process's setup, else None."""
+    path = path or VARIANTS_PATH
+    if not path:
+        return None
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    found = _opened.get(key)
+    if found is None:
+        with _open_lock:
+            found = _opened.get(key)
+            if found is None:
+                try:
+                    found = VariantArchive(path)
+                except (OSError, ValueError):
+                    return None
+                for old in [k for k in _opened if k[0] == path]:
+                    del _opened[old]   # left for the GC: a stamp() may still be reading it
+                _opened[key] = found
+    return found if found.current() else None
+
+
+def stamp(payload: dict) -> Optional[bytes]:
+    """The pre-rendered report for ``payload``, or None if it has to be rendered normally."""
+    if not eligible(payload):
+        return None
+    found = archive()
+    return found.stamp(payload) if found is not None else None
+
+
+# --------------------------------------------------
+# CLI
+# --------------------------------------------------
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-render report bodies for every status combination.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    w = sub.add_parser("warm", help="render all combinations into a variants file")
+    w.add_argument("--out", default=VARIANTS_PATH or "variants.bin")
+    w.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    i = sub.add_parser("info", help="show what a variants file was rendered with")
+    i.add_argument("path", nargs="?", default=VARIANTS_PATH or "variants.bin")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        arc = VariantArchive(args.path)
+        print(json.dumps(dict(arc.meta, current=arc.current(), bytes=os.path.getsize(args.path)), indent=2))
+        return 0 if arc.current() else 1
+
+    def progress(done, total):
+        print(f"\r{min(done, total)}/{total}", end="", file=sys.stderr, flush=True)
+
+    meta = warm(args.out, args.workers, progress=progress)
+    print(f"\n{N_STATES} combinations in {meta['seconds']:.0f}s, {meta['bytes'] / 2 ** 20:.1f} MB -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())